@@ -0,0 +1,137 @@
+"""Compare the legacy fixed-window chunker with the token-aware chunker.
+
+Both chunkers run over the saved pages in ``tests/fixtures/pages``. For every
+labeled query the top-k chunks are retrieved and we report whether the answer
+span was retrieved and how many tokens the retrieved context costs in the prompt.
+
+Usage:
+    python -m benchmarks.chunking_benchmark [--scorer auto|embeddings|lexical]
+"""
+import argparse
+import json
+import math
+import re
+import statistics
+import time
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from benchmarks.corpus import load_html_pages, load_queries
+from src.config.settings import settings
+from src.rag.chunking import approx_token_count, chunk_page, fixed_window_chunks, make_token_counter
+from src.rag.documents import Page
+from src.web.extract import extract_sections
+
+# top-k used by the RAG tool before the token-aware chunker
+LEGACY_TOP_K = 5
+
+Chunks = List[Tuple[str, str]]  # (source url, text)
+Ranker = Callable[[str, Sequence[str], int], List[int]]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _terms(text: str) -> List[str]:
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return _TOKEN_RE.findall("".join(c for c in folded if not unicodedata.combining(c)))
+
+
+def lexical_ranker(query: str, texts: Sequence[str], k: int) -> List[int]:
+    """TF-IDF cosine ranking; used when the embedding model is not available."""
+    docs = [Counter(_terms(t)) for t in texts]
+    df = Counter(term for doc in docs for term in doc)
+    idf = {term: math.log((1 + len(docs)) / (1 + n)) + 1 for term, n in df.items()}
+
+    def vector(counts: Counter) -> Dict[str, float]:
+        return {term: tf * idf.get(term, 0.0) for term, tf in counts.items()}
+
+    q = vector(Counter(_terms(query)))
+    q_norm = math.sqrt(sum(v * v for v in q.values())) or 1.0
+    scores = []
+    for doc in docs:
+        d = vector(doc)
+        d_norm = math.sqrt(sum(v * v for v in d.values())) or 1.0
+        scores.append(sum(w * d.get(term, 0.0) for term, w in q.items()) / (q_norm * d_norm))
+    return sorted(range(len(texts)), key=lambda i: -scores[i])[:k]
+
+
+def embedding_ranker(embeddings) -> Ranker:
+    import numpy as np
+
+    cache: Dict[Tuple[str, ...], "np.ndarray"] = {}
+
+    def rank(query: str, texts: Sequence[str], k: int) -> List[int]:
+        key = tuple(texts)
+        if key not in cache:
+            cache[key] = np.asarray(embeddings.encode(list(texts), normalize_embeddings=True))
+        q = np.asarray(embeddings.encode([query], normalize_embeddings=True))[0]
+        return list(np.argsort(-(cache[key] @ q))[:k])
+
+    return rank
+
+
+def load_ranker(name: str) -> Tuple[str, Ranker, Callable[[str], int]]:
+    if name in ("auto", "embeddings"):
+        from src.rag.registry import vector_store_registry
+
+        embeddings = vector_store_registry.get_embeddings()
+        if embeddings is not None:
+            return f"embeddings:{embeddings.model_name}", embedding_ranker(embeddings), make_token_counter(embeddings)
+        if name == "embeddings":
+            raise SystemExit(f"Embedding model unavailable: {vector_store_registry.status()['errors']}")
+    return "lexical", lexical_ranker, approx_token_count
+
+
+def legacy_chunks(pages: Dict[str, Page]) -> Chunks:
+    return [(url, text) for url, page in pages.items() for text in fixed_window_chunks(page.text)]
+
+
+def token_aware_chunks(pages: Dict[str, Page], count_tokens: Callable[[str], int]) -> Chunks:
+    return [(url, c.text) for url, page in pages.items() for c in chunk_page(page, count_tokens=count_tokens)]
+
+
+def evaluate(chunks: Chunks, queries: List[Dict[str, str]], rank: Ranker, k: int, count_tokens) -> Dict[str, float]:
+    texts = [text for _, text in chunks]
+    chunk_tokens = [count_tokens(t) for t in texts]
+    answer_hits = source_hits = 0
+    context_tokens: List[int] = []
+    for item in queries:
+        top = rank(item["query"], texts, k)
+        answer_hits += any(item["answer"].lower() in texts[i].lower() for i in top)
+        source_hits += any(chunks[i][0] == item["source"] for i in top)
+        context_tokens.append(sum(chunk_tokens[i] for i in top))
+    return {
+        "top_k": k,
+        "chunks": len(chunks),
+        "tokens_per_chunk_mean": round(statistics.mean(chunk_tokens), 1),
+        "tokens_per_chunk_max": max(chunk_tokens),
+        "answer_hit_rate": round(answer_hits / len(queries), 3),
+        "source_hit_rate": round(source_hits / len(queries), 3),
+        "context_tokens_mean": round(statistics.mean(context_tokens), 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scorer", choices=["auto", "embeddings", "lexical"], default="auto")
+    args = parser.parse_args(argv)
+
+    scorer, rank, count_tokens = load_ranker(args.scorer)
+    pages = {url: Page.from_sections(url, extract_sections(html)) for url, html in load_html_pages().items()}
+    queries = load_queries()
+
+    started = time.perf_counter()
+    report = {
+        "scorer": scorer,
+        "queries": len(queries),
+        "legacy_fixed_window": evaluate(legacy_chunks(pages), queries, rank, LEGACY_TOP_K, count_tokens),
+        "token_aware": evaluate(token_aware_chunks(pages, count_tokens), queries, rank, settings.rag_top_k, count_tokens),
+    }
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
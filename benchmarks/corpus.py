@@ -0,0 +1,32 @@
+"""Saved InfinitePay pages used as an offline corpus by the benchmarks."""
+import json
+import os
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PAGES_DIR = os.path.join(ROOT, "tests", "fixtures", "pages")
+QUERIES_PATH = os.path.join(ROOT, "benchmarks", "data", "queries.json")
+BASE_URL = "https://www.infinitepay.io"
+
+
+def page_url(name: str) -> str:
+    return BASE_URL if name == "index" else f"{BASE_URL}/{name}"
+
+
+def load_html_pages() -> Dict[str, str]:
+    """Return ``{url: html}`` for every saved page."""
+    pages = {}
+    for filename in sorted(os.listdir(PAGES_DIR)):
+        if filename.endswith(".html"):
+            with open(os.path.join(PAGES_DIR, filename), encoding="utf-8") as fh:
+                pages[page_url(filename[: -len(".html")])] = fh.read()
+    return pages
+
+
+def load_queries() -> List[Dict[str, str]]:
+    """Labeled queries: ``query``, expected ``source`` URL and the ``answer`` span it must contain."""
+    with open(QUERIES_PATH, encoding="utf-8") as fh:
+        queries = json.load(fh)
+    for item in queries:
+        item["source"] = page_url(item["source"])
+    return queries
@@ -0,0 +1,115 @@
+"""Throughput of query encoding with and without the micro-batching service.
+
+N concurrent callers (threads, like concurrent ``/process`` requests running crews)
+each encode a stream of single queries, either directly through the shared model
+(today's per-call path, serialized by ``SharedEmbeddings``) or through
+``EmbeddingBatcher``.
+
+Uses the real embedding model when it can be loaded; otherwise a simulated model
+with a fixed per-call cost plus a per-query cost (``--simulate``).
+
+Usage:
+    python -m benchmarks.embedding_batching_benchmark [--callers 1 8 64] [--queries-per-caller 20] [--simulate]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from typing import Any, Dict, List
+
+from benchmarks.corpus import load_queries
+from src.config.settings import settings
+from src.rag.embedding_service import EmbeddingBatcher
+from src.rag.registry import SharedEmbeddings
+
+
+class SimulatedModel:
+    """Sleeps like a forward pass: ``call_ms`` per call plus ``item_ms`` per query (releases the GIL)."""
+
+    def __init__(self, call_ms: float = 8.0, item_ms: float = 0.3, dim: int = 384):
+        self.call = call_ms / 1000
+        self.item = item_ms / 1000
+        self.dim = dim
+
+    def encode(self, texts, **kwargs):
+        time.sleep(self.call + self.item * len(texts))
+        return [[0.0] * self.dim for _ in texts]
+
+
+def load_embeddings(simulate: bool) -> SharedEmbeddings:
+    if not simulate:
+        from src.rag.registry import vector_store_registry
+
+        embeddings = vector_store_registry.get_embeddings()
+        if embeddings is not None:
+            return embeddings
+        print(f" Embedding model unavailable ({vector_store_registry.status()['errors']}); simulating it")
+    return SharedEmbeddings(SimulatedModel(), "simulated")
+
+
+def run(encoder: Any, callers: int, queries_per_caller: int, queries: List[str]) -> Dict[str, float]:
+    latencies: List[float] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(callers + 1)
+
+    def caller(offset: int) -> None:
+        own: List[float] = []
+        barrier.wait()
+        for k in range(queries_per_caller):
+            started = time.perf_counter()
+            encoder.encode([queries[(offset + k) % len(queries)]])
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(callers)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "queries_per_second": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--queries-per-caller", type=int, default=20)
+    parser.add_argument("--simulate", action="store_true", help="Use a simulated model instead of the real one")
+    args = parser.parse_args(argv)
+
+    embeddings = load_embeddings(args.simulate)
+    queries = [item["query"] for item in load_queries()]
+    embeddings.encode(queries[:1])  # warm-up
+
+    report: Dict[str, Any] = {"model": embeddings.model_name, "results": {}}
+    for callers in args.callers:
+        batcher = EmbeddingBatcher(
+            embeddings,
+            max_batch_size=settings.rag_embedding_batch_size,
+            max_wait_ms=settings.rag_embedding_batch_wait_ms,
+        )
+        per_call = run(embeddings, callers, args.queries_per_caller, queries)
+        batched = run(batcher, callers, args.queries_per_caller, queries)
+        batched["mean_batch_size"] = batcher.stats()["mean_batch_size"]
+        batcher.close()
+        report["results"][str(callers)] = {
+            "per_call": per_call,
+            "batched": batched,
+            "speedup": round(batched["queries_per_second"] / per_call["queries_per_second"], 2),
+        }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
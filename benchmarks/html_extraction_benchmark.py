@@ -0,0 +1,121 @@
+"""Throughput and peak memory of HTML-to-text extraction: lxml versus BeautifulSoup.
+
+The saved pages in ``tests/fixtures/pages`` are small, so each page is also
+inflated (its ``<main>`` repeated ``--scale`` times) to approximate real
+infinitepay.io / help-center pages. For every extraction path we report pages/s,
+MB/s and the peak Python heap (``tracemalloc``) of extracting one page:
+
+    legacy          BeautifulSoup(html, "html.parser") + strip + get_text (the old code)
+    bs4             src.web.extract with WEB_HTML_PARSER=bs4 (sections)
+    lxml            src.web.extract with lxml (sections)
+    lxml_stream     lxml fed the body in 16 KB chunks, as the web search tool does
+
+libxml2 allocates outside the Python heap, so its peak is also reported as the
+process RSS growth (``ru_maxrss``) where available; run one path per process
+(``--paths lxml``) for a clean RSS number.
+
+Usage:
+    python -m benchmarks.html_extraction_benchmark [--scale 1 20 100] [--repeats 5] [--paths legacy lxml]
+"""
+import argparse
+import json
+import re
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.corpus import load_html_pages
+from src.web.extract import extract_sections, parse_stream
+
+STREAM_CHUNK = 16 * 1024
+_MAIN_RE = re.compile(r"(<main>)(.*?)(</main>)", re.S)
+
+
+def legacy_extract(html: str) -> str:
+    from bs4 import BeautifulSoup  # type: ignore
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.extract()
+    return " ".join(soup.get_text(" ").split())
+
+
+def stream_extract(html: str) -> Any:
+    body = html.encode("utf-8")
+    chunks = (body[i : i + STREAM_CHUNK] for i in range(0, len(body), STREAM_CHUNK))
+    return parse_stream(chunks, "utf-8", max_bytes=0, backend="lxml").sections()
+
+
+PATHS: Dict[str, Callable[[str], Any]] = {
+    "legacy": legacy_extract,
+    "bs4": lambda html: extract_sections(html, backend="bs4"),
+    "lxml": lambda html: extract_sections(html, backend="lxml"),
+    "lxml_stream": stream_extract,
+}
+
+
+def inflate(html: str, scale: int) -> str:
+    if scale <= 1:
+        return html
+    return _MAIN_RE.sub(lambda m: m.group(1) + m.group(2) * scale + m.group(3), html, count=1)
+
+
+def max_rss_kb() -> int:
+    try:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, AttributeError):  # pragma: no cover - not on every platform
+        return 0
+
+
+def bench_path(extract: Callable[[str], Any], pages: List[str], repeats: int) -> Dict[str, Any]:
+    for html in pages:  # warm-up (imports, parser setup)
+        extract(html)
+    total_bytes = sum(len(html.encode("utf-8")) for html in pages)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for html in pages:
+            extract(html)
+    elapsed = time.perf_counter() - started
+
+    peaks = []
+    rss_before = max_rss_kb()
+    for html in pages:
+        tracemalloc.start()
+        extract(html)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "pages_per_s": round(len(pages) * repeats / elapsed, 1),
+        "mb_per_s": round(total_bytes * repeats / elapsed / 1e6, 2),
+        "peak_heap_kb": round(max(peaks) / 1024, 1),
+        "max_rss_growth_kb": max(0, max_rss_kb() - rss_before),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 20, 100], help="Times <main> is repeated")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--paths", nargs="+", choices=sorted(PATHS), default=list(PATHS))
+    args = parser.parse_args(argv)
+
+    corpus = list(load_html_pages().values())
+    report: Dict[str, Any] = {"pages": len(corpus), "results": {}}
+    for scale in args.scale:
+        pages = [inflate(html, scale) for html in corpus]
+        avg_kb = round(sum(len(p.encode("utf-8")) for p in pages) / len(pages) / 1024, 1)
+        results: Dict[str, Any] = {"avg_page_kb": avg_kb}
+        for name in args.paths:
+            results[name] = bench_path(PATHS[name], pages, args.repeats)
+            print(f" x{scale} ({avg_kb} KB/page) {name}: {results[name]}")
+        if "legacy" in results and "lxml" in results:
+            results["lxml_speedup"] = round(results["lxml"]["pages_per_s"] / results["legacy"]["pages_per_s"], 2)
+        report["results"][str(scale)] = results
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+"""Routing accuracy and latency of the embedding intent router.
+
+Every message in ``benchmarks/data/intents.json`` is labeled with the intent the
+router should pick, or ``null`` when it should leave the plan to the Manager
+(multi-intent, off-topic). Reported:
+
+    - fast_path_rate: share of messages routed without the Manager
+    - accuracy: share of fast-path decisions that picked the labeled intent
+    - coverage: share of labeled (non-null) messages routed to the right intent
+    - false_fast_path: share of ``null`` messages that were routed anyway
+    - p50/p95 routing latency
+
+``--threshold``/``--margin`` sweep the confidence settings. Without the embedding
+model (``--embeddings hashing``, also the ``auto`` fallback) the hashed
+bag-of-words embedder of ``rag_benchmark`` is used: its numbers only compare with
+runs made the same way, and the production thresholds are tuned for the model.
+
+Usage:
+    python -m benchmarks.intent_router_benchmark [--threshold 0.5 0.6 0.7] [--margin 0.1]
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from benchmarks.corpus import ROOT
+from benchmarks.rag_benchmark import load_embeddings, percentile
+from src.config.settings import settings
+from src.flows.intent_router import IntentRouter
+
+INTENTS_PATH = os.path.join(ROOT, "benchmarks", "data", "intents.json")
+
+
+def load_labeled() -> List[Dict[str, Any]]:
+    with open(INTENTS_PATH, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def evaluate(router: IntentRouter, labeled: List[Dict[str, Any]]) -> Dict[str, Any]:
+    routed = correct = false_fast = 0
+    latencies = []
+    for item in labeled:
+        started = time.perf_counter()
+        route = router.route(item["message"])
+        latencies.append((time.perf_counter() - started) * 1000)
+        if route is None:
+            continue
+        routed += 1
+        if item["intent"] is None:
+            false_fast += 1
+        elif route.intent.name == item["intent"]:
+            correct += 1
+    labeled_count = sum(1 for item in labeled if item["intent"] is not None)
+    unlabeled_count = len(labeled) - labeled_count
+    return {
+        "fast_path_rate": round(routed / len(labeled), 4),
+        "accuracy": round(correct / routed, 4) if routed else None,
+        "coverage": round(correct / labeled_count, 4) if labeled_count else None,
+        "false_fast_path": round(false_fast / unlabeled_count, 4) if unlabeled_count else None,
+        "latency_p50_ms": round(percentile(latencies, 0.5), 3),
+        "latency_p95_ms": round(percentile(latencies, 0.95), 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embeddings", choices=["auto", "model", "hashing"], default="auto")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[settings.intent_router_threshold])
+    parser.add_argument("--margin", type=float, nargs="+", default=[settings.intent_router_margin])
+    args = parser.parse_args(argv)
+
+    embeddings = load_embeddings(args.embeddings)
+    labeled = load_labeled()
+    report: Dict[str, Any] = {"embeddings": embeddings.model_name, "messages": len(labeled), "results": []}
+    for threshold in args.threshold:
+        for margin in args.margin:
+            router = IntentRouter(embeddings, threshold=threshold, margin=margin, audit_rate=0.0)
+            router.warm_up()
+            metrics = evaluate(router, labeled)
+            report["results"].append({"threshold": threshold, "margin": margin, **metrics})
+            print(f" threshold={threshold} margin={margin}: {metrics}")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""Cold start, memory and latency of the PyTorch vs ONNX Runtime embedding backends.
+
+Each backend runs in a fresh subprocess so import/load time and peak RSS are
+measured in isolation: ``torch`` (SentenceTransformer), ``onnx`` (exported
+float32 model) and ``onnx-int8`` (dynamically quantized model). Query embeddings
+are compared with the PyTorch ones (cosine similarity).
+
+Export the ONNX models first:
+    python -m src.rag.onnx_embedder --quantize
+
+Usage:
+    python -m benchmarks.onnx_embedding_benchmark [--backends torch onnx onnx-int8] [--repeats 20]
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.corpus import load_queries
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def load_model(backend: str):
+    from src.config.settings import settings
+
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        return SentenceTransformer(settings.rag_embedding_model)
+    from src.rag.onnx_embedder import OnnxEmbedder
+
+    return OnnxEmbedder(settings.rag_onnx_model_dir, quantized=backend == "onnx-int8")
+
+
+def worker(backend: str, repeats: int) -> Dict[str, Any]:
+    """Runs inside the subprocess: load, encode, report."""
+    queries = [item["query"] for item in load_queries()]
+    started = time.perf_counter()
+    model = load_model(backend)
+    model.encode(queries[:1])
+    cold_start = time.perf_counter() - started
+
+    latencies: List[float] = []
+    for _ in range(repeats):
+        for query in queries:
+            t = time.perf_counter()
+            model.encode([query])
+            latencies.append(time.perf_counter() - t)
+    latencies.sort()
+
+    batch = queries * 8
+    t = time.perf_counter()
+    model.encode(batch, batch_size=32)
+    batch_seconds = time.perf_counter() - t
+
+    return {
+        "cold_start_seconds": round(cold_start, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "query_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "query_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+        "batch_texts_per_second": round(len(batch) / batch_seconds, 1),
+        "embeddings": np.asarray(model.encode(queries)).tolist(),
+    }
+
+
+def run_backend(backend: str, repeats: int) -> Dict[str, Any]:
+    command = [sys.executable, "-m", "benchmarks.onnx_embedding_benchmark", "--worker", backend, "--repeats", str(repeats)]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        error = (process.stderr.strip().splitlines() or ["failed"])[-1]
+        return {"skipped": error}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def cosine(a, b) -> np.ndarray:
+    a, b = np.asarray(a), np.asarray(b)
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.repeats)))
+        return 0
+
+    results = {backend: run_backend(backend, args.repeats) for backend in args.backends}
+    reference = results.get("torch", {}).get("embeddings")
+    for backend, result in results.items():
+        embeddings = result.pop("embeddings", None)
+        if reference is not None and embeddings is not None and backend != "torch":
+            similarity = cosine(reference, embeddings)
+            result["cosine_vs_torch_min"] = round(float(similarity.min()), 5)
+            result["cosine_vs_torch_mean"] = round(float(similarity.mean()), 5)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
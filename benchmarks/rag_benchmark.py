@@ -0,0 +1,278 @@
+"""Retrieval quality and latency of the RAG tool over the frozen corpus.
+
+The saved pages in ``tests/fixtures/pages`` are indexed with the production
+indexer (boilerplate removal, chunking, BM25, shards) into a temporary store using
+the configured (or given) vector backend, then every labeled query in
+``benchmarks/data/queries.json`` is run through ``InfinitePayRAGTool``.
+
+Reported:
+    - recall@k (the expected source URL is among the top-k chunks) and MRR
+    - answer@k (the expected answer span is in the top-k chunks)
+    - p50/p95 latency of the tool call (encode + search + compression)
+    - index build time, chunk count and on-disk index size
+
+The report is JSON (``--output``) and records the configuration and a hash of the
+corpus, so runs can be compared with ``--compare baseline.json``. Without the
+embedding model (``--embeddings hashing``, also the ``auto`` fallback) a
+deterministic hashed bag-of-words embedder is used: numbers are then only
+comparable with runs made the same way.
+
+Usage:
+    python -m benchmarks.rag_benchmark [--backend numpy --dtype int8] [--output report.json] [--compare baseline.json]
+"""
+import argparse
+import hashlib
+import json
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from benchmarks.corpus import QUERIES_PATH, ROOT, load_html_pages, load_queries
+from benchmarks.vector_backend_benchmark import dir_size
+from src.config.settings import settings
+from src.rag.backends import create_client
+from src.rag.bm25 import BM25Index, bm25_path, tokenize
+from src.rag.documents import Page
+from src.rag.indexer import build_index, write_sidecars
+from src.rag.registry import SharedEmbeddings
+from src.rag.sharding import ShardRouter, routed_search, shards_path
+from src.tools.rag_tools import InfinitePayRAGTool
+from src.web.extract import extract_sections
+
+COLLECTION = "bench_kb"
+RECALL_KS = (1, 3, 5)
+# Metrics compared by --compare; for all but the latencies, sizes and times higher is better
+COMPARED = (
+    "recall@1",
+    "recall@3",
+    "recall@5",
+    "mrr",
+    "answer@3",
+    "latency_p50_ms",
+    "latency_p95_ms",
+    "build_seconds",
+    "index_bytes",
+)
+
+
+class HashingModel:
+    """Deterministic stand-in for the embedding model: hashed word and bigram counts."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        terms = tokenize(text)
+        for feature in terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]:
+            vector[zlib.crc32(feature.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        vectors = np.stack([self._vector(t) for t in texts])
+        return vectors[0] if single else vectors
+
+
+class BenchmarkRAGTool(InfinitePayRAGTool):
+    """The production tool wired to the benchmark store instead of the process registry."""
+
+    def _setup_vector_store(self):
+        pass
+
+    def _open_shard(self, name: str):
+        return self.client.get_or_create_collection(name)
+
+
+def load_embeddings(kind: str) -> SharedEmbeddings:
+    if kind in ("auto", "model"):
+        from src.rag.registry import vector_store_registry
+
+        embeddings = vector_store_registry.get_embeddings()
+        if embeddings is not None:
+            return embeddings
+        if kind == "model":
+            raise SystemExit(f"Embedding model unavailable: {vector_store_registry.status()['errors']}")
+        print(f" Embedding model unavailable ({vector_store_registry.status()['errors']}); using hashing embeddings")
+    return SharedEmbeddings(HashingModel(), "hashing")
+
+
+def corpus_fingerprint(pages: Dict[str, str]) -> str:
+    digest = hashlib.sha256()
+    for url in sorted(pages):
+        digest.update(url.encode("utf-8"))
+        digest.update(pages[url].encode("utf-8"))
+    with open(QUERIES_PATH, "rb") as fh:
+        digest.update(fh.read())
+    return digest.hexdigest()[:16]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def build(path: str, embeddings: Any, backend: str, dtype: str) -> Dict[str, Any]:
+    """Index the frozen corpus into ``path`` and return the client, collection and manifest."""
+    started = time.perf_counter()
+    pages = [Page.from_sections(url, extract_sections(html)) for url, html in load_html_pages().items()]
+    client = create_client(backend, path, dtype=dtype, rescore=settings.rag_vector_rescore)
+    collection = client.get_or_create_collection(COLLECTION)
+    manifest = build_index(collection, embeddings, pages)
+    write_sidecars(collection, path, COLLECTION, manifest, client.get_or_create_collection)
+    return {
+        "client": client,
+        "collection": collection,
+        "manifest": manifest,
+        "build_seconds": time.perf_counter() - started,
+    }
+
+
+def evaluate(tool: InfinitePayRAGTool, queries: List[Dict[str, str]], repeats: int) -> Dict[str, Any]:
+    """Quality from the ranked hits the tool retrieves; latency from full tool calls."""
+    k_max = max(RECALL_KS)
+    per_query = []
+    for item in queries:
+        query_embedding = tool.embeddings.encode([item["query"]]).tolist()
+        hits, shards = routed_search(
+            item["query"],
+            query_embedding,
+            tool.collection,
+            router=tool.shard_router,
+            open_collection=tool._open_shard,
+            lexical_index=tool.lexical_index,
+            top_k=k_max,
+        )
+        sources = [hit.metadata.get("source") for hit in hits]
+        rank = next((r for r, source in enumerate(sources, start=1) if source == item["source"]), None)
+        answer_rank = next(
+            (r for r, hit in enumerate(hits, start=1) if item["answer"].lower() in hit.document.lower()), None
+        )
+        per_query.append(
+            {"query": item["query"], "source": item["source"], "rank": rank, "answer_rank": answer_rank, "shards": shards}
+        )
+
+    tool._run(queries[0]["query"])  # warm-up
+    latencies = []
+    for _ in range(repeats):
+        for item in queries:
+            started = time.perf_counter()
+            tool._run(item["query"])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    metrics: Dict[str, Any] = {}
+    for k in RECALL_KS:
+        metrics[f"recall@{k}"] = round(sum(q["rank"] is not None and q["rank"] <= k for q in per_query) / len(per_query), 3)
+    metrics["mrr"] = round(statistics.mean(1 / q["rank"] if q["rank"] else 0.0 for q in per_query), 3)
+    metrics["answer@3"] = round(
+        sum(q["answer_rank"] is not None and q["answer_rank"] <= 3 for q in per_query) / len(per_query), 3
+    )
+    metrics["latency_p50_ms"] = round(percentile(latencies, 0.5), 3)
+    metrics["latency_p95_ms"] = round(percentile(latencies, 0.95), 3)
+    return {"metrics": metrics, "queries": per_query}
+
+
+def run(backend: Optional[str] = None, dtype: Optional[str] = None, embeddings: str = "auto", repeats: int = 5) -> Dict[str, Any]:
+    backend = backend or settings.rag_vector_backend
+    dtype = dtype or settings.rag_vector_dtype
+    shared = load_embeddings(embeddings)
+    html_pages = load_html_pages()
+    queries = load_queries()
+    path = tempfile.mkdtemp(prefix="rag-bench-")
+    try:
+        built = build(path, shared, backend, dtype)
+        tool = BenchmarkRAGTool()
+        tool.client = built["client"]
+        tool.embeddings = shared
+        tool.collection = built["collection"]
+        tool.lexical_index = BM25Index.load(bm25_path(path, COLLECTION))
+        tool.shard_router = ShardRouter.load(shards_path(path, COLLECTION)) if settings.rag_sharding_enabled else None
+        result = evaluate(tool, queries, repeats)
+        result["metrics"].update(
+            {
+                "build_seconds": round(built["build_seconds"], 3),
+                "index_bytes": dir_size(path),
+                "chunks": built["manifest"]["counts"]["chunks"],
+            }
+        )
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    return {
+        "config": {
+            "revision": git_revision(),
+            "corpus": corpus_fingerprint(html_pages),
+            "pages": len(html_pages),
+            "queries": len(queries),
+            "embeddings": shared.model_name,
+            "backend": backend,
+            "dtype": dtype,
+            "top_k": settings.rag_top_k,
+            "chunk_max_tokens": settings.rag_chunk_max_tokens,
+            "chunk_overlap_tokens": settings.rag_chunk_overlap_tokens,
+            "hybrid": settings.rag_hybrid_enabled,
+            "sharding": settings.rag_sharding_enabled,
+            "repeats": repeats,
+        },
+        **result,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-metric baseline/current/delta, plus the config keys that differ between the runs."""
+    metrics = {}
+    for name in COMPARED:
+        before, after = baseline["metrics"].get(name), current["metrics"].get(name)
+        if before is None or after is None:
+            continue
+        metrics[name] = {"baseline": before, "current": after, "delta": round(after - before, 3)}
+    config = {
+        key: {"baseline": baseline["config"].get(key), "current": value}
+        for key, value in current["config"].items()
+        if key not in ("revision", "repeats") and baseline["config"].get(key) != value
+    }
+    return {"metrics": metrics, "config_changes": config}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=None, help="Default: RAG_VECTOR_BACKEND")
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default=None, help="numpy backend only")
+    parser.add_argument("--embeddings", choices=["auto", "model", "hashing"], default="auto")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed passes over the query set")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(backend=args.backend, dtype=args.dtype, embeddings=args.embeddings, repeats=args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+    summary = {"config": report["config"], "metrics": report["metrics"]}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            summary["comparison"] = compare(json.load(fh), report)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
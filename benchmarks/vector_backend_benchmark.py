@@ -0,0 +1,117 @@
+"""Latency/recall of the ``numpy`` vector backend versus Chroma.
+
+Synthetic, clustered, unit-norm 384-d vectors (the MiniLM dimension) are loaded
+into each backend at several sizes. For each backend we report build time, the
+time to open the store in a fresh process-like client, query latency (p50/p95)
+and recall@k against exact brute-force neighbours.
+
+Backends are ``chroma`` or ``numpy[:dtype]`` (``numpy:float16``, ``numpy:int8``).
+
+Usage:
+    python -m benchmarks.vector_backend_benchmark [--sizes 1000 10000 100000] [--backends numpy numpy:int8 chroma]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.rag.backends import create_client
+
+DIM = 384
+ADD_BATCH_SIZE = 5000
+COLLECTION = "bench_kb"
+
+
+def make_vectors(n: int, dim: int = DIM, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Points around random centroids, normalized like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(clusters, dim))
+    points = centroids[rng.integers(0, clusters, size=n)] + 0.6 * rng.normal(size=(n, dim))
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    distances = (vectors ** 2).sum(1)[None, :] - 2 * queries @ vectors.T
+    return [set(np.argsort(row)[:k].tolist()) for row in distances]
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def bench_backend(spec: str, vectors: np.ndarray, queries: np.ndarray, truth: List[set], k: int) -> Dict[str, Any]:
+    backend, _, dtype = spec.partition(":")
+    path = tempfile.mkdtemp(prefix=f"bench-{backend}-")
+    try:
+        ids = [str(i) for i in range(len(vectors))]
+        started = time.perf_counter()
+        collection = create_client(backend, path, dtype=dtype or "float32").get_or_create_collection(COLLECTION)
+        for start in range(0, len(ids), ADD_BATCH_SIZE):
+            end = start + ADD_BATCH_SIZE
+            collection.upsert(
+                ids=ids[start:end],
+                documents=[f"chunk {i}" for i in ids[start:end]],
+                metadatas=[{"source": "bench"} for _ in ids[start:end]],
+                embeddings=vectors[start:end].tolist(),
+            )
+        if hasattr(collection, "flush"):
+            collection.flush()
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        reopened = create_client(backend, path, dtype=dtype or "float32").get_or_create_collection(COLLECTION)
+        reopened.count()
+        open_seconds = time.perf_counter() - started
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            result = reopened.query(query_embeddings=[query.tolist()], n_results=k, include=["distances"])
+            latencies.append(time.perf_counter() - started)
+            hits += len(expected & {int(i) for i in result["ids"][0]})
+        latencies.sort()
+        return {
+            "build_seconds": round(build_seconds, 3),
+            "open_seconds": round(open_seconds, 4),
+            "query_p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "query_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 3),
+            f"recall@{k}": round(hits / (k * len(queries)), 4),
+            "disk_mb": round(dir_size(path) / 2**20, 2),
+            **({"searched_mb": round(reopened.footprint()["searched_bytes"] / 2**20, 2)} if backend == "numpy" else {}),
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--backends", nargs="+", default=["numpy", "numpy:float16", "numpy:int8", "chroma"])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {"dim": DIM, "k": args.k, "results": {}}
+    for size in args.sizes:
+        vectors = make_vectors(size)
+        queries = make_vectors(args.queries, seed=1)
+        truth = exact_neighbours(vectors, queries, args.k)
+        report["results"][str(size)] = {}
+        for backend in args.backends:
+            try:
+                report["results"][str(size)][backend] = bench_backend(backend, vectors, queries, truth, args.k)
+            except ImportError as e:
+                report["results"][str(size)][backend] = {"skipped": str(e)}
+            print(f" {backend} @ {size}: {report['results'][str(size)][backend]}")
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,20 +2,20 @@ from typing import Dict, Any
 from crewai import Agent
 
 from ..tools.communication_tools import SlackNotifyTool
+from ..tools.metadata import describe_tools
+
+ESCALATION_TOOLS = (SlackNotifyTool,)
 
 
 def create_escalation_description() -> Dict[str, Dict[str, Any]]:
-    """Create the Escalation agent description."""
-    slack_tool = SlackNotifyTool()
+    """Create the Escalation agent description (read from tool classes; no tool is instantiated)."""
     return {
         "title": "ESCALATION",
         "capabilities": (
             "Equipe especializada em acionar um humano via Slack em casos de exceção, "
             "solicitação explícita do usuário ou quando as guardrails assim exigirem."
         ),
-        "tools": [
-            {"name": slack_tool.name, "description": slack_tool.description},
-        ]
+        "tools": describe_tools(ESCALATION_TOOLS),
     }
 
 
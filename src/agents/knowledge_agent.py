@@ -3,12 +3,13 @@ from crewai import Agent
 
 from ..tools.rag_tools import InfinitePayRAGTool
 from ..tools.search_tools import WebSearchTool
+from ..tools.metadata import describe_tools
+
+KNOWLEDGE_TOOLS = (InfinitePayRAGTool, WebSearchTool)
 
 
 def create_knowledge_description() -> Dict[str, Dict[str, Any]]:
-    """Create the Knowledge agent description."""
-    rag_tool = InfinitePayRAGTool()
-    web_search_tool = WebSearchTool()
+    """Create the Knowledge agent description (read from tool classes; no tool is instantiated)."""
     return {
         "title": "KNOWLEDGE",
         "capabilities": (
@@ -16,10 +17,7 @@ def create_knowledge_description() -> Dict[str, Dict[str, Any]]:
             "da InfinitePay (RAG) e busca web. Útil para dúvidas sobre produtos, políticas, taxas "
             "e funcionalidades da InfinitePay."
         ),
-        "tools": [
-            {"name": rag_tool.name, "description": rag_tool.description},
-            {"name": web_search_tool.name, "description": web_search_tool.description},
-        ]
+        "tools": describe_tools(KNOWLEDGE_TOOLS),
     }
 
 def create_knowledge_agent() -> Agent:
@@ -1,3 +1,5 @@
+import copy
+from functools import lru_cache
 from typing import Any, Dict, List
 
 from crewai import Agent
@@ -7,14 +9,8 @@ from .support_agent import create_support_description
 from .general_agent import create_general_description
 from .escalation_agent import create_escalation_description
 
-def get_agent_catalog() -> Dict[str, Dict[str, Any]]:
-    """Return a catalog describing available agents and their tools.
-
-    The catalog values are designed to be injected into the Manager prompt so it can
-    plan steps accurately. Tool details are read from the tool class attributes to stay
-    consistent with the implementation.
-    """
-
+@lru_cache(maxsize=1)
+def _cached_catalog() -> Dict[str, Dict[str, Any]]:
     return {
         "KNOWLEDGE": create_knowledge_description(),
         "SUPPORT": create_support_description(),
@@ -23,13 +19,22 @@ def get_agent_catalog() -> Dict[str, Dict[str, Any]]:
     }
 
 
-def build_manager_prompt(message: str, history: Any) -> str:
-    """Build the dynamic Manager prompt by injecting agent and tool descriptions."""
-    catalog = get_agent_catalog()
+def get_agent_catalog() -> Dict[str, Dict[str, Any]]:
+    """Return a catalog describing available agents and their tools.
 
-    # Render the catalog as markdown text
+    The catalog values are designed to be injected into the Manager prompt so it can
+    plan steps accurately. Tool details are read from the tool class attributes to stay
+    consistent with the implementation; the catalog is built once and memoized, and no
+    tool is instantiated to build it.
+    """
+    return copy.deepcopy(_cached_catalog())
+
+
+@lru_cache(maxsize=1)
+def get_teams_block() -> str:
+    """Render the catalog as the markdown block injected into the Manager prompt (memoized)."""
     teams_lines: List[str] = []
-    for _, spec in catalog.items():
+    for _, spec in _cached_catalog().items():
         teams_lines.append(f"- {spec['title']}: {spec['capabilities']}")
         if spec.get("tools"):
             for tool in spec["tools"]:
@@ -38,9 +43,19 @@ def build_manager_prompt(message: str, history: Any) -> str:
                 teams_lines.append(f"  - {name}: {desc}")
         else:
             teams_lines.append("  - (sem ferramentas)")
+    return "\n".join(teams_lines)
 
-    teams_block = "\n".join(teams_lines)
-    teams_names = " | ".join(catalog.keys())
+
+@lru_cache(maxsize=1)
+def get_team_names() -> str:
+    """Return the valid team names as rendered in the output schema hint (memoized)."""
+    return " | ".join(_cached_catalog().keys())
+
+
+def build_manager_prompt(message: str, history: Any) -> str:
+    """Build the dynamic Manager prompt by injecting agent and tool descriptions."""
+    teams_block = get_teams_block()
+    teams_names = get_team_names()
     return f"""
 Analise a mensagem atual e o histórico de conversa para identificar a intenção do usuário
  e definir os passos necessários para resolver o problema.
@@ -55,7 +70,8 @@ Analise a mensagem atual e o histórico de conversa para identificar a intençã
 
 ## Explicação sobre passos
 Cada passo é uma etapa do processo de resolução do problema que inicia uma equipe especializada de agentes.
-A sequência de passos define a ordem em que as equipes serão chamadas para resolver o problema.
+Passos independentes são executados em paralelo. Se um passo precisa do resultado de outro, liste em "depends_on"
+os índices (começando em 0) dos passos anteriores de que ele depende; ele só começa quando eles terminarem e recebe seus resultados.
 Um passo bem definido deve conter:
 - Nome da equipe que realizará o passo (CRÍTICO: o nome deve ser exatamente um dos disponíveis)
 - Task: Tarefa que será realizada pela equipe especializada. Essa Tarefa deve conter todas as informações/orientações necessárias para que a equipe especializada possa realizar a tarefa.
@@ -72,7 +88,7 @@ Lembre que você não precisa acionar uma equipe se a tarefa for simples ou se n
 
 ## Formato de saída (obrigatório)
 Você DEVE retornar um objeto JSON compatível com o schema:
-{{ "steps": [ {{ "agent": "<{teams_names}>", "agent_task": "<descrição da tarefa>" }} ] }}
+{{ "steps": [ {{ "agent": "<{teams_names}>", "agent_task": "<descrição da tarefa>", "depends_on": [<índices de passos anteriores>] }} ] }}
 
 ## Inputs
 Mensagem: {message}
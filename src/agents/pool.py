@@ -0,0 +1,227 @@
+"""Pool of reusable team agents, checked out per plan step.
+
+Building a ``crewai.Agent`` (its LLM client and every tool) on each step was on
+the request's hot path. The pool keeps up to ``agent_pool_size`` agents per team,
+built at startup by :meth:`AgentPool.warm_up` (or on first demand), hands each to
+one step at a time and resets it before the next use.
+
+``Agent.kickoff`` runs every call on a fresh ``LiteAgent``, so the conversation
+never lives on the pooled agent; what does carry over (tool results, tool usage
+counters) is cleared by :func:`reset_agent`. The RAG tool re-reads its index
+handles from the registry on every query, so pooled agents see a rebuilt index.
+An agent whose step raised is discarded instead of going back to the pool. When
+every agent of a team is busy for longer than ``agent_pool_max_wait_seconds``, a
+temporary agent is built and thrown away after the step, so a burst never blocks
+a request indefinitely.
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from src.config.settings import settings
+
+from .escalation_agent import create_escalation_agent
+from .general_agent import create_general_agent
+from .knowledge_agent import create_knowledge_agent
+from .support_agent import create_support_agent
+
+TEAM_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "KNOWLEDGE": create_knowledge_agent,
+    "SUPPORT": create_support_agent,
+    "GENERAL": create_general_agent,
+    "ESCALATION": create_escalation_agent,
+}
+
+
+def reset_agent(agent: Any) -> None:
+    """Clear what one step leaves on an agent before it is reused."""
+    if getattr(agent, "tools_results", None):
+        agent.tools_results = []
+    for tool in getattr(agent, "tools", None) or []:
+        if getattr(tool, "current_usage_count", 0):
+            tool.current_usage_count = 0
+
+
+class AgentPool:
+    """Up to ``size`` reusable agents per team, each used by one step at a time."""
+
+    def __init__(
+        self,
+        factories: Optional[Mapping[str, Callable[[], Any]]] = None,
+        size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ):
+        self.factories = dict(TEAM_FACTORIES if factories is None else factories)
+        self.size = max(1, settings.agent_pool_size if size is None else size)
+        self.max_wait = settings.agent_pool_max_wait_seconds if max_wait is None else max_wait
+        self._cond = threading.Condition()
+        self._idle: Dict[str, List[Any]] = {team: [] for team in self.factories}
+        self._created = {team: 0 for team in self.factories}
+        self._stats = {
+            team: {
+                "checkouts": 0,
+                "built": 0,
+                "build_seconds": 0.0,
+                "waits": 0,
+                "wait_seconds": 0.0,
+                "max_wait_seconds": 0.0,
+                "overflow": 0,
+                "discarded": 0,
+            }
+            for team in self.factories
+        }
+
+    @property
+    def teams(self) -> Tuple[str, ...]:
+        return tuple(self.factories)
+
+    def warm_up(self) -> None:
+        """Build every team's agents up to the pool size (blocking; run at startup)."""
+        for team in self.factories:
+            while True:
+                with self._cond:
+                    if self._created[team] >= self.size:
+                        break
+                    self._created[team] += 1
+                self._put_back(team, self._build_reserved(team))
+
+    def _build(self, team: str) -> Any:
+        started = time.perf_counter()
+        agent = self.factories[team]()
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            stats = self._stats[team]
+            stats["built"] += 1
+            stats["build_seconds"] += elapsed
+        return agent
+
+    def _build_reserved(self, team: str) -> Any:
+        """Build an agent for a slot already counted in ``_created``."""
+        try:
+            return self._build(team)
+        except BaseException:
+            with self._cond:
+                self._created[team] -= 1
+                self._cond.notify_all()
+            raise
+
+    def _put_back(self, team: str, agent: Any) -> None:
+        with self._cond:
+            self._idle[team].append(agent)
+            self._cond.notify_all()
+
+    def try_acquire(self, team: str) -> Optional[Any]:
+        """An idle agent of ``team``, or None without waiting."""
+        with self._cond:
+            if not self._idle[team]:
+                return None
+            self._stats[team]["checkouts"] += 1
+            return self._idle[team].pop()
+
+    def acquire(self, team: str, timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Check out an agent of ``team``, waiting up to ``timeout`` for one to free up.
+
+        Returns ``(agent, pooled)``; ``pooled`` is False for a temporary agent built
+        because the team's pool stayed full for the whole wait.
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        started = time.perf_counter()
+        reserved = temporary = waited = False
+        with self._cond:
+            stats = self._stats[team]
+            stats["checkouts"] += 1
+            while not self._idle[team]:
+                if self._created[team] < self.size:
+                    self._created[team] += 1
+                    reserved = True
+                    break
+                remaining = timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    stats["overflow"] += 1
+                    temporary = True
+                    break
+                waited = True
+                self._cond.wait(remaining)
+            agent = None if reserved or temporary else self._idle[team].pop()
+            if waited:
+                wait = time.perf_counter() - started
+                stats["waits"] += 1
+                stats["wait_seconds"] += wait
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+        if reserved:
+            agent = self._build_reserved(team)
+        elif temporary:
+            agent = self._build(team)
+        return agent, not temporary
+
+    def release(self, team: str, agent: Any, pooled: bool = True, healthy: bool = True) -> None:
+        """Return a checked-out agent; unhealthy ones are dropped and rebuilt on demand."""
+        if not pooled:
+            return
+        if healthy:
+            reset_agent(agent)
+            self._put_back(team, agent)
+            return
+        with self._cond:
+            self._created[team] -= 1
+            self._stats[team]["discarded"] += 1
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def checkout(self, team: str):
+        """``async with pool.checkout(team) as agent``: waiting and building happen off the event loop."""
+        agent, pooled = self.try_acquire(team), True
+        if agent is None:
+            pending = asyncio.ensure_future(asyncio.to_thread(self.acquire, team))
+            try:
+                agent, pooled = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The thread still gets an agent; hand it back instead of leaking the slot
+                pending.add_done_callback(
+                    lambda done: done.cancelled() or done.exception() or self.release(team, *done.result())
+                )
+                raise
+        healthy = False
+        try:
+            yield agent
+            healthy = True
+        finally:
+            self.release(team, agent, pooled, healthy)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            teams = {}
+            for team, raw in self._stats.items():
+                team_stats = dict(raw)
+                for key in ("build_seconds", "wait_seconds", "max_wait_seconds"):
+                    team_stats[key] = round(raw[key], 4)
+                team_stats["size"] = self._created[team]
+                team_stats["idle"] = len(self._idle[team])
+                team_stats["avg_build_ms"] = round(1000 * raw["build_seconds"] / raw["built"], 2) if raw["built"] else None
+                team_stats["avg_wait_ms"] = round(1000 * raw["wait_seconds"] / raw["waits"], 2) if raw["waits"] else None
+                teams[team] = team_stats
+            return {"max_size": self.size, "teams": teams}
+
+
+_pool: Optional[AgentPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> Optional[AgentPool]:
+    """Process-wide agent pool (None when disabled by settings)."""
+    global _pool
+    if not settings.agent_pool_enabled:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = AgentPool()
+        return _pool
+
+
+def reset_agent_pool() -> None:
+    """Drop the shared pool (tests)."""
+    global _pool
+    with _pool_lock:
+        _pool = None
@@ -7,26 +7,20 @@ from ..tools.support_tools import (
     TicketTool,
     TransactionHistoryTool,
 )
+from ..tools.metadata import describe_tools
+
+SUPPORT_TOOLS = (UserInfoTool, AccountStatusTool, TransactionHistoryTool, TicketTool)
+
 
 def create_support_description() -> Dict[str, Dict[str, Any]]:
-    """Create the Support agent description."""
-    user_info_tool = UserInfoTool()
-    account_status_tool = AccountStatusTool()
-    ticket_tool = TicketTool()
-    transaction_tool = TransactionHistoryTool()
-    
+    """Create the Support agent description (read from tool classes; no tool is instantiated)."""
     return {
         "title": "SUPPORT",
         "capabilities": (
             "Equipe especializada em coletar/validar informações do usuário e diagnosticar problemas, "
             "criando tickets quando necessário."
         ),
-        "tools": [
-            {"name": user_info_tool.name, "description": user_info_tool.description},
-            {"name": account_status_tool.name, "description": account_status_tool.description},
-            {"name": transaction_tool.name, "description": transaction_tool.description},
-            {"name": ticket_tool.name, "description": ticket_tool.description},
-        ]
+        "tools": describe_tools(SUPPORT_TOOLS),
     }
 
 
@@ -1,17 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 import warnings
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.agents.pool import get_agent_pool
 from src.api.models import MessageRequest, MessageResponse
+from src.config.settings import settings
+from src.flows.intent_router import get_intent_router
 from src.flows.main_flow import InfinitePayFlow
+from src.flows.plan_cache import get_plan_cache
+from src.rag.registry import vector_store_registry
+from src.tools.rag_tools import InfinitePayRAGTool
+from src.web.cache import get_page_cache
+from src.web.search_cache import get_search_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the shared embedding model and vector store before serving traffic,
+    # so the first /process call doesn't pay for it.
+    if settings.rag_warmup_on_startup:
+        await asyncio.to_thread(InfinitePayRAGTool)
+        print(f" RAG warm-up: {vector_store_registry.status()}")
+        # Intent centroids are embedded once, before the first /process
+        intent_router = await asyncio.to_thread(get_intent_router)
+        if intent_router is not None:
+            await asyncio.to_thread(intent_router.warm_up)
+    # Build the team agents once, so steps only check them out
+    agent_pool = get_agent_pool()
+    if agent_pool is not None and settings.agent_pool_warmup_on_startup:
+        await asyncio.to_thread(agent_pool.warm_up)
+        print(f" Agent pool warm-up: {agent_pool.stats()}")
+    yield
 
 
 app = FastAPI(
     title="InfinitePay Agent Swarm",
     description="Agent Swarm usando CrewAI para InfinitePay",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Suppress verbose Pydantic serialization warnings caused by 3rd-party objects (e.g., OpenAI/CrewAI)
@@ -69,6 +99,26 @@ async def health_check():
     return {"status": "healthy", "framework": "CrewAI"}
 
 
+@app.get("/stats")
+async def stats():
+    """Runtime status of shared resources (load status and timings)"""
+    page_cache = get_page_cache()
+    search_cache = get_search_cache()
+    agent_pool = get_agent_pool()
+    intent_router = get_intent_router(create=False)
+    plan_cache = get_plan_cache(create=False)
+    return {
+        "rag": vector_store_registry.status(),
+        "agents": agent_pool.stats() if agent_pool is not None else None,
+        "intent_router": intent_router.stats() if intent_router is not None else None,
+        "plan_cache": plan_cache.stats() if plan_cache is not None else None,
+        "web": {
+            "page_cache": page_cache.stats() if page_cache is not None else None,
+            "search_cache": search_cache.stats() if search_cache is not None else None,
+        },
+    }
+
+
 @app.get("/flow/plot")
 async def plot_flow():
     """Endpoint para visualizar o flow"""
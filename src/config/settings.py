@@ -12,6 +12,112 @@ class Settings(BaseSettings):
     # Optional OpenAI key (some environments set this)
     openai_api_key: str | None = None
 
+    # Plan execution: steps run as soon as the steps they depend on finish, at most this many at once
+    flow_max_parallel_steps: int = 4
+
+    # Agent pool (src/agents/pool.py): reusable team agents checked out per step
+    agent_pool_enabled: bool = True
+    agent_pool_size: int = 4  # agents per team
+    agent_pool_max_wait_seconds: float = 2.0  # then a temporary agent is built for the step
+    agent_pool_warmup_on_startup: bool = True
+
+    # Intent router (src/flows/intent_router.py): confidently classified messages skip the Manager LLM call
+    # Opt-in: the thresholds below are untuned defaults; set them from
+    # `python -m benchmarks.intent_router_benchmark --embeddings model` before enabling the router
+    intent_router_enabled: bool = False
+    intent_router_threshold: float = 0.6  # min cosine similarity to the intent centroid
+    intent_router_margin: float = 0.1  # min lead over the second-best intent
+    intent_router_audit_rate: float = 0.0  # share of fast-path requests also planned by the Manager to measure agreement
+
+    # Manager plan cache (src/flows/plan_cache.py): a near-identical message with the same history and numbers reuses a validated plan
+    plan_cache_enabled: bool = True
+    plan_cache_size: int = 1024
+    plan_cache_ttl_seconds: float = 3600.0
+    plan_cache_similarity: float = 0.95  # min cosine similarity to a cached message
+
+    # RAG knowledge base (shared process-wide by src.rag.registry)
+    rag_vector_store_path: str = "./data/vector_store"
+    rag_collection_name: str = "infinitepay_kb"
+    rag_embedding_model: str = "all-MiniLM-L6-v2"
+    # "torch" (SentenceTransformer) or "onnx" (exported model run with onnxruntime)
+    rag_embedding_backend: str = "torch"
+    rag_onnx_model_dir: str = "./data/onnx/all-MiniLM-L6-v2"
+    rag_onnx_quantized: bool = False
+    rag_warmup_on_startup: bool = True
+    rag_load_retry_seconds: float = 30.0  # a failed model/store load is retried after this long
+    # Prebuilt index artifact (python -m src.rag.artifact build); when set, the vector
+    # store and embedding model are served from it instead of rag_vector_store_path
+    rag_artifact_dir: str | None = None
+    rag_artifact_verify: bool = True  # check SHA-256 checksums at startup
+    rag_top_k: int = 3
+    # Vector store backend: "chroma" (PersistentClient) or "numpy" (memory-mapped exact search)
+    rag_vector_backend: str = "chroma"
+    # numpy backend only: stored dtype ("float32", "float16" or "int8") and exact float32 rescoring
+    rag_vector_dtype: str = "float32"
+    rag_vector_rescore: bool = True
+
+    # Hybrid retrieval: BM25 + vector results fused with reciprocal rank fusion
+    rag_hybrid_enabled: bool = True
+    rag_hybrid_candidates: int = 10
+    rag_rrf_k: int = 60
+    # Per-product shards (built by the indexer); queries search the fewest shards (at most
+    # rag_shard_max_routed) holding rag_shard_coverage of the routing probability, else everything
+    rag_sharding_enabled: bool = True
+    rag_shard_max_routed: int = 2
+    rag_shard_coverage: float = 0.8
+    rag_shard_temperature: float = 0.05  # softmax temperature over centroid cosine similarities
+
+    # Context compression of retrieved chunks before they reach the prompt
+    rag_max_distance: float | None = 1.5  # squared L2 on normalized embeddings (cosine >= 0.25)
+    rag_dedup_threshold: float = 0.8
+    rag_context_token_budget: int = 600
+
+    # Query embedding cache (in-memory LRU; set a path to also persist it in SQLite)
+    rag_query_cache_size: int = 1024
+    rag_query_cache_path: str | None = None
+
+    # Micro-batching of query embeddings across concurrent requests
+    rag_embedding_batching: bool = True
+    rag_embedding_batch_size: int = 32
+    rag_embedding_batch_wait_ms: float = 2.0
+
+    # Chunking (token counts of the embedding model's tokenizer)
+    rag_chunk_max_tokens: int = 200
+    rag_chunk_overlap_tokens: int = 40
+
+    # Knowledge-base ingestion (python -m src.rag.indexer)
+    rag_ingest_per_host_limit: int = 4
+    rag_ingest_url_timeout: float = 10.0
+    rag_ingest_deadline: float = 60.0
+    # A text block found on at least max(min_pages, min_ratio * pages) pages is boilerplate
+    rag_boilerplate_min_pages: int = 3
+    rag_boilerplate_min_ratio: float = 0.5
+
+    # HTML extraction (src/web/extract.py): "lxml" (falls back to "bs4" if missing) or "bs4"
+    web_html_parser: str = "lxml"
+    web_max_page_bytes: int = 2_000_000  # streamed bodies are cut here
+    # Main-content selectors tried in order by the web search tool (whole page if none match)
+    web_main_content_selectors: list[str] = ["main", "article", "[role=main]", "#content", "#main"]
+
+    # Web search tool: result pages are fetched concurrently within one overall deadline
+    web_search_page_timeout: float = 10.0
+    web_search_deadline: float = 12.0
+    web_search_per_host_limit: int = 2
+    # Only the best-matching passages of each page are returned, within one size budget
+    web_search_passages_per_page: int = 3
+    web_search_char_budget: int = 6000
+    web_search_semantic_ranking: bool = True  # fuse BM25 with the shared embedder when it's loaded
+    # Results per normalized query are reused for the TTL; identical concurrent searches run once
+    web_search_cache_enabled: bool = True
+    web_search_cache_size: int = 256
+    web_search_cache_ttl_seconds: float = 300.0
+
+    # Fetched-page cache (web search + ingestion): fresh for the TTL, then revalidated with ETag/Last-Modified
+    web_cache_enabled: bool = True
+    web_cache_size: int = 512
+    web_cache_ttl_seconds: float = 3600.0
+    web_cache_path: str | None = None  # SQLite file; None -> memory only
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
 
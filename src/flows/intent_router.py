@@ -0,0 +1,289 @@
+"""Embedding fast path in front of the Manager's plan.
+
+Most messages are plainly one intent ("qual a taxa da maquininha?", "quero falar
+com um humano") and don't need an LLM round-trip to be planned. The router embeds
+the message with the shared embedding model and compares it with the centroid of
+each intent's labeled examples; when the best intent is similar enough
+(``intent_router_threshold``) and clearly ahead of the runner-up
+(``intent_router_margin``), its canned plan is used and the Manager is skipped.
+Anything else falls back to the Manager.
+
+The router is opt-in (``intent_router_enabled`` defaults to False): the default
+threshold and margin have not been tuned against the real model, so enable it
+only after ``benchmarks.intent_router_benchmark`` shows a near-zero
+false-fast-path rate for the chosen values.
+
+Stats report how many requests took the fast path, the routing latency, the
+latency saved (against the Manager's measured average) and, when
+``intent_router_audit_rate`` > 0, how often the Manager agreed with a fast-path
+decision it was asked to re-plan in the background.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.config.settings import settings
+from src.flows.state import Step
+from src.rag.embedding_cache import normalize_query
+
+
+@dataclass
+class Intent:
+    name: str
+    examples: List[str]
+    # (team, task template); templates may use {message} and {user_id}
+    steps: List[Tuple[str, str]]
+
+    @property
+    def teams(self) -> List[str]:
+        return [team for team, _ in self.steps]
+
+
+INTENTS: List[Intent] = [
+    Intent(
+        name="product_info",
+        examples=[
+            "qual a taxa da maquininha?",
+            "quanto custa a maquininha smart",
+            "quais as taxas no crédito parcelado",
+            "qual a taxa do pix parcelado",
+            "como funciona o tap to pay",
+            "quanto rende o saldo da conta digital",
+            "o cartão da infinitepay tem anuidade?",
+            "quanto custa emitir um boleto",
+            "como funciona o empréstimo da infinitepay",
+            "em quanto tempo recebo o dinheiro das vendas",
+        ],
+        steps=[
+            (
+                "KNOWLEDGE",
+                "Responda à dúvida do usuário sobre produtos, taxas e serviços da InfinitePay. "
+                "Pergunta do usuário: {message}",
+            )
+        ],
+    ),
+    Intent(
+        name="account_support",
+        examples=[
+            "não consigo acessar minha conta",
+            "minha conta está bloqueada",
+            "meu pix não caiu na conta",
+            "a transferência que fiz não chegou",
+            "não consigo fazer login no aplicativo",
+            "meu pagamento foi recusado",
+            "minha maquininha não está funcionando",
+        ],
+        steps=[
+            (
+                "SUPPORT",
+                "Diagnostique o problema relatado pelo usuário (ID: {user_id}) consultando seus dados, "
+                "o status da conta e as transações, e abra um ticket se necessário. Mensagem do usuário: {message}",
+            )
+        ],
+    ),
+    Intent(
+        name="human_handoff",
+        examples=[
+            "quero falar com um humano",
+            "me transfere para um atendente",
+            "quero falar com uma pessoa de verdade",
+            "preciso de atendimento humano",
+            "chama alguém do suporte para falar comigo",
+            "não quero falar com robô",
+        ],
+        steps=[
+            (
+                "ESCALATION",
+                "O usuário (ID: {user_id}) pediu atendimento humano. Encaminhe a solicitação ao time de "
+                "atendimento e informe o próximo passo. Mensagem do usuário: {message}",
+            )
+        ],
+    ),
+    Intent(
+        name="greeting",
+        examples=["oi", "olá, tudo bem?", "bom dia", "boa tarde", "obrigado pela ajuda", "valeu, era só isso", "tchau"],
+        steps=[
+            (
+                "GENERAL",
+                "Responda brevemente à saudação ou agradecimento do usuário e ofereça ajuda com os produtos "
+                "e serviços da InfinitePay. Mensagem do usuário: {message}",
+            )
+        ],
+    ),
+]
+
+
+def _unit_rows(vectors: Any) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+@dataclass
+class Route:
+    intent: Intent
+    score: float
+    margin: float
+    seconds: float
+
+    def plan(self, message: str, user_id: str = "") -> List[Step]:
+        return [
+            Step(agent=team, agent_task=task.format(message=message, user_id=user_id or "não informado"))
+            for team, task in self.intent.steps
+        ]
+
+
+@dataclass
+class _Stats:
+    routed: int = 0
+    fallback: int = 0
+    route_seconds: float = 0.0
+    fast_route_seconds: float = 0.0
+    manager_calls: int = 0
+    manager_seconds: float = 0.0
+    audited: int = 0
+    agreed: int = 0
+    by_intent: Dict[str, int] = field(default_factory=dict)
+
+
+class IntentRouter:
+    """Nearest intent centroid for a message, if it is a confident match."""
+
+    def __init__(
+        self,
+        embeddings: Any,
+        intents: Optional[Sequence[Intent]] = None,
+        threshold: Optional[float] = None,
+        margin: Optional[float] = None,
+        audit_rate: Optional[float] = None,
+        query_cache: Any = None,
+    ):
+        self.embeddings = embeddings
+        self.intents = list(INTENTS if intents is None else intents)
+        self.threshold = settings.intent_router_threshold if threshold is None else threshold
+        self.margin = settings.intent_router_margin if margin is None else margin
+        self.audit_rate = settings.intent_router_audit_rate if audit_rate is None else audit_rate
+        self.query_cache = query_cache
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        self._audits: Set[Any] = set()
+
+    def warm_up(self) -> None:
+        """Embed the labeled examples (once) and build the intent centroids."""
+        with self._lock:
+            if self._centroids is not None:
+                return
+            examples = [normalize_query(e) for intent in self.intents for e in intent.examples]
+            vectors = _unit_rows(self.embeddings.encode(examples))
+            centroids, start = [], 0
+            for intent in self.intents:
+                centroids.append(vectors[start : start + len(intent.examples)].mean(axis=0))
+                start += len(intent.examples)
+            self._centroids = _unit_rows(centroids)
+
+    def _embed(self, message: str) -> np.ndarray:
+        if self.query_cache is not None:
+            return _unit_rows(self.query_cache.embed(message, self.embeddings))[0]
+        return _unit_rows(self.embeddings.encode([normalize_query(message)]))[0]
+
+    def scores(self, message: str) -> List[Tuple[Intent, float]]:
+        """Cosine similarity of the message to every intent centroid, best first."""
+        self.warm_up()
+        similarities = self._centroids @ self._embed(message)
+        return sorted(zip(self.intents, (float(s) for s in similarities)), key=lambda item: -item[1])
+
+    def route(self, message: str) -> Optional[Route]:
+        """The confident intent of ``message``, or None to let the Manager plan."""
+        started = time.perf_counter()
+        ranked = self.scores(message)
+        best, score = ranked[0]
+        margin = score - ranked[1][1] if len(ranked) > 1 else score
+        elapsed = time.perf_counter() - started
+        confident = bool(message.strip()) and score >= self.threshold and margin >= self.margin
+        with self._lock:
+            self._stats.route_seconds += elapsed
+            if not confident:
+                self._stats.fallback += 1
+                return None
+            self._stats.routed += 1
+            self._stats.fast_route_seconds += elapsed
+            self._stats.by_intent[best.name] = self._stats.by_intent.get(best.name, 0) + 1
+        return Route(intent=best, score=score, margin=margin, seconds=elapsed)
+
+    def record_manager(self, seconds: float) -> None:
+        """Latency of a Manager plan (the cost a fast path saves)."""
+        with self._lock:
+            self._stats.manager_calls += 1
+            self._stats.manager_seconds += seconds
+
+    def should_audit(self) -> bool:
+        return self.audit_rate > 0 and random.random() < self.audit_rate
+
+    def track(self, task: Any) -> None:
+        """Keep a background audit alive until it finishes."""
+        self._audits.add(task)
+        task.add_done_callback(self._audits.discard)
+
+    def record_audit(self, route: Route, manager_teams: Sequence[str]) -> None:
+        """Compare a fast-path decision with the teams the Manager planned for the same message."""
+        with self._lock:
+            self._stats.audited += 1
+            if sorted(manager_teams) == sorted(route.intent.teams):
+                self._stats.agreed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = self._stats
+            requests = s.routed + s.fallback
+            avg_manager = s.manager_seconds / s.manager_calls if s.manager_calls else None
+            saved = s.routed * avg_manager - s.fast_route_seconds if avg_manager is not None else None
+            return {
+                "requests": requests,
+                "fast_path": s.routed,
+                "fallback": s.fallback,
+                "fast_path_rate": round(s.routed / requests, 4) if requests else None,
+                "by_intent": dict(s.by_intent),
+                "avg_route_ms": round(1000 * s.route_seconds / requests, 2) if requests else None,
+                "avg_manager_ms": round(1000 * avg_manager, 2) if avg_manager is not None else None,
+                "latency_saved_seconds": round(saved, 3) if saved is not None else None,
+                "audited": s.audited,
+                "audit_agreement": round(s.agreed / s.audited, 4) if s.audited else None,
+            }
+
+
+_router: Optional[IntentRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router(create: bool = True) -> Optional[IntentRouter]:
+    """Process-wide router on the shared embedding model (None if disabled or the model is unavailable).
+
+    ``create=False`` only returns a router that already exists (never loads the model).
+    """
+    global _router
+    if not settings.intent_router_enabled:
+        return None
+    with _router_lock:
+        if _router is None and create:
+            from src.rag.registry import vector_store_registry
+
+            embeddings = vector_store_registry.get_embeddings()
+            if embeddings is None:
+                return None
+            _router = IntentRouter(
+                vector_store_registry.get_embedding_service() or embeddings,
+                query_cache=vector_store_registry.get_query_cache(),
+            )
+        return _router
+
+
+def reset_intent_router() -> None:
+    """Drop the shared router (tests)."""
+    global _router
+    with _router_lock:
+        _router = None
@@ -1,28 +1,38 @@
+import asyncio
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 
 from crewai.flow.flow import Flow, start, listen, router
 from crewai import Agent
 
+from src.config.settings import settings
+from src.flows.intent_router import IntentRouter, Route, get_intent_router
+from src.flows.plan import run_plan
+from src.flows.plan_cache import get_plan_cache
 from src.flows.state import InfinitePayState, PlannedSteps, Step
 from src.agents import (
-    create_knowledge_agent,
     build_knowledge_prompt,
-    create_support_agent,
     build_support_prompt,
-    create_general_agent,
     build_general_prompt,
     create_manager_agent,
     build_manager_prompt,
-    create_escalation_agent,
     build_escalation_prompt,
 )
+from src.agents.pool import TEAM_FACTORIES, get_agent_pool
 from src.guardrails.policy import (
     check_user_message_guardrails,
     sanitize_output,
 )
 
+TEAM_PROMPTS = {
+    "KNOWLEDGE": build_knowledge_prompt,
+    "SUPPORT": build_support_prompt,
+    "GENERAL": build_general_prompt,
+    "ESCALATION": build_escalation_prompt,
+}
+
 
 class InfinitePayFlow(Flow[InfinitePayState]):
 
@@ -82,12 +92,60 @@ class InfinitePayFlow(Flow[InfinitePayState]):
             history=self.state.conversation_history,
         )
 
+        # Fast path: intenção clara -> plano pronto, sem chamar o Manager.
+        # Mensagens com histórico podem depender do contexto e sempre vão ao Manager.
+        # O primeiro acesso carrega o modelo de embeddings: fora do event loop.
+        intent_router = await asyncio.to_thread(get_intent_router)
+        route = None
+        if intent_router is not None and not self.state.conversation_history:
+            try:
+                route = await asyncio.to_thread(intent_router.route, self.state.message)
+            except Exception as e:
+                print(f" Roteador de intenção indisponível: {e}")
+        if route is not None:
+            self.state.planned_steps = route.plan(self.state.message, self.state.user_id)
+            if intent_router.should_audit():
+                intent_router.track(asyncio.ensure_future(self._audit_route(intent_router, route, classification_prompt)))
+            self.state.finished_steps = []
+            self.state.processing_time += time.time() - start_plan
+            print(f" Plano rápido: {route.intent.name} (similaridade {route.score:.2f})")
+            return "execute_next_step"
+
+        # Mensagem quase idêntica (mesmo histórico e mesmos números) reaproveita um plano já validado
+        plan_cache = await asyncio.to_thread(get_plan_cache)
+        cached_steps = None
+        if plan_cache is not None:
+            try:
+                cached_steps = await asyncio.to_thread(
+                    plan_cache.get, self.state.message, self.state.conversation_history
+                )
+            except Exception as e:
+                print(f" Cache de planos indisponível: {e}")
+        if cached_steps is not None:
+            self.state.planned_steps = cached_steps
+            self.state.finished_steps = []
+            self.state.processing_time += time.time() - start_plan
+            print(f" Plano reutilizado do cache com {len(cached_steps)} passos")
+            return "execute_next_step"
+
+        manager_start = time.time()
         manager_agent = create_manager_agent()
         agent_response = await manager_agent.kickoff_async(
             messages=classification_prompt,
             response_format=PlannedSteps,
         )
         self.state.planned_steps = agent_response.pydantic.steps
+        manager_seconds = time.time() - manager_start
+        if intent_router is not None:
+            intent_router.record_manager(manager_seconds)
+        if plan_cache is not None:
+            plan_cache.record_manager(manager_seconds)
+            try:
+                await asyncio.to_thread(
+                    plan_cache.put, self.state.message, self.state.conversation_history, self.state.planned_steps
+                )
+            except Exception as e:
+                print(f" Cache de planos indisponível: {e}")
 
         self.state.finished_steps = []
         self.state.processing_time += time.time() - start_plan
@@ -95,45 +153,60 @@ class InfinitePayFlow(Flow[InfinitePayState]):
         print(f" Plano criado com {len(self.state.planned_steps)} passos")
         return "execute_next_step"
 
+    async def _audit_route(self, intent_router: IntentRouter, route: Route, classification_prompt: str) -> None:
+        """Planeja em segundo plano com o Manager para medir a concordância do fast path"""
+        try:
+            agent_response = await create_manager_agent().kickoff_async(
+                messages=classification_prompt,
+                response_format=PlannedSteps,
+            )
+            intent_router.record_audit(route, [step.agent for step in agent_response.pydantic.steps])
+        except Exception as e:
+            print(f" Auditoria do roteador falhou: {e}")
+
     @router("execute_next_step")
     async def execute_next_step_func(self) -> str:
-        """Executa o próximo passo do plano e atualiza finished_steps"""
-        if not self.state.planned_steps:
-            # Todas as etapas concluídas
+        """Executa o plano: cada passo começa assim que os passos de que depende terminam"""
+        steps = list(self.state.planned_steps)
+        self.state.planned_steps = []
+        if not steps:
             return "apply_personality"
 
-        # Retira o próximo passo
-        step = self.state.planned_steps.pop(0)
-        step_agent = step.agent
-        step_agent_task = step.agent_task
-        print(f" Executando passo: {step_agent}:{step_agent_task}")
-
         exec_start = time.time()
-        result_raw = ""
+        results = await run_plan(steps, self._run_step, max_parallel=settings.flow_max_parallel_steps)
 
-        agent, prompt = self._create_agent_and_task(agent=step_agent, task=step_agent_task)
-        if agent:
-            try:
-                result = await agent.kickoff_async(messages=prompt)
-            except Exception:
-                result = agent.kickoff(messages=prompt)
-            result_raw = getattr(result, "raw", str(result))
-
-        # Atualiza estado com o resultado mais recente
-        self.state.raw_response = sanitize_output(result_raw)
+        # finished_steps segue a ordem do plano, não a ordem de conclusão
+        for step, result in zip(steps, results):
+            self.state.finished_steps.append(
+                {
+                    "agent": step.agent,
+                    "agent_task": step.agent_task,
+                    "status": "done",
+                    "result": result,
+                }
+            )
+        self.state.raw_response = results[-1]
         self.state.processing_time += time.time() - exec_start
+        return "apply_personality"
 
-        self.state.finished_steps.append(
-            {
-                "agent": step_agent,
-                "agent_task": step_agent_task,
-                "status": "done",
-                "result": self.state.raw_response,
-            }
-        )
+    async def _run_step(self, index: int, step: Step, dependency_results: Dict[int, str]) -> str:
+        """Executa um passo, repassando ao agente os resultados dos passos de que depende"""
+        step_agent_task = step.agent_task
+        if dependency_results:
+            context = "\n".join(f"- Passo {dep}: {result}" for dep, result in dependency_results.items())
+            step_agent_task += f"\n\nResultados dos passos anteriores:\n{context}"
+        print(f" Executando passo {index}: {step.agent}:{step.agent_task}")
 
-        # Continua para o próximo passo (se houver)
-        return "execute_next_step" if self.state.planned_steps else "apply_personality"
+        async with self._checkout_agent_and_task(step.agent, step_agent_task) as created:
+            if not created:
+                return ""
+            agent, prompt = created
+            try:
+                result = await agent.kickoff_async(messages=prompt)
+            except Exception:
+                # Sync fallback off the event loop so parallel steps keep running
+                result = await asyncio.to_thread(agent.kickoff, messages=prompt)
+        return sanitize_output(getattr(result, "raw", str(result)))
 
     @router("apply_personality")
     async def apply_personality_layer(self) -> str:
@@ -160,8 +233,8 @@ class InfinitePayFlow(Flow[InfinitePayState]):
         ### Tom
         Use tom amigável, seja claro e termine perguntando se há mais dúvidas.
         """
-        agent, prompt = self._create_agent_and_task("GENERAL", personality_prompt)
-        agent_response = await agent.kickoff_async(messages=prompt)
+        async with self._checkout_agent_and_task("GENERAL", personality_prompt) as (agent, prompt):
+            agent_response = await agent.kickoff_async(messages=prompt)
         self.state.final_response = sanitize_output(agent_response.raw)
 
         print(f" Processamento concluído em {self.state.processing_time:.2f}s")
@@ -176,16 +249,26 @@ class InfinitePayFlow(Flow[InfinitePayState]):
             "processing_time": self.state.processing_time,
         }
 
+    @asynccontextmanager
+    async def _checkout_agent_and_task(self, agent: str, task: str):
+        """Agente da equipe e seu prompt; com o pool habilitado, o agente é emprestado do pool.
+
+        O pool só substitui as fábricas padrão: se ``_create_agent_and_task`` foi
+        sobrescrito (subclasse ou teste), os agentes continuam vindo dele.
+        """
+        pool = get_agent_pool()
+        custom_agents = getattr(self._create_agent_and_task, "__func__", None) is not _default_create_agent_and_task
+        if pool is None or custom_agents or agent not in pool.teams:
+            yield self._create_agent_and_task(agent, task)
+            return
+        async with pool.checkout(agent) as instance:
+            yield instance, TEAM_PROMPTS[agent](task)
+
     def _create_agent_and_task(self, agent: str, task: str) -> Agent|Tuple[Agent, str]:
         """Helper para criar agentes"""
-        
-        if agent == "KNOWLEDGE":
-            return create_knowledge_agent(), build_knowledge_prompt(task)
-        elif agent == "SUPPORT":
-            return create_support_agent(), build_support_prompt(task)
-        elif agent == "GENERAL":
-            return create_general_agent(), build_general_prompt(task)
-        elif agent == "ESCALATION":
-            return create_escalation_agent(), build_escalation_prompt(task)
-        else:
+        if agent not in TEAM_FACTORIES:
             return None
+        return TEAM_FACTORIES[agent](), TEAM_PROMPTS[agent](task)
+
+
+_default_create_agent_and_task = InfinitePayFlow._create_agent_and_task
@@ -0,0 +1,62 @@
+"""Dependency-aware execution of a manager plan.
+
+Each step may list the (0-based) indices of earlier steps it needs in
+``depends_on``; every step starts as soon as those finish, so independent teams
+run concurrently instead of one after another. Only references to *earlier*
+steps are honoured, which keeps the plan acyclic by construction.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+
+def step_dependencies(steps: Sequence[Any]) -> List[List[int]]:
+    """Valid dependencies of each step: earlier indices only, deduplicated and sorted."""
+    dependencies = []
+    for index, step in enumerate(steps):
+        raw = getattr(step, "depends_on", None)
+        if raw is None and isinstance(step, dict):
+            raw = step.get("depends_on")
+        valid = set()
+        for dep in raw or ():
+            try:
+                dep = int(dep)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= dep < index:
+                valid.add(dep)
+        dependencies.append(sorted(valid))
+    return dependencies
+
+
+async def run_plan(
+    steps: Sequence[Any],
+    run_step: Callable[[int, Any, Dict[int, Any]], Awaitable[Any]],
+    max_parallel: int,
+) -> List[Any]:
+    """Run ``run_step(index, step, {dep_index: dep_result})`` for every step.
+
+    At most ``max_parallel`` steps run at once. Results come back in plan order,
+    whatever order the steps finished in. ``run_step`` is expected to handle its
+    own errors; a step still starts after a dependency that raised.
+    """
+    dependencies = step_dependencies(steps)
+    results: List[Any] = [None] * len(steps)
+    finished = [asyncio.Event() for _ in steps]
+    slots = asyncio.Semaphore(max(1, max_parallel))
+
+    async def run(index: int) -> None:
+        try:
+            for dep in dependencies[index]:
+                await finished[dep].wait()
+            async with slots:
+                results[index] = await run_step(
+                    index, steps[index], {dep: results[dep] for dep in dependencies[index]}
+                )
+        finally:
+            finished[index].set()
+
+    outcomes = await asyncio.gather(*(run(i) for i in range(len(steps))), return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return results
@@ -0,0 +1,299 @@
+"""Semantic cache of the Manager's plans.
+
+Near-identical messages ("qual a taxa do débito?" / "Qual é a taxa no débito?")
+get the same plan, so a validated plan is stored under the message embedding and
+a fingerprint of the conversation history. A later message with the same history
+whose embedding is at least ``plan_cache_similarity`` (cosine) to a stored one
+reuses that plan instead of calling the Manager.
+
+The Manager's tasks quote the message, so a near-miss must not hand one request's
+details to another:
+
+- the numbers and IDs in both messages ("pix 48213", "R$ 1.500,00") must match
+  exactly before a hit counts;
+- a plan is stored as a template, like the intent router's canned plans: the
+  message quoted in a task becomes ``{message}`` (a task that does not quote it
+  gets "Mensagem do usuário: {message}" appended), and each hit rebuilds the
+  tasks from the current message.
+
+Lookups are approximate: entries are bucketed by a random-hyperplane (LSH)
+signature of their embedding and only the buckets within a small Hamming distance
+of the message's signature are compared exactly. The cache holds at most
+``plan_cache_size`` plans (least recently used evicted) for
+``plan_cache_ttl_seconds``. Only plans whose every step names a known team and
+has a task are stored, and each hit returns fresh ``Step`` copies.
+"""
+import hashlib
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.config.settings import settings
+from src.flows.plan import step_dependencies
+from src.flows.state import Step
+from src.rag.bm25 import tokenize
+from src.rag.embedding_cache import normalize_query
+
+# Signature bits and how many of them may differ for a bucket to be probed
+# (1 + 8 + 28 = 37 of the 256 buckets per lookup)
+_LSH_BITS = 8
+_LSH_PROBE_RADIUS = 2
+
+
+def history_fingerprint(history: Optional[Sequence[Dict[str, Any]]]) -> str:
+    """Stable hash of the conversation history ("" when there is none)."""
+    if not history:
+        return ""
+    payload = json.dumps(list(history), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def message_specifics(message: str) -> Tuple[str, ...]:
+    """The numbers and IDs in ``message`` (every term with a digit), sorted."""
+    return tuple(sorted(term for term in tokenize(message) if any(c.isdigit() for c in term)))
+
+
+def task_template(task: str, message: str) -> str:
+    """``task`` with the quoted ``message`` replaced by ``{message}`` (appended when not quoted)."""
+    template = task.replace("{", "{{").replace("}", "}}")
+    quoted = message.strip().replace("{", "{{").replace("}", "}}")
+    if quoted and quoted in template:
+        return template.replace(quoted, "{message}")
+    return template + "\n\nMensagem do usuário: {message}"
+
+
+def validate_plan(steps: Sequence[Any], teams: Sequence[str]) -> Optional[Tuple[Dict[str, Any], ...]]:
+    """The plan as plain dicts if every step is usable, else None (never cached)."""
+    if not steps:
+        return None
+    plan = []
+    for step, depends_on in zip(steps, step_dependencies(steps)):
+        agent = getattr(step, "agent", None)
+        task = getattr(step, "agent_task", None)
+        if agent not in teams or not isinstance(task, str) or not task.strip():
+            return None
+        plan.append({"agent": agent, "agent_task": task, "depends_on": depends_on})
+    return tuple(plan)
+
+
+def _unit(vector: Any) -> Optional[np.ndarray]:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else None
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray
+    bucket: Tuple[str, Tuple[str, ...], int]
+    templates: Tuple[Dict[str, Any], ...]
+    expires_at: float
+
+
+class PlanCache:
+    """LRU + TTL cache of validated plan templates, looked up by embedding similarity."""
+
+    def __init__(
+        self,
+        embeddings: Any,
+        teams: Sequence[str],
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        similarity: Optional[float] = None,
+        query_cache: Any = None,
+    ):
+        self.embeddings = embeddings
+        self.teams = tuple(teams)
+        self.max_size = max(1, settings.plan_cache_size if max_size is None else max_size)
+        self.ttl = settings.plan_cache_ttl_seconds if ttl is None else ttl
+        self.similarity = settings.plan_cache_similarity if similarity is None else similarity
+        self.query_cache = query_cache
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, Tuple[str, ...], int], Set[int]] = {}
+        self._planes: Optional[np.ndarray] = None  # drawn on the first embedding, seeded
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "rejected": 0,
+            "evictions": 0,
+            "expired": 0,
+            "compared": 0,
+            "lookup_seconds": 0.0,
+            "manager_calls": 0,
+            "manager_seconds": 0.0,
+        }
+
+    def _embed(self, message: str) -> Optional[np.ndarray]:
+        if self.query_cache is not None:
+            return _unit(self.query_cache.embed(message, self.embeddings))
+        return _unit(self.embeddings.encode([normalize_query(message)])[0])
+
+    def _signature(self, vector: np.ndarray) -> int:
+        if self._planes is None:
+            self._planes = np.random.default_rng(0).standard_normal((_LSH_BITS, vector.shape[0])).astype(np.float32)
+        return int(sum(1 << i for i, bit in enumerate(self._planes @ vector > 0) if bit))
+
+    @staticmethod
+    def _probes(signature: int) -> Iterator[int]:
+        yield signature
+        for radius in range(1, _LSH_PROBE_RADIUS + 1):
+            for bits in itertools.combinations(range(_LSH_BITS), radius):
+                yield signature ^ sum(1 << b for b in bits)
+
+    def _drop(self, key: int) -> None:
+        entry = self._entries.pop(key)
+        ids = self._buckets.get(entry.bucket)
+        if ids is not None:
+            ids.discard(key)
+            if not ids:
+                del self._buckets[entry.bucket]
+
+    def _nearest(
+        self, vector: np.ndarray, fingerprint: str, specifics: Tuple[str, ...], now: float
+    ) -> Tuple[Optional[int], float]:
+        """Closest live entry with the same history and specifics among the probed buckets."""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            self._drop(key)
+            self._stats["expired"] += 1
+        signature = self._signature(vector)
+        keys = []
+        for probe in self._probes(signature):
+            for key in list(self._buckets.get((fingerprint, specifics, probe), ())):
+                if self._entries[key].expires_at <= now:
+                    self._drop(key)
+                    self._stats["expired"] += 1
+                else:
+                    keys.append(key)
+        if not keys:
+            return None, 0.0
+        self._stats["compared"] += len(keys)
+        similarities = np.stack([self._entries[k].vector for k in keys]) @ vector
+        best = int(np.argmax(similarities))
+        return keys[best], float(similarities[best])
+
+    def get(self, message: str, history: Optional[Sequence[Dict[str, Any]]] = None) -> Optional[List[Step]]:
+        """A cached plan, rebuilt for ``message``, from a message close enough to it, or None."""
+        started = time.perf_counter()
+        vector = self._embed(message)
+        with self._lock:
+            key, similarity = (None, 0.0) if vector is None else self._nearest(
+                vector, history_fingerprint(history), message_specifics(message), time.monotonic()
+            )
+            self._stats["lookup_seconds"] += time.perf_counter() - started
+            if key is None or similarity < self.similarity:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._entries.move_to_end(key)
+            templates = self._entries[key].templates
+        return [
+            Step(agent=s["agent"], agent_task=s["template"].format(message=message), depends_on=list(s["depends_on"]))
+            for s in templates
+        ]
+
+    def put(self, message: str, history: Optional[Sequence[Dict[str, Any]]], steps: Sequence[Any]) -> bool:
+        """Store the Manager's plan for ``message`` if it validates; returns whether it was stored."""
+        plan = validate_plan(steps, self.teams)
+        vector = self._embed(message) if plan is not None else None
+        with self._lock:
+            if plan is None or vector is None:
+                self._stats["rejected"] += 1
+                return False
+            templates = tuple(
+                {"agent": s["agent"], "template": task_template(s["agent_task"], message), "depends_on": s["depends_on"]}
+                for s in plan
+            )
+            fingerprint, specifics = history_fingerprint(history), message_specifics(message)
+            now = time.monotonic()
+            key, similarity = self._nearest(vector, fingerprint, specifics, now)
+            if key is not None and similarity >= self.similarity:
+                self._drop(key)  # replaced by the fresher plan
+            bucket = (fingerprint, specifics, self._signature(vector))
+            self._entries[self._next_id] = _Entry(vector, bucket, templates, now + self.ttl)
+            self._buckets.setdefault(bucket, set()).add(self._next_id)
+            self._next_id += 1
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return True
+
+    def record_manager(self, seconds: float) -> None:
+        """Latency of a Manager plan (what every hit saves)."""
+        with self._lock:
+            self._stats["manager_calls"] += 1
+            self._stats["manager_seconds"] += seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            size = len(self._entries)
+        lookups = s["hits"] + s["misses"]
+        avg_manager = s["manager_seconds"] / s["manager_calls"] if s["manager_calls"] else None
+        return {
+            "size": size,
+            "hits": s["hits"],
+            "misses": s["misses"],
+            "hit_rate": round(s["hits"] / lookups, 4) if lookups else None,
+            "stores": s["stores"],
+            "rejected": s["rejected"],
+            "evictions": s["evictions"],
+            "expired": s["expired"],
+            "avg_compared": round(s["compared"] / lookups, 2) if lookups else None,
+            "avg_lookup_ms": round(1000 * s["lookup_seconds"] / lookups, 3) if lookups else None,
+            "avg_manager_ms": round(1000 * avg_manager, 2) if avg_manager is not None else None,
+            "latency_saved_seconds": round(s["hits"] * avg_manager, 3) if avg_manager is not None else None,
+        }
+
+
+_cache: Optional[PlanCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_plan_cache(create: bool = True) -> Optional[PlanCache]:
+    """Process-wide plan cache on the shared embedding model (None if disabled or the model is unavailable).
+
+    ``create=False`` only returns a cache that already exists (never loads the model).
+    """
+    global _cache
+    if not settings.plan_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None and create:
+            # Imported here: the agent modules pull in crewai
+            from src.agents.pool import TEAM_FACTORIES
+            from src.rag.registry import vector_store_registry
+
+            embeddings = vector_store_registry.get_embeddings()
+            if embeddings is None:
+                return None
+            _cache = PlanCache(
+                vector_store_registry.get_embedding_service() or embeddings,
+                teams=list(TEAM_FACTORIES),
+                query_cache=vector_store_registry.get_query_cache(),
+            )
+        return _cache
+
+
+def reset_plan_cache() -> None:
+    """Drop the shared plan cache (tests)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
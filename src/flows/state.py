@@ -8,6 +8,10 @@ from datetime import datetime
 class Step(BaseModel):
     agent: str = Field(..., description="The agent that will perform the step")
     agent_task: str = Field(..., description="The task that will be performed")
+    depends_on: List[int] = Field(
+        default_factory=list,
+        description="0-based indices of earlier steps whose results this step needs; steps without dependencies run in parallel",
+    )
 
 class PlannedSteps(BaseModel):
     steps: List[Step] = Field(..., description="The steps planned to process the query")
@@ -0,0 +1 @@
+# rag package
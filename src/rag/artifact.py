@@ -0,0 +1,237 @@
+"""Prebuilt, versioned index artifacts.
+
+An artifact is a directory produced at image build time that holds everything
+the RAG tool needs to serve without scraping or downloading anything:
+
+    artifact.json   version, model, embedding and vector backends, SHA-256s
+    index/          the vector store (collection, manifest, BM25 index, shards)
+    model/          the embedding model files (SentenceTransformer or ONNX export)
+
+The service opens it read-only at startup (``RAG_ARTIFACT_DIR``), after checking
+the checksums. The ``numpy`` backend is memory-mapped in place; Chroma needs a
+writable directory, so its files are copied to a temporary one first.
+
+Usage:
+    python -m src.rag.artifact build --output ./artifact [--store ./data/vector_store] [--version 2024.06.1]
+    python -m src.rag.artifact verify ./artifact
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from src.config.settings import settings
+
+FORMAT_VERSION = 1
+ARTIFACT_FILENAME = "artifact.json"
+INDEX_DIR = "index"
+MODEL_DIR = "model"
+_CHUNK_SIZE = 1 << 20
+
+
+class ArtifactError(ValueError):
+    """The artifact is missing, incomplete, corrupted or incompatible with the settings."""
+
+
+@dataclass
+class IndexArtifact:
+    path: str
+    version: str
+    embedding_model: str
+    embedding_backend: str
+    onnx_quantized: bool
+    vector_backend: str
+    vector_dtype: str
+    files: int
+    has_model: bool
+    load_seconds: float = 0.0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def index_dir(self) -> str:
+        return os.path.join(self.path, INDEX_DIR)
+
+    @property
+    def model_dir(self) -> Optional[str]:
+        return os.path.join(self.path, MODEL_DIR) if self.has_model else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "version": self.version,
+            "built_at": self.metadata.get("built_at"),
+            "embedding_model": self.embedding_model,
+            "embedding_backend": self.embedding_backend,
+            "onnx_quantized": self.onnx_quantized,
+            "vector_backend": self.vector_backend,
+            "vector_dtype": self.vector_dtype,
+            "files": self.files,
+            "load_seconds": round(self.load_seconds, 4),
+        }
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_checksums(root: str) -> Dict[str, Dict[str, Any]]:
+    """``{relative path: {"sha256", "bytes"}}`` for every file under ``root`` (except the descriptor)."""
+    checksums = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            full = os.path.join(directory, name)
+            relative = os.path.relpath(full, root).replace(os.sep, "/")
+            if relative == ARTIFACT_FILENAME or name.endswith(".tmp"):
+                continue
+            checksums[relative] = {"sha256": sha256_file(full), "bytes": os.path.getsize(full)}
+    return dict(sorted(checksums.items()))
+
+
+def _onnx_quantized() -> bool:
+    """Whether the configured embeddings are the int8 ONNX export (vectors differ from fp32)."""
+    return settings.rag_embedding_backend == "onnx" and settings.rag_onnx_quantized
+
+
+def _export_model(output_dir: str) -> None:
+    if settings.rag_embedding_backend == "onnx":
+        shutil.copytree(settings.rag_onnx_model_dir, output_dir)
+        return
+    from sentence_transformers import SentenceTransformer  # type: ignore
+
+    SentenceTransformer(settings.rag_embedding_model).save(output_dir)
+
+
+def build_artifact(
+    output_dir: str,
+    store_path: Optional[str] = None,
+    version: Optional[str] = None,
+    include_model: bool = True,
+) -> Dict[str, Any]:
+    """Copy the built vector store (and the embedding model) into ``output_dir`` and describe it."""
+    from src.rag.indexer import load_manifest
+
+    store_path = store_path or settings.rag_vector_store_path
+    manifest = load_manifest(store_path)
+    if not manifest:
+        raise ArtifactError(f"No index manifest in {store_path}; build it with `python -m src.rag.indexer`")
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    shutil.copytree(store_path, os.path.join(output_dir, INDEX_DIR), ignore=shutil.ignore_patterns("*.tmp"))
+    if include_model:
+        _export_model(os.path.join(output_dir, MODEL_DIR))
+
+    files = file_checksums(output_dir)
+    content = hashlib.sha256("".join(f"{p}:{f['sha256']}" for p, f in files.items()).encode("utf-8")).hexdigest()
+    descriptor = {
+        "format": FORMAT_VERSION,
+        # Same inputs -> same version, so rebuilding an unchanged index doesn't look like a new one
+        "version": version or f"{manifest.get('version', 0)}-{content[:12]}",
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": manifest.get("embedding_model", settings.rag_embedding_model),
+        "embedding_backend": settings.rag_embedding_backend,
+        "onnx_quantized": _onnx_quantized(),
+        "vector_backend": settings.rag_vector_backend,
+        "vector_dtype": settings.rag_vector_dtype,
+        "collection": manifest.get("collection", settings.rag_collection_name),
+        "index": {k: manifest[k] for k in ("version", "built_at", "counts") if k in manifest},
+        "has_model": include_model,
+        "files": files,
+    }
+    with open(os.path.join(output_dir, ARTIFACT_FILENAME), "w", encoding="utf-8") as fh:
+        json.dump(descriptor, fh, ensure_ascii=False, indent=2)
+    return descriptor
+
+
+def load_artifact(path: str, verify: bool = True) -> IndexArtifact:
+    """Read the artifact at ``path``, checking that every listed file is present and intact."""
+    started = time.perf_counter()
+    try:
+        with open(os.path.join(path, ARTIFACT_FILENAME), encoding="utf-8") as fh:
+            descriptor = json.load(fh)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read {ARTIFACT_FILENAME} in {path}: {e}") from e
+    if descriptor.get("format") != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported index artifact format: {descriptor.get('format')}")
+
+    for relative, expected in descriptor["files"].items():
+        full = os.path.join(path, relative)
+        if not os.path.isfile(full) or os.path.getsize(full) != expected["bytes"]:
+            raise ArtifactError(f"Index artifact file missing or truncated: {relative}")
+        if verify and sha256_file(full) != expected["sha256"]:
+            raise ArtifactError(f"Index artifact checksum mismatch: {relative}")
+
+    return IndexArtifact(
+        path=os.path.abspath(path),
+        version=descriptor["version"],
+        embedding_model=descriptor["embedding_model"],
+        embedding_backend=descriptor.get("embedding_backend", "torch"),
+        onnx_quantized=descriptor.get("onnx_quantized", False),
+        vector_backend=descriptor["vector_backend"],
+        vector_dtype=descriptor["vector_dtype"],
+        files=len(descriptor["files"]),
+        has_model=descriptor.get("has_model", False),
+        load_seconds=time.perf_counter() - started,
+        metadata={k: v for k, v in descriptor.items() if k != "files"},
+    )
+
+
+def check_compatible(artifact: IndexArtifact) -> None:
+    """Raise if the running configuration can't serve ``artifact``."""
+    expected = {
+        "embedding_model": settings.rag_embedding_model,
+        "embedding_backend": settings.rag_embedding_backend,
+        "onnx_quantized": _onnx_quantized(),
+        "vector_backend": settings.rag_vector_backend,
+        "vector_dtype": settings.rag_vector_dtype if settings.rag_vector_backend == "numpy" else artifact.vector_dtype,
+    }
+    for key, value in expected.items():
+        if getattr(artifact, key) != value:
+            raise ArtifactError(f"Index artifact {artifact.version} has {key}='{getattr(artifact, key)}', settings have '{value}'")
+
+
+def serving_index_dir(artifact: IndexArtifact) -> str:
+    """Directory the vector store is opened from: the artifact itself, or a writable copy for Chroma."""
+    if artifact.vector_backend == "numpy":
+        return artifact.index_dir
+    copy_dir = tempfile.mkdtemp(prefix=f"rag-index-{artifact.version}-")
+    shutil.copytree(artifact.index_dir, copy_dir, dirs_exist_ok=True)
+    return copy_dir
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or verify a prebuilt index artifact.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Package the built vector store and the embedding model")
+    build.add_argument("--output", required=True, help="Artifact directory (replaced if it exists)")
+    build.add_argument("--store", default=settings.rag_vector_store_path, help="Vector store directory")
+    build.add_argument("--version", help="Version label (default: index version + content hash)")
+    build.add_argument("--no-model", action="store_true", help="Don't bundle the embedding model")
+    verify = commands.add_parser("verify", help="Check an artifact's files against its checksums")
+    verify.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        descriptor = build_artifact(args.output, args.store, args.version, include_model=not args.no_model)
+        print(json.dumps({k: v for k, v in descriptor.items() if k != "files"}, ensure_ascii=False, indent=2))
+        return 0
+    try:
+        artifact = load_artifact(args.path)
+    except ArtifactError as e:
+        print(f" {e}")
+        return 1
+    print(json.dumps(artifact.summary(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,303 @@
+"""Vector store backends for the knowledge base.
+
+``chroma`` (default) is a ``chromadb.PersistentClient``. ``numpy`` is an exact
+search over an embedding matrix saved as ``<collection>.npy`` (float32, float16 or
+int8, see ``src.rag.quantization``) plus a sidecar ``<collection>.meta.json`` with
+IDs, documents and metadata. Readers memory-map the matrix, so several uvicorn
+workers share the same pages through the OS page cache and opening the store
+costs almost nothing.
+
+Both backends expose the subset of the Chroma collection API used by the indexer
+and the RAG tool: ``count``, ``get``, ``upsert``, ``delete`` and ``query`` (which
+returns squared L2 distances, like Chroma's default space).
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.rag.quantization import DTYPES, dequantize, quantize
+from src.rag.quantization import dot as quantization_dot
+
+FORMAT_VERSION = 2
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        write(fh)
+    os.replace(tmp_path, path)
+
+
+class NumpyCollection:
+    """Exact nearest-neighbour search over a memory-mapped embedding matrix.
+
+    Writes (``upsert``/``delete``) are applied in memory and written atomically by
+    :meth:`flush`, which the indexer calls once per build. Readers reload the files
+    when the sidecar changes on disk.
+
+    The matrix is stored as ``dtype`` (see ``src.rag.quantization``). For compact
+    dtypes, ``rescore`` also keeps a float32 copy on disk: only the rows of the top
+    candidates are read from it, so it costs disk but little resident memory.
+    """
+
+    def __init__(self, path: str, name: str, dtype: str = "float32", rescore: bool = True, rescore_factor: int = 4):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype '{dtype}' (expected one of {DTYPES})")
+        self.path = path
+        self.name = name
+        self.dtype = dtype
+        self.rescore = rescore
+        self.rescore_factor = max(1, rescore_factor)
+        self.meta_path = os.path.join(path, f"{name}.meta.json")
+        self._lock = threading.RLock()
+        self._mtime: Optional[int] = None
+        self._dirty = False
+        self._clear()
+        self._reload_if_changed()
+
+    def _file(self, kind: str) -> str:
+        return os.path.join(self.path, f"{self.name}.{kind}.npy" if kind else f"{self.name}.npy")
+
+    def _clear(self) -> None:
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._stored = np.zeros((0, 0), dtype=np.float32)
+        self._scales = None
+        self._exact = None  # float32 rows used for rescoring (None -> rescore with the stored ones)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._stored_dtype = "float32"
+        self._format = FORMAT_VERSION
+
+    # Persistence
+    def _reload_if_changed(self) -> None:
+        if self._dirty:
+            return  # unflushed local writes win
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.meta_path, encoding="utf-8") as fh:
+            meta = json.load(fh)
+        store_format = meta.get("format")
+        if store_format not in (1, FORMAT_VERSION):
+            raise ValueError(f"Unsupported vector store format: {store_format}")
+
+        def load(kind: str):
+            return np.load(self._file(kind), mmap_mode="r")
+
+        if store_format == 1:
+            # float32 matrix only; norms are computed here and the next flush rewrites it as the current format
+            stored = load("") if meta["ids"] else np.zeros((0, meta["dim"]), np.float32)
+            norms = np.einsum("ij,ij->i", stored, stored) if len(stored) else np.zeros(0, np.float32)
+            scales, exact = None, None
+            meta["dtype"] = "float32"
+        elif meta["ids"]:
+            stored = load("")
+            norms = load("norms")
+            scales = load("scales") if meta["dtype"] == "int8" else None
+            exact = load("f32") if meta.get("rescore") and meta["dtype"] != "float32" else None
+        else:
+            stored, norms, scales, exact = np.zeros((0, meta["dim"]), np.float32), np.zeros(0, np.float32), None, None
+        if stored.shape[0] != len(meta["ids"]) or norms.shape[0] != len(meta["ids"]):
+            return  # caught between the writes of a flush; retry on the next call
+        self._ids = meta["ids"]
+        self._documents = meta["documents"]
+        self._metadatas = meta["metadatas"]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._stored, self._scales, self._exact, self._norms = stored, scales, exact, norms
+        self._stored_dtype = meta["dtype"]
+        self._format = store_format
+        self._mtime = mtime
+
+    def _full_matrix(self):
+        """Float32 embeddings of every row (exact copy if available, else dequantized)."""
+        if self._exact is not None:
+            return np.array(self._exact, dtype=np.float32)
+        return dequantize(self._stored, self._scales)
+
+    def flush(self) -> None:
+        """Write pending changes: the arrays first, then the sidecar that readers watch.
+
+        Also rewrites the store when it was saved with a different dtype/rescore setting
+        or in the older format 1 (float32 matrix only).
+        """
+        with self._lock:
+            has_exact = self._exact is not None or self._stored_dtype == "float32"
+            converted = self._ids and (
+                self._stored_dtype != self.dtype or (self.rescore and not has_exact) or self._format != FORMAT_VERSION
+            )
+            if not self._dirty and not converted:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            full = np.ascontiguousarray(self._full_matrix(), dtype=np.float32)
+            stored, scales = quantize(full, self.dtype)
+            arrays = {"": stored, "norms": np.einsum("ij,ij->i", full, full) if len(full) else np.zeros(0, np.float32)}
+            if scales is not None:
+                arrays["scales"] = scales
+            if self.rescore and self.dtype != "float32":
+                arrays["f32"] = full
+            for kind, array in arrays.items():
+                _atomic_write(self._file(kind), lambda fh, a=array: np.save(fh, a))
+            for kind in {"scales", "f32"} - set(arrays):
+                if os.path.exists(self._file(kind)):
+                    os.remove(self._file(kind))
+            meta = {
+                "format": FORMAT_VERSION,
+                "dim": int(full.shape[1]) if full.ndim == 2 else 0,
+                "dtype": self.dtype,
+                "rescore": self.rescore and self.dtype != "float32",
+                "ids": self._ids,
+                "documents": self._documents,
+                "metadatas": self._metadatas,
+            }
+            _atomic_write(self.meta_path, lambda fh: fh.write(json.dumps(meta, ensure_ascii=False).encode("utf-8")))
+            self._dirty = False
+            self._mtime = None
+            self._reload_if_changed()
+
+    def footprint(self) -> Dict[str, int]:
+        """Bytes of the arrays scanned on every query and of the optional rescoring copy."""
+        with self._lock:
+            searched = self._stored.nbytes + self._norms.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+            return {"searched_bytes": int(searched), "rescore_bytes": int(self._exact.nbytes) if self._exact is not None else 0}
+
+    # Chroma-compatible API
+    def count(self) -> int:
+        with self._lock:
+            self._reload_if_changed()
+            return len(self._ids)
+
+    def get(self, ids: Optional[Sequence[str]] = None, include: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        include = ["documents", "metadatas"] if include is None else include
+        with self._lock:
+            self._reload_if_changed()
+            rows = range(len(self._ids)) if ids is None else [self._rows[i] for i in ids if i in self._rows]
+            result: Dict[str, Any] = {"ids": [self._ids[r] for r in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[r] for r in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[r] for r in rows]
+            if "embeddings" in include:
+                full = self._full_matrix()
+                result["embeddings"] = [full[r].tolist() for r in rows]
+            return result
+
+    def upsert(self, ids, documents, metadatas, embeddings) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            self._reload_if_changed()
+            matrix = self._full_matrix() if len(self._ids) else np.zeros((0, vectors.shape[1]), np.float32)
+            new_rows = []
+            for item_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                row = self._rows.get(item_id)
+                if row is None:
+                    self._rows[item_id] = len(self._ids)
+                    self._ids.append(item_id)
+                    self._documents.append(document)
+                    self._metadatas.append(metadata or {})
+                    new_rows.append(vector)
+                else:
+                    self._documents[row] = document
+                    self._metadatas[row] = metadata or {}
+                    matrix[row] = vector
+            if new_rows:
+                matrix = np.vstack([matrix, np.stack(new_rows)])
+            self._set_matrix(matrix)
+
+    def delete(self, ids) -> None:
+        with self._lock:
+            self._reload_if_changed()
+            drop = {self._rows[i] for i in ids if i in self._rows}
+            if not drop:
+                return
+            keep = [r for r in range(len(self._ids)) if r not in drop]
+            matrix = self._full_matrix()[keep]
+            self._ids = [self._ids[r] for r in keep]
+            self._documents = [self._documents[r] for r in keep]
+            self._metadatas = [self._metadatas[r] for r in keep]
+            self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._set_matrix(matrix)
+
+    def _set_matrix(self, matrix) -> None:
+        """Replace the in-memory rows (kept as exact float32 until the next flush)."""
+        self._stored, self._scales, self._exact = matrix, None, None
+        self._stored_dtype = "float32"
+        self._norms = np.einsum("ij,ij->i", matrix, matrix) if len(matrix) else np.zeros(0, np.float32)
+        self._dirty = True
+
+    def query(self, query_embeddings, n_results: int = 10, include: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Top-``n_results`` by squared L2 distance for each query embedding.
+
+        Compact matrices are scanned first; the best ``rescore_factor * n_results``
+        candidates are then rescored exactly when a float32 copy is available.
+        """
+        include = ["documents", "metadatas", "distances"] if include is None else include
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        with self._lock:
+            self._reload_if_changed()
+            result: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            total = len(self._ids)
+            n = min(n_results, total)
+            compact = self._stored_dtype != "float32"
+            for q in queries:
+                if n == 0:
+                    top, distances = np.zeros(0, dtype=int), np.zeros(0)
+                else:
+                    qq = float(q @ q)
+                    distances = self._norms - 2.0 * quantization_dot(self._stored, self._scales, q) + qq
+                    shortlist = min(total, n * self.rescore_factor) if compact else n
+                    top = _smallest(distances, shortlist)
+                    if compact and self._exact is not None:
+                        exact = np.asarray(self._exact[np.sort(top)], dtype=np.float32)
+                        distances = distances.copy()
+                        distances[np.sort(top)] = ((exact - q) ** 2).sum(axis=1)
+                    top = top[np.argsort(distances[top], kind="stable")][:n]
+                result["ids"].append([self._ids[r] for r in top])
+                result["documents"].append([self._documents[r] for r in top])
+                result["metadatas"].append([self._metadatas[r] for r in top])
+                result["distances"].append([max(float(distances[r]), 0.0) for r in top])
+        return {k: v for k, v in result.items() if k == "ids" or k in include}
+
+
+def _smallest(values, k: int):
+    if k >= len(values):
+        return np.arange(len(values))
+    return np.argpartition(values, k - 1)[:k]
+
+
+class NumpyClient:
+    """Minimal client mirroring ``chromadb.PersistentClient`` for :class:`NumpyCollection`."""
+
+    def __init__(self, path: str, dtype: str = "float32", rescore: bool = True):
+        self.path = path
+        self.dtype = dtype
+        self.rescore = rescore
+        self._collections: Dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str) -> NumpyCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NumpyCollection(self.path, name, dtype=self.dtype, rescore=self.rescore)
+            return self._collections[name]
+
+
+BACKENDS = ("chroma", "numpy")
+
+
+def create_client(backend: str, path: str, dtype: str = "float32", rescore: bool = True) -> Any:
+    """Open the vector store at ``path`` with the given backend (``dtype``/``rescore``: numpy only)."""
+    if backend == "numpy":
+        return NumpyClient(path, dtype=dtype, rescore=rescore)
+    if backend == "chroma":
+        import chromadb  # type: ignore
+
+        return chromadb.PersistentClient(path=path)
+    raise ValueError(f"Unknown vector backend '{backend}' (expected one of {BACKENDS})")
@@ -0,0 +1,125 @@
+"""In-process BM25 inverted index over the knowledge-base chunks.
+
+Dense MiniLM retrieval misses exact-term queries ("tap to pay", "Pix parcelado",
+"1,37%"); this index complements it. It is built by the offline indexer from the
+same chunks as the vector collection and persisted as JSON next to the store.
+"""
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import AbstractSet, Any, Dict, List, Optional, Sequence, Set, Tuple
+
+# Numbers keep their decimal separators ("1,37", "16,58") so fee queries match exactly
+_TERM_RE = re.compile(r"\d+(?:[.,]\d+)*|\w+")
+
+STOPWORDS = frozenset(
+    """
+    a ao aos as com como da das de do dos e em entre essa esse esta este eu isso
+    na nas no nos o os ou para pela pelas pelo pelos por qual quais que se sem
+    seu sua seus suas um uma umas uns voce meu minha
+    """.split()
+)
+
+FORMAT_VERSION = 1
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents ("Crédito" -> "credito")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TERM_RE.findall(fold(text)) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents (rebuilt, not updated, by the indexer)."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.ids]
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        # Document indices per metadata "source", so searches can be restricted to some pages
+        self.rows_by_source: Dict[Optional[str], Set[int]] = {}
+        for index, metadata in enumerate(self.metadatas):
+            self.rows_by_source.setdefault((metadata or {}).get("source"), set()).add(index)
+        for index, document in enumerate(self.documents):
+            terms = tokenize(document)
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, {})[index] = tf
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.ids) - df + 0.5) / (df + 0.5))
+
+    def search(
+        self, query: str, n_results: int = 10, restrict: Optional[AbstractSet[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """Return ``(document index, score)`` pairs, best first; documents without matches are omitted.
+
+        ``restrict`` limits the search to those document indices (statistics stay global).
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for index, tf in postings.items():
+                if restrict is not None and index not in restrict:
+                    continue
+                norm = 1 - self.b + self.b * self.doc_lengths[index] / (self.avg_length or 1.0)
+                scores[index] = scores.get(index, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:n_results]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BM25Index":
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format: {data.get('format')}")
+        return cls(data["ids"], data["documents"], data["metadatas"], k1=data["k1"], b=data["b"])
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_dict(json.load(fh))
+
+
+def bm25_path(store_path: str, collection_name: str) -> str:
+    return os.path.join(store_path, f"{collection_name}.bm25.json")
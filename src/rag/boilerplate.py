@@ -0,0 +1,53 @@
+"""Detection and removal of text repeated across knowledge-base pages.
+
+Every infinitepay.io page carries the same navigation, cookie banner and footer.
+Indexed as-is, those blocks fill the collection with near-identical chunks that
+crowd useful ones out of the top-k. A block (paragraph, list item...) found on
+enough pages is boilerplate and is stripped before chunking; blocks repeated
+inside a single page are kept once.
+"""
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Set
+
+from src.rag.chunking import page_sections
+from src.rag.documents import Page, Section, content_hash
+
+
+def block_key(text: str) -> str:
+    """Case/whitespace-insensitive fingerprint of a text block."""
+    return content_hash(" ".join(text.lower().split()))[:16]
+
+
+class BoilerplateDetector:
+    """Counts on how many pages each block appears."""
+
+    def __init__(self):
+        self.page_blocks: Dict[str, Set[str]] = {}
+
+    def add(self, page: Page) -> None:
+        self.page_blocks[page.url] = {block_key(b) for s in page_sections(page) for b in s.blocks}
+
+    def detect(self, min_pages: int, min_ratio: float) -> Set[str]:
+        """Blocks present on at least ``max(min_pages, min_ratio * pages)`` pages."""
+        threshold = max(min_pages, math.ceil(min_ratio * len(self.page_blocks)))
+        counts = Counter(key for keys in self.page_blocks.values() for key in keys)
+        return {key for key, pages in counts.items() if pages >= threshold}
+
+
+def strip_boilerplate(page: Page, boilerplate: Iterable[str]) -> Page:
+    """Copy of ``page`` without boilerplate blocks, repeated blocks or sections left empty."""
+    boilerplate = boilerplate if isinstance(boilerplate, (set, frozenset)) else set(boilerplate)
+    seen: Set[str] = set()
+    sections: List[Section] = []
+    for section in page_sections(page):
+        blocks = []
+        for block in section.blocks:
+            key = block_key(block)
+            if key in boilerplate or key in seen:
+                continue
+            seen.add(key)
+            blocks.append(block)
+        if blocks:
+            sections.append(Section(title=section.title, blocks=blocks))
+    return Page.from_sections(page.url, sections)
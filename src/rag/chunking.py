@@ -0,0 +1,181 @@
+"""Token-aware, structure-preserving chunking for RAG ingestion.
+
+Pages are split along their structure (sections -> paragraphs -> sentences) and
+packed into chunks bounded by the embedding tokenizer's token count, with a
+configurable overlap between consecutive chunks of the same section. Small
+sections are merged so retrieval returns fewer, denser chunks, and every chunk
+records the titles of the sections it covers.
+"""
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from src.config.settings import settings
+from src.rag.documents import Chunk, Page, Section, content_hash
+
+TokenCounter = Callable[[str], int]
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+(?=[\"“(\[]?[A-ZÀ-ÖØ-Þ0-9])")
+# Minimum room left for body text when a section title is long
+_MIN_BODY_TOKENS = 16
+
+# Chunk size of the original fixed-window chunker (kept for benchmarks)
+LEGACY_CHUNK_SIZE = 700
+
+
+def approx_token_count(text: str) -> int:
+    """Approximate word-piece count when no tokenizer is loaded (words/punctuation * 4/3)."""
+    return math.ceil(len(_WORD_RE.findall(text)) * 4 / 3)
+
+
+def make_token_counter(embeddings: Optional[object] = None) -> TokenCounter:
+    """Return the tokenizer-based counter of ``embeddings`` if it has one, else the approximation."""
+    count_tokens = getattr(embeddings, "count_tokens", None)
+    if not callable(count_tokens):
+        return approx_token_count
+    try:
+        count_tokens("InfinitePay")
+    except Exception:
+        return approx_token_count
+    return count_tokens
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in (part.strip() for part in _SENTENCE_RE.split(text)) if s]
+
+
+def _split_words(text: str, max_tokens: int, count_tokens: TokenCounter) -> List[str]:
+    """Last resort for a single sentence longer than ``max_tokens``."""
+    pieces: List[str] = []
+    current: List[str] = []
+    for word in text.split():
+        if current and count_tokens(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+@dataclass
+class _Unit:
+    section: int
+    text: str
+    tokens: int
+
+
+def _section_units(index: int, section: Section, max_tokens: int, count_tokens: TokenCounter) -> List[_Unit]:
+    """Split a section's blocks into units that each fit in ``max_tokens``."""
+    units: List[_Unit] = []
+    for block in section.blocks:
+        tokens = count_tokens(block)
+        if tokens <= max_tokens:
+            units.append(_Unit(index, block, tokens))
+            continue
+        for sentence in split_sentences(block):
+            pieces = [sentence]
+            if count_tokens(sentence) > max_tokens:
+                pieces = _split_words(sentence, max_tokens, count_tokens)
+            units.extend(_Unit(index, piece, count_tokens(piece)) for piece in pieces)
+    return units
+
+
+def _render(units: List[_Unit], sections: List[Section]) -> str:
+    lines: List[str] = []
+    current_section = None
+    for unit in units:
+        if unit.section != current_section:
+            current_section = unit.section
+            title = sections[unit.section].title
+            lines.append(f"{title}\n{unit.text}" if title else unit.text)
+        else:
+            lines[-1] = f"{lines[-1]} {unit.text}"
+    return "\n".join(lines)
+
+
+def chunk_sections(
+    sections: List[Section],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    count_tokens: TokenCounter = approx_token_count,
+) -> List[Chunk]:
+    """Pack ``sections`` into chunks of at most ``max_tokens`` tokens (IDs are left empty).
+
+    Chunks break at section boundaries whenever a whole section doesn't fit in the
+    current chunk; long sections break between paragraphs, then sentences. When a
+    section spills over several chunks, each new chunk repeats up to
+    ``overlap_tokens`` of trailing text from the previous one.
+    """
+    max_tokens = max_tokens or settings.rag_chunk_max_tokens
+    overlap_tokens = settings.rag_chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+    title_tokens = [count_tokens(s.title) if s.title else 0 for s in sections]
+
+    chunks: List[Chunk] = []
+    current: List[_Unit] = []
+
+    def cost(units: List[_Unit]) -> int:
+        return sum(u.tokens for u in units) + sum(title_tokens[i] for i in {u.section for u in units})
+
+    def flush() -> None:
+        if current:
+            titles = list(dict.fromkeys(sections[u.section].title for u in current if sections[u.section].title))
+            chunks.append(Chunk(id="", text=_render(current, sections), metadata={"section": " | ".join(titles)}))
+
+    for index, section in enumerate(sections):
+        body_budget = max(max_tokens - title_tokens[index], _MIN_BODY_TOKENS)
+        units = _section_units(index, section, body_budget, count_tokens)
+        if not units:
+            continue
+        if current and cost(current + units) > max_tokens:
+            flush()
+            current = []
+        for unit in units:
+            if current and cost(current + [unit]) > max_tokens:
+                flush()
+                carried: List[_Unit] = []
+                for previous in reversed(current):
+                    if previous.section != index or sum(u.tokens for u in carried) + previous.tokens > overlap_tokens:
+                        break
+                    carried.insert(0, previous)
+                current = carried if cost(carried + [unit]) <= max_tokens else []
+            current.append(unit)
+    flush()
+    return chunks
+
+
+def page_sections(page: Page) -> List[Section]:
+    """Sections of ``page``; pages without structure become a single untitled section."""
+    if page.sections:
+        return page.sections
+    return [Section(title="", blocks=[page.text])] if page.text else []
+
+
+def chunk_page(
+    page: Page,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    count_tokens: TokenCounter = approx_token_count,
+) -> List[Chunk]:
+    """Chunk a page, assigning content-addressed IDs and source/section metadata."""
+    url_key = content_hash(page.url)[:12]
+    chunks = chunk_sections(page_sections(page), max_tokens, overlap_tokens, count_tokens)
+    for chunk in chunks:
+        chunk_hash = content_hash(chunk.text)
+        chunk.id = f"{url_key}-{chunk_hash[:16]}"
+        chunk.metadata = {"source": page.url, "chunk_hash": chunk_hash, **chunk.metadata}
+    return chunks
+
+
+def chunker_fingerprint(max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None) -> str:
+    """Identifies the chunking configuration; pages are re-chunked when it changes."""
+    max_tokens = max_tokens or settings.rag_chunk_max_tokens
+    overlap_tokens = settings.rag_chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+    return f"sections-tokens-{max_tokens}-{overlap_tokens}"
+
+
+def fixed_window_chunks(text: str, size: int = LEGACY_CHUNK_SIZE) -> List[str]:
+    """The original chunker: fixed character windows over the flattened page text."""
+    return [text[start : start + size] for start in range(0, len(text), size)]
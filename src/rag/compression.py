@@ -0,0 +1,117 @@
+"""Post-retrieval compression of RAG context.
+
+Retrieved chunks often include weak matches and near-identical boilerplate
+repeated across infinitepay.io pages. Before they reach the Knowledge agent's
+prompt, chunks are filtered by distance, near-duplicates are dropped (word
+shingle Jaccard similarity), and the rest is trimmed, in relevance order, to a
+token budget. The source URLs of the kept chunks are returned with the text.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence
+
+from src.config.settings import settings
+from src.rag.chunking import approx_token_count, split_sentences
+from src.rag.retrieval import Hit
+
+_WORD_RE = re.compile(r"\w+")
+SHINGLE_SIZE = 3
+# A chunk cut to fit the budget must keep at least this many tokens to be worth including
+MIN_PARTIAL_TOKENS = 32
+
+
+@dataclass
+class CompressedContext:
+    hits: List[Hit]
+    sources: List[str]
+    tokens: int
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(hit.document for hit in self.hits)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> FrozenSet[str]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return frozenset([" ".join(words)]) if words else frozenset()
+    return frozenset(" ".join(words[i : i + size]) for i in range(len(words) - size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """Longest prefix of whole sentences within ``max_tokens`` (words if the first sentence is too long)."""
+    kept: List[str] = []
+    for sentence in split_sentences(text):
+        if count_tokens(" ".join(kept + [sentence])) > max_tokens:
+            break
+        kept.append(sentence)
+    if kept:
+        return " ".join(kept)
+    words: List[str] = []
+    for word in text.split():
+        if count_tokens(" ".join(words + [word])) > max_tokens:
+            break
+        words.append(word)
+    return " ".join(words)
+
+
+def compress_hits(
+    hits: Sequence[Hit],
+    max_distance: Optional[float] = None,
+    dedup_threshold: Optional[float] = None,
+    token_budget: Optional[int] = None,
+    count_tokens: Callable[[str], int] = approx_token_count,
+) -> CompressedContext:
+    """Filter, de-duplicate and budget ``hits`` (already in relevance order).
+
+    Hits without a distance (found only by BM25) are not distance-filtered. The
+    most relevant hit is always kept, truncated if it alone exceeds the budget.
+    """
+    max_distance = settings.rag_max_distance if max_distance is None else max_distance
+    dedup_threshold = settings.rag_dedup_threshold if dedup_threshold is None else dedup_threshold
+    token_budget = token_budget or settings.rag_context_token_budget
+    dropped = {"distance": 0, "duplicate": 0, "budget": 0}
+
+    relevant = [h for h in hits if h.distance is None or max_distance is None or h.distance <= max_distance]
+    dropped["distance"] = len(hits) - len(relevant)
+
+    unique: List[Hit] = []
+    seen: List[FrozenSet[str]] = []
+    for hit in relevant:
+        hit_shingles = shingles(hit.document)
+        if any(jaccard(hit_shingles, other) >= dedup_threshold for other in seen):
+            dropped["duplicate"] += 1
+            continue
+        seen.append(hit_shingles)
+        unique.append(hit)
+
+    kept: List[Hit] = []
+    used = 0
+    for hit in unique:
+        tokens = count_tokens(hit.document)
+        remaining = token_budget - used
+        if tokens <= remaining:
+            kept.append(hit)
+            used += tokens
+            continue
+        if remaining >= MIN_PARTIAL_TOKENS or not kept:
+            partial = truncate_to_tokens(hit.document, remaining, count_tokens)
+            if partial:
+                kept.append(Hit(hit.id, partial, hit.metadata, hit.distance, hit.score))
+                used += count_tokens(partial)
+        dropped["budget"] = len(unique) - len(kept)
+        break
+
+    sources = [
+        source
+        for source in dict.fromkeys(h.metadata.get("source") for h in kept)
+        if source and source != "fallback"
+    ]
+    return CompressedContext(hits=kept, sources=sources, tokens=used, dropped=dropped)
@@ -0,0 +1,43 @@
+"""Data types shared by the ingestion and indexing stages."""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Section:
+    """A heading and the text blocks (paragraphs, list items...) under it."""
+
+    title: str
+    blocks: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Page:
+    url: str
+    text: str
+    sections: List[Section] = field(default_factory=list)
+
+    @classmethod
+    def from_sections(cls, url: str, sections: List[Section]) -> "Page":
+        parts: List[str] = []
+        for section in sections:
+            if section.title:
+                parts.append(section.title)
+            parts.extend(section.blocks)
+        return cls(url=url, text=" ".join(parts), sections=sections)
+
+    @property
+    def content_hash(self) -> str:
+        return content_hash(self.text)
+
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
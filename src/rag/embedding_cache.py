@@ -0,0 +1,163 @@
+"""Cache of query embeddings in front of the embedding model.
+
+Traffic is dominated by a few hundred recurring questions, so encoding the same
+query again on every RAG call is wasted CPU. Queries are normalized, looked up in
+a bounded in-memory LRU and, optionally, in a SQLite file that survives restarts.
+Entries are keyed by the encoder's cache name (model name + backend, see
+:func:`encoder_cache_name`) + normalized text.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+_SPACES_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.;,]+$")
+
+
+def normalize_query(text: str) -> str:
+    """Case/whitespace/trailing-punctuation normalization ("Taxa do Pix? " -> "taxa do pix").
+
+    The default MiniLM tokenizer is uncased, so lowercasing does not change the embedding.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _TRAILING_PUNCT_RE.sub("", _SPACES_RE.sub(" ", text).strip())
+
+
+def encoder_cache_name(embeddings: Any) -> str:
+    """Name the cache keys vectors of ``embeddings`` under.
+
+    Shared embeddings include the backend (``all-MiniLM-L6-v2@onnx-int8``): torch and
+    ONNX (quantized or not) run the same model name but return slightly different
+    vectors, which must not be mixed in the persistent cache.
+    """
+    return (
+        getattr(embeddings, "cache_name", None)
+        or getattr(embeddings, "model_name", None)
+        or embeddings.__class__.__name__
+    )
+
+
+def cache_key(model_name: str, normalized: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of query embeddings with an optional SQLite write-through store."""
+
+    def __init__(self, max_size: int = 1024, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.path:
+            self._db = self._open_db(self.path)
+
+    def _open_db(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            db.commit()
+            return db
+        except (OSError, sqlite3.Error) as e:
+            print(f" RAG: query embedding cache at '{path}' unavailable ({e}); using memory only")
+            return None
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return array("f", row[0]).tolist() if row else None
+
+    def _disk_put(self, key: str, vector: List[float]) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)",
+                (key, array("f", vector).tobytes()),
+            )
+            self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def get(self, model_name: str, query: str) -> Optional[List[float]]:
+        """Return the cached embedding of ``query`` (memory, then disk) or None."""
+        key = cache_key(model_name, normalize_query(query))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            vector = self._disk_get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, query: str, vector: Any) -> List[float]:
+        vector = [float(x) for x in (vector.tolist() if hasattr(vector, "tolist") else vector)]
+        key = cache_key(model_name, normalize_query(query))
+        with self._lock:
+            self._remember(key, vector)
+            self._disk_put(key, vector)
+        return vector
+
+    def embed(self, query: str, embeddings: Any) -> List[float]:
+        """Return the embedding of ``query``, encoding it with ``embeddings`` only on a miss.
+
+        The normalized text is what gets encoded, so a cached and a fresh result are identical.
+        """
+        model_name = encoder_cache_name(embeddings)
+        vector = self.get(model_name, query)
+        if vector is not None:
+            return vector
+        encoded = embeddings.encode([normalize_query(query)])
+        return self.put(model_name, query, encoded[0])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """Drop the in-memory entries and counters (the disk store is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,137 @@
+"""Micro-batching front-end for the shared embedding model.
+
+Concurrent ``/process`` calls each encode a single query, and ``SharedEmbeddings``
+serializes them, so the model runs many batches of one. The batcher queues the
+queries of concurrent callers and a worker thread encodes them together: a batch
+is flushed when it reaches ``max_batch_size`` or ``max_wait_ms`` after its first
+query arrived. Queries that arrive while a batch is encoding are picked up by the
+next one. Each caller waits on its own future.
+
+The window is only applied under load (the previous batch had several queries or
+more are already queued), so a lone caller does not pay it.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.rag.embedding_cache import encoder_cache_name
+
+_STOP = object()
+
+
+def _as_list(vector: Any) -> List[float]:
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+class EmbeddingBatcher:
+    """Drop-in ``encode`` for single queries that batches concurrent callers."""
+
+    def __init__(self, embeddings: Any, max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._last_batch_size = 0
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.embeddings, "model_name", self.embeddings.__class__.__name__)
+
+    @property
+    def cache_name(self) -> str:
+        return encoder_cache_name(self.embeddings)
+
+    def submit(self, text: str) -> "Future[List[float]]":
+        """Queue ``text`` for the next batch; the future resolves to its embedding."""
+        future: "Future[List[float]]" = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+            self._queue.put((text, future))
+        return future
+
+    def encode(self, texts: Sequence[str], **kwargs) -> List[List[float]]:
+        """Blocking encode with the same call shape as the model (extra kwargs are ignored)."""
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    async def encode_async(self, texts: Sequence[str]) -> List[List[float]]:
+        """Awaitable encode; the model runs on the worker thread, off the event loop."""
+        futures = [asyncio.wrap_future(self.submit(text)) for text in texts]
+        return list(await asyncio.gather(*futures))
+
+    def _next_batch(self) -> Tuple[List[Tuple[str, Future]], bool]:
+        """Block for the first item, then gather more until the batch is full or the window closes."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        under_load = self._last_batch_size > 1 or not self._queue.empty()
+        flush_at = time.monotonic() + (self.max_wait if under_load else 0.0)
+        while len(batch) < self.max_batch_size:
+            remaining = flush_at - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            self._last_batch_size = len(batch)
+            # Skip callers that gave up (cancelled futures)
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = self.embeddings.encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(_as_list(vector))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the worker once the queued queries are encoded."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            if worker is not None:
+                self._queue.put(_STOP)
+        if worker is not None:
+            worker.join(timeout)
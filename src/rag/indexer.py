@@ -0,0 +1,382 @@
+"""Offline, incremental indexing of the InfinitePay knowledge base.
+
+Builds or refreshes the ``infinitepay_kb`` collection ahead of time, outside the
+request path. Every page and chunk is hashed: unchanged pages are skipped, only
+chunks that are not yet in the collection are embedded, and chunks that no
+longer exist are deleted. A manifest next to the vector store records the index
+version, counts and build time.
+
+Pages are scraped concurrently (``src.rag.ingestion``) and each one is chunked and
+embedded as soon as it arrives, while the remaining fetches are still in flight.
+Navigation/footer blocks repeated across pages are stripped before chunking
+(``src.rag.boilerplate``) and identical chunks are stored once; the manifest
+reports how much text that removed.
+After the collection is updated, a BM25 index over the same chunks is rebuilt and
+saved next to it for hybrid retrieval, and the chunks are copied into per-product
+shard collections with the router that picks them (``src.rag.sharding``).
+
+Usage:
+    python -m src.rag.indexer [--path ./data/vector_store] [--collection infinitepay_kb] [--force]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from src.config.settings import settings
+from src.rag.bm25 import BM25Index, bm25_path
+from src.rag.boilerplate import BoilerplateDetector, strip_boilerplate
+from src.rag.chunking import chunk_page, chunker_fingerprint, make_token_counter
+from src.rag.documents import Chunk, Page
+from src.rag.ingestion import iter_pages
+from src.rag.sharding import shards_path, sync_shards
+
+KB_URLS = [
+    "https://www.infinitepay.io",
+    "https://www.infinitepay.io/maquininha",
+    "https://www.infinitepay.io/maquininha-celular",
+    "https://www.infinitepay.io/tap-to-pay",
+    "https://www.infinitepay.io/pdv",
+    "https://www.infinitepay.io/receba-na-hora",
+    "https://www.infinitepay.io/gestao-de-cobranca",
+    "https://www.infinitepay.io/gestao-de-cobranca-2",
+    "https://www.infinitepay.io/link-de-pagamento",
+    "https://www.infinitepay.io/loja-online",
+    "https://www.infinitepay.io/boleto",
+    "https://www.infinitepay.io/conta-digital",
+    "https://www.infinitepay.io/conta-pj",
+    "https://www.infinitepay.io/pix",
+    "https://www.infinitepay.io/pix-parcelado",
+    "https://www.infinitepay.io/emprestimo",
+    "https://www.infinitepay.io/cartao",
+    "https://www.infinitepay.io/rendimento",
+]
+
+# Indexed only when nothing could be scraped and the collection is empty
+FALLBACK_DOCS = [
+    "A InfinitePay oferece maquininhas com taxas competitivas e suporte ao PIX.",
+    "A conta digital InfinitePay permite pagamentos, cartões e rendimento.",
+    "O PIX da InfinitePay facilita recebimentos rápidos para seu negócio.",
+]
+
+MANIFEST_FILENAME = "index_manifest.json"
+EMBED_BATCH_SIZE = 64
+# Chroma rejects larger add() batches
+ADD_BATCH_SIZE = 5000
+
+
+def fallback_chunks() -> List[Chunk]:
+    return [
+        Chunk(id=f"static-{k}", text=text, metadata={"source": "fallback"})
+        for k, text in enumerate(FALLBACK_DOCS, start=1)
+    ]
+
+
+def manifest_path(store_path: str) -> str:
+    return os.path.join(store_path, MANIFEST_FILENAME)
+
+
+def load_manifest(store_path: str) -> Dict[str, Any]:
+    """Return the manifest stored next to the vector store (empty if missing or unreadable)."""
+    try:
+        with open(manifest_path(store_path), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(store_path: str, manifest: Dict[str, Any]) -> None:
+    os.makedirs(store_path, exist_ok=True)
+    path = manifest_path(store_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class IncrementalIndexer:
+    """Applies pages to a collection one at a time, then finalizes deletions and the manifest.
+
+    Pages whose hash matches the previous manifest are not re-chunked; chunks already
+    present in the collection are not re-embedded. Pages listed as failed keep their
+    previously indexed chunks, so a transient scraping error doesn't empty the KB.
+
+    Boilerplate blocks (navigation, footer, cookie banner...) are stripped before
+    chunking using the set detected by the previous build, so pages can be planned
+    as they arrive; :meth:`refresh_boilerplate` re-detects it over every page of this
+    build and re-plans the pages it affects. On a first build (no known set) pages
+    are held until then. Chunks with the same text on several pages are stored once.
+    """
+
+    def __init__(self, collection: Any, embeddings: Any, manifest: Optional[Dict[str, Any]] = None, force: bool = False):
+        self.collection = collection
+        self.embeddings = embeddings
+        self.manifest = manifest or {}
+        self.force = force
+        self.chunker = chunker_fingerprint()
+        # A different chunking configuration invalidates every page's previous chunks
+        self.rechunk = force or (bool(self.manifest) and self.manifest.get("chunker") != self.chunker)
+        self.count_tokens = make_token_counter(embeddings)
+        self.previous_pages: Dict[str, Dict[str, Any]] = self.manifest.get("pages", {})
+        self.existing_ids = set(collection.get(include=[])["ids"])
+        self.page_records: Dict[str, Dict[str, Any]] = {}
+        self.added_ids: set = set()
+        self.unchanged_pages: set = set()
+        self.started = time.perf_counter()
+
+        known = self.manifest.get("boilerplate")
+        self.boilerplate: set = set(known["blocks"]) if known else set()
+        self.defer = known is None
+        self.detector = BoilerplateDetector()
+        self.raw_pages: Dict[str, Page] = {}
+        self.page_stats: Dict[str, Dict[str, int]] = {}
+        # Chunk text hash -> the ID it is stored under (identical chunks of other pages reuse it)
+        self.chunk_owners: Dict[str, str] = {}
+        for record in self.previous_pages.values():
+            for chunk_id in record.get("chunk_ids", []):
+                if chunk_id in self.existing_ids:
+                    self.chunk_owners.setdefault(chunk_id.rsplit("-", 1)[-1], chunk_id)
+
+    def plan_page(self, page: Page) -> List[Chunk]:
+        """Record ``page`` and return the chunks that still need to be embedded."""
+        self.raw_pages[page.url] = page
+        self.detector.add(page)
+        if self.defer:
+            return []
+        return self._plan(page)
+
+    def _plan(self, raw_page: Page) -> List[Chunk]:
+        page = strip_boilerplate(raw_page, self.boilerplate)
+        page_hash = page.content_hash
+        previous = self.previous_pages.get(page.url)
+        stats = {"chars_raw": len(raw_page.text), "chars_clean": len(page.text), "duplicate_chunks": 0}
+        self.page_stats[page.url] = stats
+        self.unchanged_pages.discard(page.url)
+        if (
+            not self.rechunk
+            and previous
+            and previous.get("hash") == page_hash
+            and self.existing_ids.issuperset(previous.get("chunk_ids", []))
+        ):
+            self.page_records[page.url] = previous
+            self.unchanged_pages.add(page.url)
+            return []
+
+        chunk_ids: List[str] = []  # in page order, for the manifest
+        seen: Set[str] = set()
+        pending: Dict[str, Chunk] = {}
+        for chunk in chunk_page(page, count_tokens=self.count_tokens) if page.text else []:
+            owner = self.chunk_owners.setdefault(chunk.metadata["chunk_hash"][:16], chunk.id)
+            if owner != chunk.id:
+                stats["duplicate_chunks"] += 1
+            if owner in seen:
+                continue
+            seen.add(owner)
+            chunk_ids.append(owner)
+            if owner != chunk.id or owner in self.added_ids or (owner in self.existing_ids and not self.force):
+                continue
+            pending[owner] = chunk
+        self.page_records[page.url] = {"hash": page_hash, "chunk_ids": chunk_ids}
+        self.added_ids.update(pending)
+        return list(pending.values())
+
+    def refresh_boilerplate(self) -> List[Chunk]:
+        """Re-detect boilerplate over this build's pages and return the chunks to embed for
+        pages that were held back or are stripped differently now."""
+        detected = self.detector.detect(settings.rag_boilerplate_min_pages, settings.rag_boilerplate_min_ratio)
+        previous, self.boilerplate = self.boilerplate, detected
+        pending: List[Chunk] = []
+        for url, page in self.raw_pages.items():
+            if self.defer or strip_boilerplate(page, previous).text != strip_boilerplate(page, detected).text:
+                pending.extend(self._plan(page))
+        self.defer = False
+        return pending
+
+    def add_chunks(self, chunks: List[Chunk]) -> None:
+        """Embed ``chunks`` and upsert them into the collection."""
+        for start in range(0, len(chunks), ADD_BATCH_SIZE):
+            batch = chunks[start : start + ADD_BATCH_SIZE]
+            vectors = self.embeddings.encode([c.text for c in batch], batch_size=EMBED_BATCH_SIZE)
+            self.collection.upsert(
+                ids=[c.id for c in batch],
+                documents=[c.text for c in batch],
+                metadatas=[c.metadata for c in batch],
+                embeddings=vectors.tolist() if hasattr(vectors, "tolist") else vectors,
+            )
+
+    def finish(self, failed_urls: Iterable[str] = ()) -> Dict[str, Any]:
+        """Keep failed pages' chunks, delete stale IDs and return the new manifest."""
+        if self.defer:
+            self.add_chunks(self.refresh_boilerplate())
+
+        failed_urls = list(dict.fromkeys(failed_urls))
+        for url in failed_urls:
+            if url in self.previous_pages and url not in self.page_records:
+                self.page_records[url] = self.previous_pages[url]
+
+        keep_ids = {chunk_id for record in self.page_records.values() for chunk_id in record.get("chunk_ids", [])}
+        if not keep_ids:
+            fallback = [c for c in fallback_chunks() if c.id not in self.existing_ids]
+            keep_ids.update(c.id for c in fallback_chunks())
+            self.added_ids.update(c.id for c in fallback)
+            self.add_chunks(fallback)
+
+        # Chunks added earlier in this build can become stale when boilerplate is re-detected
+        to_delete = sorted((self.existing_ids | self.added_ids) - keep_ids)
+        for start in range(0, len(to_delete), ADD_BATCH_SIZE):
+            self.collection.delete(ids=to_delete[start : start + ADD_BATCH_SIZE])
+        added = self.added_ids & keep_ids
+
+        # Backends that buffer writes (numpy) persist them here
+        flush = getattr(self.collection, "flush", None)
+        if callable(flush):
+            flush()
+
+        changed = bool(added or (set(to_delete) & self.existing_ids))
+        previous_version = int(self.manifest.get("version", 0))
+        chars_raw = sum(s["chars_raw"] for s in self.page_stats.values())
+        chars_clean = sum(s["chars_clean"] for s in self.page_stats.values())
+        return {
+            "version": previous_version + 1 if changed or not previous_version else previous_version,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "build_seconds": round(time.perf_counter() - self.started, 3),
+            "embedding_model": getattr(self.embeddings, "model_name", settings.rag_embedding_model),
+            "chunker": self.chunker,
+            "collection": getattr(self.collection, "name", settings.rag_collection_name),
+            "counts": {
+                "pages": len(self.page_records),
+                "pages_unchanged": len(self.unchanged_pages),
+                "chunks": len(keep_ids),
+                "added": len(added),
+                "deleted": len(set(to_delete) & self.existing_ids),
+                "failed": len(failed_urls),
+            },
+            "ingestion": {
+                "boilerplate_blocks": len(self.boilerplate),
+                "chars_raw": chars_raw,
+                "chars_clean": chars_clean,
+                "shrink_ratio": round(1 - chars_clean / chars_raw, 3) if chars_raw else 0.0,
+                "duplicate_chunks": sum(s["duplicate_chunks"] for s in self.page_stats.values()),
+                "chunks_previous": self.manifest.get("counts", {}).get("chunks"),
+            },
+            "boilerplate": {"blocks": sorted(self.boilerplate)},
+            "failed_urls": failed_urls,
+            "pages": self.page_records,
+        }
+
+
+def build_lexical_index(collection: Any) -> BM25Index:
+    """Build the BM25 index over every chunk currently in ``collection``."""
+    rows = collection.get(include=["documents", "metadatas"])
+    return BM25Index(rows["ids"], rows["documents"], rows.get("metadatas"))
+
+
+def write_sidecars(
+    collection: Any,
+    path: str,
+    collection_name: str,
+    manifest: Dict[str, Any],
+    open_collection: Callable[[str], Any],
+    previous_shards: Iterable[str] = (),
+) -> None:
+    """Rebuild the BM25 index and the product shards from ``collection`` and record them in ``manifest``."""
+    lexical_index = build_lexical_index(collection)
+    lexical_path = bm25_path(path, collection_name)
+    lexical_index.save(lexical_path)
+    manifest["bm25"] = {"file": os.path.basename(lexical_path), "documents": len(lexical_index)}
+
+    router = sync_shards(collection, open_collection, collection_name, previous_shards)
+    router.save(shards_path(path, collection_name))
+    manifest["shards"] = {shard: info["chunks"] for shard, info in sorted(router.shards.items())}
+
+
+def build_index(
+    collection: Any,
+    embeddings: Any,
+    pages: List[Page],
+    manifest: Optional[Dict[str, Any]] = None,
+    failed_urls: Iterable[str] = (),
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Bring ``collection`` in sync with already-fetched ``pages`` and return the new manifest."""
+    indexer = IncrementalIndexer(collection, embeddings, manifest=manifest, force=force)
+    for page in pages:
+        chunks = indexer.plan_page(page)
+        if chunks:
+            indexer.add_chunks(chunks)
+    indexer.add_chunks(indexer.refresh_boilerplate())
+    return indexer.finish(failed_urls)
+
+
+async def run_async(
+    urls: Iterable[str] = KB_URLS,
+    path: Optional[str] = None,
+    collection_name: Optional[str] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Scrape ``urls`` and incrementally update the collection, saving the manifest.
+
+    Embedding runs in a worker thread per page as pages arrive, overlapping with
+    the fetches and parses still in flight.
+    """
+    from src.rag.registry import vector_store_registry
+
+    path = path or settings.rag_vector_store_path
+    embeddings = vector_store_registry.get_embeddings()
+    collection = vector_store_registry.get_collection(name=collection_name, path=path)
+    if embeddings is None or collection is None:
+        raise RuntimeError(f"Vector store unavailable: {vector_store_registry.status()['errors']}")
+
+    indexer = IncrementalIndexer(collection, embeddings, manifest=load_manifest(path), force=force)
+    failed: List[str] = []
+    # Never trust the TTL here: a run must see what the site serves now
+    async for url, page in iter_pages(urls, revalidate=True):
+        if page is None:
+            failed.append(url)
+            continue
+        chunks = indexer.plan_page(page)
+        if chunks:
+            await asyncio.to_thread(indexer.add_chunks, chunks)
+
+    # Boilerplate is re-detected once every page is in; only affected pages are re-planned
+    chunks = indexer.refresh_boilerplate()
+    if chunks:
+        await asyncio.to_thread(indexer.add_chunks, chunks)
+    manifest = await asyncio.to_thread(indexer.finish, failed)
+    name = collection_name or settings.rag_collection_name
+    await asyncio.to_thread(
+        write_sidecars,
+        collection,
+        path,
+        name,
+        manifest,
+        lambda shard: vector_store_registry.get_collection(name=shard, path=path),
+        indexer.manifest.get("shards", {}),
+    )
+    save_manifest(path, manifest)
+    return manifest
+
+
+def run(**kwargs) -> Dict[str, Any]:
+    """Synchronous wrapper around :func:`run_async`."""
+    return asyncio.run(run_async(**kwargs))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or refresh the InfinitePay knowledge base index.")
+    parser.add_argument("--path", default=settings.rag_vector_store_path, help="Vector store directory")
+    parser.add_argument("--collection", default=settings.rag_collection_name, help="Collection name")
+    parser.add_argument("--force", action="store_true", help="Re-embed every chunk, ignoring hashes")
+    args = parser.parse_args(argv)
+
+    manifest = run(path=args.path, collection_name=args.collection, force=args.force)
+    summary = {k: v for k, v in manifest.items() if k not in ("pages", "boilerplate")}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""Concurrent scraping stage of the knowledge-base ingestion.
+
+Pages are fetched through one pooled async client with bounded per-host
+concurrency, parsed in worker threads, and yielded as soon as each one is ready,
+so the consumer (chunking + embedding in the indexer) overlaps with the fetches
+that are still in flight. Extracted sections go through the shared page cache
+(``src.web.cache``), so unchanged pages are revalidated instead of re-downloaded.
+The indexer revalidates every page on each run, whatever the cache TTL, and
+treats a page it could not revalidate as failed rather than indexing a stale copy.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Tuple
+
+from src.config.settings import settings
+from src.rag.documents import Page, Section
+from src.web.cache import PageCache, get_page_cache
+from src.web.extract import extract_sections
+from src.web.fetcher import AsyncHostLimiter, create_async_client, fetch_cached_async
+
+
+def _sections_value(html: str) -> List[List[Any]]:
+    """``extract_sections`` in a JSON-serializable form, for the page cache."""
+    return [[section.title, section.blocks] for section in extract_sections(html)]
+
+
+async def _fetch_and_parse(
+    client,
+    url: str,
+    limiter: AsyncHostLimiter,
+    url_timeout: float,
+    parse: Callable[[str], List[Section]],
+    cache: Optional[PageCache] = None,
+    revalidate: bool = False,
+) -> Optional[Page]:
+    try:
+        if parse is extract_sections:
+            value = await fetch_cached_async(
+                client, url, "sections", _sections_value, cache, limiter=limiter, timeout=url_timeout,
+                revalidate=revalidate,
+            )
+            sections = [Section(title=title, blocks=list(blocks)) for title, blocks in value]
+        else:
+            # Custom parsers produce values the cache can't key on
+            sections = await fetch_cached_async(client, url, "custom", parse, None, limiter=limiter, timeout=url_timeout)
+    except Exception:
+        return None
+    page = Page.from_sections(url, sections)
+    return page if page.text else None
+
+
+async def iter_pages(
+    urls: Iterable[str],
+    *,
+    per_host_limit: Optional[int] = None,
+    url_timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    parse: Callable[[str], List[Section]] = extract_sections,
+    client=None,
+    cache: Optional[PageCache] = None,
+    revalidate: bool = False,
+) -> AsyncIterator[Tuple[str, Optional[Page]]]:
+    """Yield ``(url, page)`` in completion order; ``page`` is None when the URL failed.
+
+    URLs are de-duplicated. Each request is bounded by ``url_timeout`` and the whole
+    crawl by ``deadline``: URLs still pending when it expires are cancelled and
+    reported as failed. ``cache`` defaults to the process-wide page cache.
+    ``revalidate`` asks the server about every cached page, even a fresh one, and
+    reports a page whose request failed as failed instead of yielding its cached copy.
+    """
+    per_host_limit = per_host_limit or settings.rag_ingest_per_host_limit
+    url_timeout = url_timeout or settings.rag_ingest_url_timeout
+    deadline = deadline or settings.rag_ingest_deadline
+    cache = cache if cache is not None else get_page_cache()
+
+    unique_urls = list(dict.fromkeys(urls))
+    if not unique_urls:
+        return
+
+    owns_client = client is None
+    client = client or create_async_client(timeout=url_timeout)
+    limiter = AsyncHostLimiter(per_host_limit)
+    loop = asyncio.get_running_loop()
+    expires_at = loop.time() + deadline
+    tasks = {
+        asyncio.create_task(_fetch_and_parse(client, url, limiter, url_timeout, parse, cache, revalidate)): url
+        for url in unique_urls
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = expires_at - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield tasks[task], task.result()
+        for task in pending:
+            task.cancel()
+            yield tasks[task], None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if owns_client:
+            await client.aclose()
+
+
+async def fetch_pages(urls: Iterable[str], **kwargs) -> Tuple[List[Page], List[str]]:
+    """Fetch every URL concurrently; return the pages (in input order) and the failed URLs."""
+    urls = list(urls)
+    results = {}
+    async for url, page in iter_pages(urls, **kwargs):
+        results[url] = page
+    ordered = [url for url in dict.fromkeys(urls) if url in results]
+    pages = [results[url] for url in ordered if results[url] is not None]
+    failed = [url for url in ordered if results[url] is None]
+    return pages, failed
@@ -0,0 +1,156 @@
+"""ONNX Runtime embedding backend.
+
+Runs an exported ``all-MiniLM-L6-v2`` with ``onnxruntime`` + ``tokenizers``
+behind the same ``encode`` interface as ``SentenceTransformer`` (mean pooling
+over the attention mask, then L2 normalization), without importing PyTorch.
+
+Export once (needs ``torch`` and ``transformers``, e.g. on a build machine):
+    python -m src.rag.onnx_embedder --model all-MiniLM-L6-v2 --output ./data/onnx/all-MiniLM-L6-v2 [--quantize]
+
+Then set ``RAG_EMBEDDING_BACKEND=onnx`` (and ``RAG_ONNX_QUANTIZED=true`` for the
+dynamically int8-quantized model).
+"""
+import argparse
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+MODEL_FILENAME = "model.onnx"
+QUANTIZED_MODEL_FILENAME = "model_quantized.onnx"
+TOKENIZER_FILENAME = "tokenizer.json"
+EXPORT_INFO_FILENAME = "export.json"
+INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+class _TokenizerAdapter:
+    """Exposes ``tokenize`` like a Hugging Face tokenizer (used to count chunk tokens)."""
+
+    def __init__(self, tokenizer: Any):
+        self._tokenizer = tokenizer
+
+    def tokenize(self, text: str) -> List[str]:
+        return self._tokenizer.encode(text, add_special_tokens=False).tokens
+
+
+class OnnxEmbedder:
+    """Sentence embeddings from an exported transformer with ONNX Runtime."""
+
+    def __init__(self, model_dir: str, quantized: bool = False, max_length: int = 256, normalize: bool = True):
+        from tokenizers import Tokenizer  # type: ignore
+
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILENAME if quantized else MODEL_FILENAME)
+        self.normalize = normalize
+        self.export_info = read_export_info(model_dir)
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILENAME))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self._tokenizer.token_to_id("[PAD]")
+        self._tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token="[PAD]")
+        self.tokenizer = _TokenizerAdapter(self._tokenizer)
+
+        self.session = self._create_session(self.model_path)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _create_session(self, path: str) -> Any:
+        import onnxruntime as ort  # type: ignore
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        features = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in features.items() if k in self.input_names})[0]
+        mask = features["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embed ``sentences``; mirrors ``SentenceTransformer.encode`` (extra kwargs are ignored).
+
+        Texts are batched by length so short queries are not padded to long chunks.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            indices = order[start : start + batch_size]
+            for i, vector in zip(indices, self._embed_batch([texts[i] for i in indices])):
+                vectors[i] = vector
+        result = np.stack(vectors)
+        return result[0] if single else result
+
+
+def read_export_info(model_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(model_dir, EXPORT_INFO_FILENAME), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def export(model_name: str, output_dir: str, quantize: bool = False, opset: int = 17) -> Dict[str, Any]:
+    """Export a Hugging Face sentence-transformers model (and its tokenizer) to ONNX."""
+    import torch  # type: ignore
+    from transformers import AutoModel, AutoTokenizer  # type: ignore
+
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(repo_id)
+    model = AutoModel.from_pretrained(repo_id)
+    model.config.return_dict = False
+    model.eval()
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)  # writes tokenizer.json (fast tokenizer)
+    model_path = os.path.join(output_dir, MODEL_FILENAME)
+    sample = tokenizer(["InfinitePay maquininha"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in INPUT_NAMES),
+            model_path,
+            input_names=list(INPUT_NAMES),
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in (*INPUT_NAMES, "last_hidden_state")},
+            opset_version=opset,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+        quantize_dynamic(model_path, os.path.join(output_dir, QUANTIZED_MODEL_FILENAME), weight_type=QuantType.QInt8)
+
+    info = {"model": model_name, "repo_id": repo_id, "opset": opset, "quantized": quantize}
+    with open(os.path.join(output_dir, EXPORT_INFO_FILENAME), "w", encoding="utf-8") as fh:
+        json.dump(info, fh, indent=2)
+    return info
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from src.config.settings import settings
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX.")
+    parser.add_argument("--model", default=settings.rag_embedding_model, help="sentence-transformers model name")
+    parser.add_argument("--output", default=settings.rag_onnx_model_dir, help="Output directory")
+    parser.add_argument("--quantize", action="store_true", help="Also write a dynamically int8-quantized model")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(export(args.model, args.output, quantize=args.quantize), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
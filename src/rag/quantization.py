@@ -0,0 +1,45 @@
+"""Compact storage of embedding matrices for the ``numpy`` vector backend.
+
+``float16`` halves the footprint; ``int8`` stores each vector as signed bytes
+with its own scale (``x ~= q * scale``, ``scale = max|x| / 127``), a 4x cut.
+Searches scan the compact matrix block by block and the best candidates can be
+rescored exactly against a float32 copy.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+# Rows converted to float32 at a time while scanning a compact matrix
+SCAN_BLOCK_ROWS = 8192
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return ``(stored, scales)``; ``scales`` is only used by ``int8``."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float32":
+        return matrix, None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0 if len(matrix) else np.zeros(0, np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        stored = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return stored, scales
+    raise ValueError(f"Unknown vector dtype '{dtype}' (expected one of {DTYPES})")
+
+
+def dequantize(stored: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    matrix = np.asarray(stored, dtype=np.float32)
+    return matrix * scales[:, None] if scales is not None else matrix
+
+
+def dot(stored: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """``dequantize(stored, scales) @ query`` without materializing the float32 matrix."""
+    if stored.dtype == np.float32:
+        return stored @ query
+    out = np.empty(len(stored), dtype=np.float32)
+    for start in range(0, len(stored), SCAN_BLOCK_ROWS):
+        block = np.asarray(stored[start : start + SCAN_BLOCK_ROWS], dtype=np.float32)
+        out[start : start + len(block)] = block @ query
+    return out * scales if scales is not None else out
@@ -0,0 +1,382 @@
+"""Process-wide registry for the heavy RAG resources.
+
+Loading ``SentenceTransformer`` and opening a ``chromadb.PersistentClient`` take
+seconds and hundreds of MB, so they are created once per process and every
+``InfinitePayRAGTool`` instance receives the same shared handles. The BM25 index
+and shard router persisted next to the collection are loaded the same way and
+reloaded when the indexer rewrites them.
+
+With ``RAG_ARTIFACT_DIR`` set, the prebuilt index artifact is verified on first use
+and the store and model are served from it (see ``src.rag.artifact``).
+"""
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.config.settings import settings
+from src.rag.artifact import IndexArtifact, check_compatible, load_artifact, serving_index_dir
+from src.rag.backends import create_client
+from src.rag.bm25 import BM25Index, bm25_path
+from src.rag.embedding_cache import QueryEmbeddingCache
+from src.rag.embedding_service import EmbeddingBatcher
+from src.rag.sharding import ShardRouter, shards_path
+
+
+def embedding_backend_name() -> str:
+    """The configured embedding backend: "torch", "onnx" or "onnx-int8"."""
+    if settings.rag_embedding_backend == "onnx":
+        return "onnx-int8" if settings.rag_onnx_quantized else "onnx"
+    return settings.rag_embedding_backend
+
+
+class SharedEmbeddings:
+    """Thread-safe handle around a shared embedding model.
+
+    Fast tokenizers raise "Already borrowed" when used from several threads at once,
+    so calls to ``encode`` are serialized.
+    """
+
+    def __init__(self, model: Any, model_name: str, backend: str = "torch"):
+        self.model = model
+        self.model_name = model_name
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._tokenizer: Any = None
+        self._tokenizer_lock = threading.Lock()
+
+    @property
+    def cache_name(self) -> str:
+        """Model name and backend: what query embedding caches key vectors on."""
+        return f"{self.model_name}@{self.backend}"
+
+    def encode(self, texts, **kwargs):
+        with self._lock:
+            return self.model.encode(texts, **kwargs)
+
+    def count_tokens(self, text: str) -> int:
+        """Count word-piece tokens with a private copy of the model's tokenizer.
+
+        The copy lets chunking run while another thread is encoding.
+        """
+        with self._tokenizer_lock:
+            if self._tokenizer is None:
+                self._tokenizer = copy.deepcopy(self.model.tokenizer)
+            return len(self._tokenizer.tokenize(text))
+
+
+class VectorStoreRegistry:
+    """Loads the embedding model and opens vector store collections once per process."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embeddings: Dict[str, SharedEmbeddings] = {}
+        self._clients: Dict[str, Any] = {}
+        self._collections: Dict[Tuple[str, str], Any] = {}
+        # file path -> (mtime_ns, index or None if it failed to load)
+        self._lexical: Dict[str, Tuple[int, Optional[BM25Index]]] = {}
+        self._routers: Dict[str, Tuple[int, Optional[ShardRouter]]] = {}
+        self._query_cache: Optional[QueryEmbeddingCache] = None
+        self._batchers: Dict[str, EmbeddingBatcher] = {}
+        self._artifact: Optional[IndexArtifact] = None
+        self._artifact_checked = False
+        self._store_path: Optional[str] = None  # the artifact's serving directory, when one is active
+        self._timings: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._failed_at: Dict[str, float] = {}  # key -> time.monotonic() of the last failure
+        self._load_locks: Dict[str, threading.Lock] = {}  # key -> lock held while that handle loads
+
+    # Loaders (isolated so tests can monkeypatch them)
+    def _load_embedding_model(self, model_name: str) -> Any:
+        bundled = self._artifact.model_dir if self._artifact and self._artifact.embedding_model == model_name else None
+        if settings.rag_embedding_backend == "onnx":
+            from src.rag.onnx_embedder import OnnxEmbedder
+
+            model_dir = bundled or settings.rag_onnx_model_dir
+            model = OnnxEmbedder(model_dir, quantized=settings.rag_onnx_quantized)
+            exported = model.export_info.get("model")
+            if exported and exported != model_name:
+                raise ValueError(f"ONNX model in {model_dir} is '{exported}', expected '{model_name}'")
+            return model
+
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        return SentenceTransformer(bundled or model_name)
+
+    def _create_client(self, path: str) -> Any:
+        return create_client(
+            settings.rag_vector_backend,
+            path,
+            dtype=settings.rag_vector_dtype,
+            rescore=settings.rag_vector_rescore,
+        )
+
+    def _open_collection(self, client: Any, name: str) -> Any:
+        # Indexing happens offline (python -m src.rag.indexer); an empty collection is
+        # created if the index was never built so queries degrade to "no results".
+        collection = client.get_or_create_collection(name)
+        if collection.count() == 0:
+            print(f" RAG: collection '{name}' is empty; build it with `python -m src.rag.indexer`")
+        return collection
+
+    def _load_lexical_index(self, path: str) -> BM25Index:
+        return BM25Index.load(path)
+
+    def _load_shard_router(self, path: str) -> ShardRouter:
+        return ShardRouter.load(path)
+
+    def _open_artifact(self, path: str) -> IndexArtifact:
+        artifact = load_artifact(path, verify=settings.rag_artifact_verify)
+        check_compatible(artifact)
+        return artifact
+
+    def activate_artifact(self) -> Optional[IndexArtifact]:
+        """Verify the configured index artifact once and serve the store and model from it.
+
+        On failure the error is recorded (see :meth:`status`) and the regular store is used.
+        Verification runs under its own lock, so status and other handles stay available.
+        """
+        if self._artifact_checked or not settings.rag_artifact_dir:
+            return self._artifact
+        with self._load_lock("artifact"):
+            if self._artifact_checked:
+                return self._artifact
+            path = settings.rag_artifact_dir
+            artifact = self._timed(f"artifact:{path}", lambda: self._open_artifact(path))
+            store_path = serving_index_dir(artifact) if artifact is not None else None
+            with self._lock:
+                self._store_path, self._artifact = store_path, artifact
+                self._artifact_checked = True  # published last: readers skip the lock once it is set
+            if artifact is None:
+                print(f" RAG: index artifact in {path} not used: {self._errors[f'artifact:{path}']}")
+                return None
+            print(
+                f" RAG: index artifact {artifact.version} ready in {artifact.load_seconds:.2f}s "
+                f"({artifact.files} files {'verified' if settings.rag_artifact_verify else 'present'})"
+            )
+            return artifact
+
+    def store_path(self) -> str:
+        """Vector store directory being served: the artifact's index, else ``rag_vector_store_path``."""
+        self.activate_artifact()
+        return self._store_path or settings.rag_vector_store_path
+
+    def _load_lock(self, key: str) -> threading.Lock:
+        """Lock serializing the loads of ``key`` only; other handles stay available meanwhile."""
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def _load_once(self, cache: Dict[Any, Any], key: Any, timed_key: str, loader: Callable[[], Any]) -> Optional[Any]:
+        """``cache[key]``, loading it outside the registry lock and publishing it with a double check.
+
+        Concurrent callers for the same key wait for the one load instead of repeating it.
+        """
+        with self._lock:
+            if key in cache:
+                return cache[key]
+        with self._load_lock(timed_key):
+            with self._lock:
+                if key in cache:
+                    return cache[key]
+            value = self._timed(timed_key, loader)
+            if value is None:
+                return None
+            with self._lock:
+                return cache.setdefault(key, value)
+
+    def _timed(self, key: str, loader: Callable[[], Any]) -> Optional[Any]:
+        """Run ``loader``, recording its duration or the error that prevented it.
+
+        A failed load isn't retried for ``rag_load_retry_seconds`` (or until the next
+        :meth:`warm_up`), so a transient error doesn't disable RAG for the process.
+        Only the bookkeeping takes the registry lock; ``loader`` runs without it.
+        """
+        with self._lock:
+            failed_at = self._failed_at.get(key)
+        if failed_at is not None and time.monotonic() - failed_at < settings.rag_load_retry_seconds:
+            return None
+        started = time.perf_counter()
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = str(e) or e.__class__.__name__
+                self._failed_at[key] = time.monotonic()
+            return None
+        with self._lock:
+            self._errors.pop(key, None)
+            self._failed_at.pop(key, None)
+            self._timings[key] = time.perf_counter() - started
+        return value
+
+    def get_embeddings(self, model_name: Optional[str] = None) -> Optional[SharedEmbeddings]:
+        """Return the shared embedding handle, loading the model on first use."""
+        model_name = model_name or settings.rag_embedding_model
+        self.activate_artifact()
+        return self._load_once(
+            self._embeddings,
+            model_name,
+            f"embeddings:{model_name}",
+            lambda: SharedEmbeddings(self._load_embedding_model(model_name), model_name, embedding_backend_name()),
+        )
+
+    def get_client(self, path: Optional[str] = None) -> Optional[Any]:
+        """Return the shared vector store client for ``path``."""
+        path = path or self.store_path()
+        return self._load_once(self._clients, path, f"client:{path}", lambda: self._create_client(path))
+
+    def get_collection(self, name: Optional[str] = None, path: Optional[str] = None) -> Optional[Any]:
+        """Return the shared collection, opening it on first use."""
+        name = name or settings.rag_collection_name
+        path = path or self.store_path()
+        with self._lock:
+            if (path, name) in self._collections:
+                return self._collections[(path, name)]
+        client = self.get_client(path)
+        if client is None:
+            return None
+        return self._load_once(
+            self._collections,
+            (path, name),
+            f"collection:{path}:{name}",
+            lambda: self._open_collection(client, name),
+        )
+
+    def _get_index_file(
+        self, cache: Dict[str, Tuple[int, Any]], kind: str, file_path: str, loader: Callable[[str], Any]
+    ) -> Optional[Any]:
+        """Load a file written by the indexer, reloading it when its modification time changes.
+
+        The file is parsed outside the registry lock.
+        """
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return None
+        key = f"{kind}:{file_path}"
+        with self._lock:
+            cached = cache.get(file_path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        with self._load_lock(key):
+            with self._lock:
+                cached = cache.get(file_path)
+                if cached is not None and cached[0] == mtime:
+                    return cached[1]
+                # A rewritten file gets another chance even if the previous one failed
+                self._errors.pop(key, None)
+            value = self._timed(key, lambda: loader(file_path))
+            with self._lock:
+                cache[file_path] = (mtime, value)
+            return value
+
+    def get_lexical_index(self, name: Optional[str] = None, path: Optional[str] = None) -> Optional[BM25Index]:
+        """Return the BM25 index built for the collection, or None if there is none.
+
+        The file is reloaded when its modification time changes, so a rebuilt index
+        is picked up without restarting the process.
+        """
+        name = name or settings.rag_collection_name
+        path = path or self.store_path()
+        return self._get_index_file(self._lexical, "bm25", bm25_path(path, name), self._load_lexical_index)
+
+    def get_shard_router(self, name: Optional[str] = None, path: Optional[str] = None) -> Optional[ShardRouter]:
+        """Return the per-product shard router for the collection (None if sharding is off or not built)."""
+        if not settings.rag_sharding_enabled:
+            return None
+        name = name or settings.rag_collection_name
+        path = path or self.store_path()
+        return self._get_index_file(self._routers, "shards", shards_path(path, name), self._load_shard_router)
+
+    def get_embedding_service(self, model_name: Optional[str] = None) -> Optional[EmbeddingBatcher]:
+        """Return the micro-batching encoder for query embeddings (None if disabled or unavailable)."""
+        if not settings.rag_embedding_batching:
+            return None
+        model_name = model_name or settings.rag_embedding_model
+        embeddings = self.get_embeddings(model_name)
+        if embeddings is None:
+            return None
+        with self._lock:
+            if model_name not in self._batchers:
+                self._batchers[model_name] = EmbeddingBatcher(
+                    embeddings,
+                    max_batch_size=settings.rag_embedding_batch_size,
+                    max_wait_ms=settings.rag_embedding_batch_wait_ms,
+                )
+            return self._batchers[model_name]
+
+    def get_query_cache(self) -> QueryEmbeddingCache:
+        """Return the process-wide query embedding cache."""
+        with self._lock:
+            if self._query_cache is None:
+                self._query_cache = QueryEmbeddingCache(
+                    max_size=settings.rag_query_cache_size,
+                    path=settings.rag_query_cache_path,
+                )
+            return self._query_cache
+
+    def warm_up(self) -> Dict[str, Any]:
+        """Load the default model and open the default collection, returning the status."""
+        with self._lock:
+            self._failed_at.clear()  # an explicit warm-up retries earlier failures right away
+        self.get_embeddings()
+        self.get_collection()
+        self.get_lexical_index()
+        router = self.get_shard_router()
+        if router is not None:
+            for shard in router.shards.values():
+                self.get_collection(name=shard["collection"])
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        """Report what is loaded and how long each load took (seconds)."""
+        with self._lock:
+            store_path = self._store_path or settings.rag_vector_store_path
+            return {
+                "backend": settings.rag_vector_backend,
+                "store_path": store_path,
+                "embedding_backend": settings.rag_embedding_backend,
+                "embeddings_loaded": sorted(self._embeddings),
+                "collections_loaded": [f"{path}:{name}" for path, name in self._collections],
+                "lexical_indexes_loaded": [p for p, (_, index) in self._lexical.items() if index is not None],
+                "shard_routers_loaded": {p: sorted(r.shards) for p, (_, r) in self._routers.items() if r is not None},
+                "load_seconds": {k: round(v, 4) for k, v in self._timings.items()},
+                "errors": dict(self._errors),
+                "index": self._index_summary(store_path),
+                "artifact": self._artifact.summary() if self._artifact is not None else None,
+                "query_cache": self._query_cache.stats() if self._query_cache is not None else None,
+                "embedding_batching": {name: b.stats() for name, b in self._batchers.items()},
+                "warm": settings.rag_embedding_model in self._embeddings
+                and (store_path, settings.rag_collection_name) in self._collections,
+            }
+
+    def _index_summary(self, store_path: str) -> Dict[str, Any]:
+        from src.rag.indexer import load_manifest
+
+        manifest = load_manifest(store_path)
+        return {k: manifest[k] for k in ("version", "built_at", "counts") if k in manifest}
+
+    def reset(self) -> None:
+        """Drop every cached handle (mainly for tests)."""
+        with self._lock:
+            for batcher in self._batchers.values():
+                batcher.close()
+            self._batchers.clear()
+            self._embeddings.clear()
+            self._clients.clear()
+            self._collections.clear()
+            self._lexical.clear()
+            self._routers.clear()
+            if self._query_cache is not None:
+                self._query_cache.close()
+                self._query_cache = None
+            self._artifact = None
+            self._artifact_checked = False
+            self._store_path = None
+            self._timings.clear()
+            self._errors.clear()
+            self._failed_at.clear()
+
+
+vector_store_registry = VectorStoreRegistry()
@@ -0,0 +1,93 @@
+"""Hybrid retrieval: dense (vector store) + lexical (BM25) rankings fused with RRF."""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.config.settings import settings
+
+
+@dataclass
+class Hit:
+    id: str
+    document: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # Vector-store distance; None for hits only found by BM25
+    distance: Optional[float] = None
+    score: float = 0.0
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: ``score(id) = sum(1 / (k + rank))`` with 1-based ranks."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    # Stable on ties: earlier rankings (the vector one) win
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def _first(results: Dict[str, Any], key: str) -> List[Any]:
+    values = results.get(key) or []
+    # Chroma returns one list per query embedding: [[...]]
+    return list(values[0]) if values else []
+
+
+def vector_hits(collection: Any, query_embedding: Any, n_results: int) -> List[Hit]:
+    results = collection.query(
+        query_embeddings=query_embedding,
+        n_results=n_results,
+        include=["documents", "metadatas", "distances"],
+    )
+    documents = _first(results, "documents")
+    ids = _first(results, "ids") or documents
+    metadatas = _first(results, "metadatas") or [{} for _ in documents]
+    distances = _first(results, "distances") or [None for _ in documents]
+    return [
+        Hit(id=i, document=doc, metadata=meta or {}, distance=dist)
+        for i, doc, meta, dist in zip(ids, documents, metadatas, distances)
+    ]
+
+
+def lexical_hits(index: Any, query: str, n_results: int) -> List[Hit]:
+    return [
+        Hit(id=index.ids[i], document=index.documents[i], metadata=index.metadatas[i] or {}, score=score)
+        for i, score in index.search(query, n_results)
+    ]
+
+
+def hybrid_search(
+    query: str,
+    query_embedding: Any,
+    collection: Any,
+    lexical_index: Optional[Any] = None,
+    top_k: Optional[int] = None,
+    candidates: Optional[int] = None,
+    rrf_k: Optional[int] = None,
+) -> List[Hit]:
+    """Return the ``top_k`` best chunks for ``query``.
+
+    Without a lexical index (or with hybrid retrieval disabled) this is a plain
+    vector search. Otherwise ``candidates`` results from each retriever are fused
+    with reciprocal rank fusion, so exact-term matches surface even when the
+    embedding ranks them low.
+    """
+    top_k = top_k or settings.rag_top_k
+    if lexical_index is None or not len(lexical_index) or not settings.rag_hybrid_enabled:
+        return vector_hits(collection, query_embedding, top_k)[:top_k]
+
+    candidates = max(candidates or settings.rag_hybrid_candidates, top_k)
+    dense = vector_hits(collection, query_embedding, candidates)
+    lexical = lexical_hits(lexical_index, query, candidates)
+
+    by_id: Dict[str, Hit] = {hit.id: hit for hit in lexical}
+    # Prefer the vector hit (it carries the distance) when both retrievers found a chunk
+    by_id.update({hit.id: hit for hit in dense})
+    fused = reciprocal_rank_fusion(
+        [[hit.id for hit in dense], [hit.id for hit in lexical]],
+        k=rrf_k or settings.rag_rrf_k,
+    )
+    hits = []
+    for item_id, score in fused[:top_k]:
+        hit = by_id[item_id]
+        hit.score = score
+        hits.append(hit)
+    return hits
@@ -0,0 +1,347 @@
+"""Per-product shards of the knowledge base and the router that picks them.
+
+The indexer keeps the global collection (the fallback) and copies each chunk,
+with its stored embedding, into a per-product collection named
+``<collection>__<shard>``. The shard comes from the first path segment of the
+chunk's source URL (``/maquininha-celular`` -> ``maquininha``); new product pages
+get a shard of their own.
+
+At query time :class:`ShardRouter` scores every shard from its term statistics
+and the centroid of its embeddings, and only the 1-2 most likely shards are
+searched. When the query is ambiguous, or the routed shards return nothing, the
+search runs on the global collection.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from src.config.settings import settings
+from src.rag.bm25 import BM25Index, tokenize
+from src.rag.retrieval import Hit, hybrid_search
+
+FORMAT_VERSION = 2
+DEFAULT_SHARD = "geral"
+
+# Product pages grouped by the product they describe; other paths become their own shard
+PRODUCT_SHARDS = {
+    "maquininha": "maquininha",
+    "maquininha-celular": "maquininha",
+    "tap-to-pay": "maquininha",
+    "pdv": "maquininha",
+    "receba-na-hora": "maquininha",
+    "gestao-de-cobranca": "cobranca",
+    "gestao-de-cobranca-2": "cobranca",
+    "link-de-pagamento": "cobranca",
+    "loja-online": "cobranca",
+    "boleto": "cobranca",
+    "conta-digital": "conta",
+    "conta-pj": "conta",
+    "cartao": "conta",
+    "rendimento": "conta",
+    "pix": "pix",
+    "pix-parcelado": "pix",
+    "emprestimo": "emprestimo",
+}
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def shard_for_source(source: Optional[str]) -> str:
+    """Shard of a chunk from its source URL (``geral`` for the home page and fallback docs)."""
+    if not source or "://" not in source:
+        return DEFAULT_SHARD
+    segment = urlparse(source).path.strip("/").split("/")[0].lower()
+    if not segment:
+        return DEFAULT_SHARD
+    return PRODUCT_SHARDS.get(segment) or _SLUG_RE.sub("-", segment).strip("-") or DEFAULT_SHARD
+
+
+def shard_collection_name(collection_name: str, shard: str) -> str:
+    return f"{collection_name}__{shard}"
+
+
+def shards_path(store_path: str, collection_name: str) -> str:
+    return os.path.join(store_path, f"{collection_name}.shards.json")
+
+
+def _unit(vector: Any) -> Optional[np.ndarray]:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else None
+
+
+class ShardRouter:
+    """Picks the shards worth searching for a query.
+
+    ``shards`` maps each shard to ``{"collection", "chunks", "terms", "length",
+    "centroid"}``: term counts over all its chunks and the mean of their embeddings.
+    Each shard gets a routing probability from BM25 over those term counts (one
+    "document" per shard) and from the query's cosine similarity to the centroids
+    (softmax). The fewest shards holding ``coverage`` of the probability are
+    searched; if that takes more than ``max_shards``, the query is ambiguous and
+    the whole collection is searched instead.
+    """
+
+    k1 = 1.2
+    b = 0.5
+
+    def __init__(self, shards: Dict[str, Dict[str, Any]]):
+        self.shards = shards
+        self._centroids = {name: _unit(s["centroid"]) if s.get("centroid") else None for name, s in shards.items()}
+        self._df = Counter(term for s in shards.values() for term in s.get("terms", {}))
+        lengths = [s.get("length", 0) for s in shards.values()]
+        self._avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    @classmethod
+    def build(
+        cls,
+        collection_name: str,
+        metadatas: Sequence[Dict[str, Any]],
+        documents: Sequence[str],
+        embeddings: Optional[Sequence[Any]] = None,
+    ) -> "ShardRouter":
+        """Count terms and average embeddings over the chunks of every shard."""
+        groups: Dict[str, List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            groups.setdefault(shard_for_source((metadata or {}).get("source")), []).append(row)
+
+        shards: Dict[str, Dict[str, Any]] = {}
+        for name, rows in groups.items():
+            terms = Counter(t for r in rows for t in tokenize(documents[r]))
+            centroid = None
+            if embeddings is not None and len(embeddings):
+                vectors = [v for v in (_unit(embeddings[r]) for r in rows) if v is not None]
+                if vectors:
+                    mean = _unit(np.mean(vectors, axis=0))
+                    centroid = mean.tolist() if mean is not None else None
+            shards[name] = {
+                "collection": shard_collection_name(collection_name, name),
+                "chunks": len(rows),
+                "terms": dict(sorted(terms.items())),
+                "length": sum(terms.values()),
+                "centroid": centroid,
+            }
+        return cls(shards)
+
+    def _lexical_scores(self, query: str) -> Dict[str, float]:
+        scores = {name: 0.0 for name in self.shards}
+        n = len(self.shards)
+        for term in set(tokenize(query)):
+            df = self._df.get(term, 0)
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for name, shard in self.shards.items():
+                tf = shard.get("terms", {}).get(term, 0)
+                if tf:
+                    norm = 1 - self.b + self.b * shard.get("length", 0) / (self._avg_length or 1.0)
+                    scores[name] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+    def _vector_scores(self, query_embedding: Any) -> Dict[str, float]:
+        query_vector = _unit(query_embedding) if query_embedding is not None else None
+        if query_vector is None:
+            return {}
+        return {
+            name: float(centroid @ query_vector)
+            for name, centroid in self._centroids.items()
+            if centroid is not None and centroid.shape == query_vector.shape
+        }
+
+    def probabilities(self, query: str, query_embedding: Any = None, temperature: Optional[float] = None) -> Dict[str, float]:
+        """Routing probability of every shard (averaged over the signals available for the query)."""
+        temperature = temperature or settings.rag_shard_temperature
+        signals: List[Dict[str, float]] = []
+        lexical = self._lexical_scores(query)
+        total = sum(lexical.values())
+        if total > 0:
+            signals.append({name: score / total for name, score in lexical.items()})
+        similarities = self._vector_scores(query_embedding)
+        if similarities:
+            top = max(similarities.values())
+            weights = {name: math.exp((sim - top) / temperature) for name, sim in similarities.items()}
+            total = sum(weights.values())
+            signals.append({name: w / total for name, w in weights.items()})
+        if not signals:
+            return {}
+        return {name: sum(signal.get(name, 0.0) for signal in signals) / len(signals) for name in self.shards}
+
+    def route(
+        self,
+        query: str,
+        query_embedding: Any = None,
+        max_shards: Optional[int] = None,
+        coverage: Optional[float] = None,
+    ) -> List[str]:
+        """Best shard(s) for ``query``; an empty list means "search everything"."""
+        max_shards = max_shards or settings.rag_shard_max_routed
+        coverage = settings.rag_shard_coverage if coverage is None else coverage
+        if len(self.shards) < 2:
+            return []
+        probabilities = self.probabilities(query, query_embedding)
+        covered = 0.0
+        selected: List[str] = []
+        for name, probability in sorted(probabilities.items(), key=lambda item: (-item[1], item[0]))[:max_shards]:
+            selected.append(name)
+            covered += probability
+            if covered >= coverage:
+                return selected
+        return []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"format": FORMAT_VERSION, "shards": self.shards}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ShardRouter":
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported shard router format: {data.get('format')}")
+        return cls(data["shards"])
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ShardRouter":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_dict(json.load(fh))
+
+
+def sync_shards(
+    collection: Any,
+    open_collection: Callable[[str], Any],
+    collection_name: str,
+    previous_shards: Iterable[str] = (),
+) -> ShardRouter:
+    """Copy every chunk of ``collection`` into its shard collection and return the router.
+
+    Chunks are copied with their stored embeddings (nothing is re-embedded); IDs
+    no longer in the global collection are deleted, and shards that disappeared
+    (``previous_shards``) are emptied.
+    """
+    rows = collection.get(include=["documents", "metadatas", "embeddings"])
+    ids, documents = rows["ids"], rows["documents"]
+    metadatas = rows.get("metadatas") or [{} for _ in ids]
+    embeddings = rows.get("embeddings")
+    embeddings = [list(map(float, e)) for e in embeddings] if embeddings is not None else []
+
+    router = ShardRouter.build(collection_name, metadatas, documents, embeddings)
+    wanted: Dict[str, Dict[str, int]] = {name: {} for name in router.shards}
+    for row, metadata in enumerate(metadatas):
+        wanted[shard_for_source((metadata or {}).get("source"))][ids[row]] = row
+
+    for name in set(wanted) | set(previous_shards):
+        shard = open_collection(shard_collection_name(collection_name, name))
+        rows_by_id = wanted.get(name, {})
+        existing = set(shard.get(include=[])["ids"])
+        stale = sorted(existing - set(rows_by_id))
+        if stale:
+            shard.delete(ids=stale)
+        missing = [row for item_id, row in rows_by_id.items() if item_id not in existing]
+        if missing:
+            shard.upsert(
+                ids=[ids[r] for r in missing],
+                documents=[documents[r] for r in missing],
+                metadatas=[metadatas[r] for r in missing],
+                embeddings=[embeddings[r] for r in missing],
+            )
+        flush = getattr(shard, "flush", None)
+        if callable(flush):
+            flush()
+    return router
+
+
+class RoutedCollection:
+    """Read-only view querying several shard collections and merging them by distance."""
+
+    def __init__(self, collections: Sequence[Any]):
+        self.collections = list(collections)
+
+    def query(self, query_embeddings: Any, n_results: int = 10, include: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        merged: List[Tuple[float, int, str, str, Dict[str, Any]]] = []
+        for collection in self.collections:
+            results = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                include=["documents", "metadatas", "distances"],
+            )
+            documents = (results.get("documents") or [[]])[0]
+            ids = (results.get("ids") or [documents])[0]
+            metadatas = (results.get("metadatas") or [[{}] * len(documents)])[0]
+            distances = (results.get("distances") or [[math.inf] * len(documents)])[0]
+            for i, doc, meta, dist in zip(ids, documents, metadatas, distances):
+                merged.append((dist, len(merged), i, doc, meta))
+        merged.sort(key=lambda item: (item[0], item[1]))
+        top = merged[:n_results]
+        return {
+            "ids": [[i for _, _, i, _, _ in top]],
+            "documents": [[doc for _, _, _, doc, _ in top]],
+            "metadatas": [[meta for _, _, _, _, meta in top]],
+            "distances": [[dist for dist, _, _, _, _ in top]],
+        }
+
+
+class RoutedLexicalIndex:
+    """The global BM25 index restricted to the chunks of some shards."""
+
+    def __init__(self, index: BM25Index, shards: Iterable[str]):
+        self.index = index
+        shards = set(shards)
+        self.rows: Set[int] = set().union(
+            *(rows for source, rows in index.rows_by_source.items() if shard_for_source(source) in shards)
+        )
+        self.ids, self.documents, self.metadatas = index.ids, index.documents, index.metadatas
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[int, float]]:
+        return self.index.search(query, n_results, restrict=self.rows)
+
+
+def routed_search(
+    query: str,
+    query_embedding: Any,
+    collection: Any,
+    router: Optional[ShardRouter] = None,
+    open_collection: Optional[Callable[[str], Any]] = None,
+    lexical_index: Optional[BM25Index] = None,
+    top_k: Optional[int] = None,
+) -> Tuple[List[Hit], List[str]]:
+    """Hybrid search on the shards picked by ``router``, else on the global ``collection``.
+
+    Returns the hits and the shards searched (empty when the global collection was used).
+    """
+    shards: List[str] = []
+    if router is not None and open_collection is not None and settings.rag_sharding_enabled:
+        shards = router.route(query, _first_vector(query_embedding))
+    if shards:
+        collections = [c for c in (open_collection(router.shards[name]["collection"]) for name in shards) if c is not None]
+        if len(collections) == len(shards):
+            hits = hybrid_search(
+                query,
+                query_embedding,
+                RoutedCollection(collections),
+                lexical_index=RoutedLexicalIndex(lexical_index, shards) if lexical_index is not None else None,
+                top_k=top_k,
+            )
+            if hits:
+                return hits, shards
+    return hybrid_search(query, query_embedding, collection, lexical_index=lexical_index, top_k=top_k), []
+
+
+def _first_vector(query_embedding: Any) -> Any:
+    array = np.asarray(query_embedding, dtype=np.float32)
+    return array[0] if array.ndim == 2 else array
@@ -0,0 +1,24 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Type
+
+from crewai.tools import BaseTool
+
+
+@lru_cache(maxsize=None)
+def _class_metadata(tool_cls: Type[BaseTool]) -> Dict[str, str]:
+    fields = tool_cls.model_fields
+    return {"name": fields["name"].default, "description": fields["description"].default}
+
+
+def tool_metadata(tool_cls: Type[BaseTool]) -> Dict[str, str]:
+    """Return the tool ``name``/``description`` declared on the class, without instantiating it.
+
+    Instantiating some tools is expensive (e.g. the RAG tool loads models), so catalogs and
+    prompts should describe tools from their class defaults instead.
+    """
+    return dict(_class_metadata(tool_cls))
+
+
+def describe_tools(tool_classes: Iterable[Type[BaseTool]]) -> List[Dict[str, str]]:
+    """Return the metadata of each tool class, in order."""
+    return [tool_metadata(tool_cls) for tool_cls in tool_classes]
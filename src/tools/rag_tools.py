@@ -2,11 +2,12 @@ from typing import Type, Optional
 from pydantic import BaseModel, Field
 
 from crewai.tools import BaseTool
-# Optional heavy dependencies are guarded to avoid import errors in light environments
-try:
-    from sentence_transformers import SentenceTransformer  # type: ignore
-except Exception:  # pragma: no cover - graceful fallback
-    SentenceTransformer = None  # type: ignore
+
+from src.config.settings import settings
+from src.rag.chunking import make_token_counter
+from src.rag.compression import compress_hits
+from src.rag.registry import vector_store_registry
+from src.rag.sharding import routed_search
 
 class RAGInput(BaseModel):
     query: str = Field(description="Consulta para buscar na base de conhecimento")
@@ -21,6 +22,17 @@ class InfinitePayRAGTool(BaseTool):
     client: Optional[object] = None
     embeddings: Optional[object] = None
     collection: Optional[object] = None
+    # BM25 index built alongside the collection (None -> vector-only retrieval)
+    lexical_index: Optional[object] = None
+    # Process-wide cache of query embeddings (None -> encode every query)
+    query_cache: Optional[object] = None
+    # Batches query encodes of concurrent requests (None -> call the model directly)
+    embedding_service: Optional[object] = None
+    # Picks the per-product shards to search (None -> always search the whole collection)
+    shard_router: Optional[object] = None
+    # Handles came from vector_store_registry: the collection and index files are re-read
+    # on every query, so a long-lived (pooled) tool sees a rebuilt index
+    shared_handles: bool = False
 
     def __init__(self):
         super().__init__()
@@ -33,150 +45,77 @@ class InfinitePayRAGTool(BaseTool):
             self.collection = None
 
     def _setup_vector_store(self):
-        """Setup do vector store com dados InfinitePay"""
-        # chromadb is optional; if unavailable, disable RAG gracefully
-        try:
-            import chromadb  # type: ignore
-            from chromadb.errors import InvalidCollectionException  # type: ignore
-        except Exception:
-            self.client = None
-            self.embeddings = None
-            self.collection = None
-            return
+        """Setup do vector store com dados InfinitePay.
 
-        # sentence-transformers may be unavailable in constrained environments
-        if SentenceTransformer is None:
-            self.client = None
+        The embedding model, client and collection are process-wide handles owned by
+        ``vector_store_registry``; only the first tool in the process pays for loading them.
+        Heavy dependencies are optional: if any of them is unavailable, RAG is disabled gracefully.
+        """
+        self.embeddings = vector_store_registry.get_embeddings()
+        self.client = vector_store_registry.get_client() if self.embeddings is not None else None
+        if self.client is None:
             self.embeddings = None
             self.collection = None
             return
 
-        self.client = chromadb.PersistentClient(path="./data/vector_store")
-        self.embeddings = SentenceTransformer('all-MiniLM-L6-v2')
+        # The collection is built offline by `python -m src.rag.indexer`; never index here.
+        self.collection = vector_store_registry.get_collection()
+        self.lexical_index = vector_store_registry.get_lexical_index()
+        self.query_cache = vector_store_registry.get_query_cache()
+        self.embedding_service = vector_store_registry.get_embedding_service()
+        self.shard_router = vector_store_registry.get_shard_router()
+        self.shared_handles = True
 
-        try:
-            self.collection = self.client.get_collection("infinitepay_kb")
-        except (ValueError, InvalidCollectionException):
-            self.collection = self.client.create_collection("infinitepay_kb")
-            self._index_infinitepay_data()
+    def _refresh_handles(self):
+        """Current collection, BM25 index and shard router (the registry reloads rebuilt files)."""
+        self.collection = vector_store_registry.get_collection() or self.collection
+        self.lexical_index = vector_store_registry.get_lexical_index()
+        self.shard_router = vector_store_registry.get_shard_router()
+
+    def _open_shard(self, name: str):
+        return vector_store_registry.get_collection(name=name)
 
     def _run(self, query: str) -> str:
         """Executa busca RAG"""
         try:
+            if self.shared_handles:
+                self._refresh_handles()
             if self.client is None or self.embeddings is None or self.collection is None:
                 # If not initialized (e.g., tests), signal graceful message
                 return "Não encontrei informações específicas na base de conhecimento InfinitePay."
 
-            raw_embedding = self.embeddings.encode([query])
-            # Support numpy arrays or native Python lists
-            query_embedding = raw_embedding.tolist() if hasattr(raw_embedding, "tolist") else raw_embedding
-            results = self.collection.query(
-                query_embeddings=query_embedding,
-                n_results=5,
-                include=["documents", "metadatas", "distances"],
+            encoder = self.embedding_service or self.embeddings
+            if self.query_cache is not None:
+                query_embedding = [self.query_cache.embed(query, encoder)]
+            else:
+                raw_embedding = encoder.encode([query])
+                # Support numpy arrays or native Python lists
+                query_embedding = raw_embedding.tolist() if hasattr(raw_embedding, "tolist") else raw_embedding
+            # Dense + BM25 results fused with reciprocal rank fusion (dense only without a BM25 index),
+            # searched in the 1-2 product shards the router picks, else in the whole collection
+            hits, _ = routed_search(
+                query,
+                query_embedding,
+                self.collection,
+                router=self.shard_router,
+                open_collection=self._open_shard,
+                lexical_index=self.lexical_index,
+                top_k=settings.rag_top_k,
             )
 
-            documents = results.get("documents") or []
-            # documents is typically a list of lists: [[doc1, doc2, ...]]
-            docs = documents[0] if documents else []
-            if not docs:
+            # Drop weak matches and near-duplicates, then fit the prompt token budget
+            context = compress_hits(hits, count_tokens=make_token_counter(self.embeddings))
+            if not context.hits:
                 return "Não encontrei informações específicas na base de conhecimento InfinitePay."
 
-            context = "\n".join(docs)
-            return f"Informações encontradas na base InfinitePay:\n{context}"
+            result = f"Informações encontradas na base InfinitePay:\n{context.text}"
+            if context.sources:
+                result += "\nFontes: " + ", ".join(context.sources)
+            return result
 
         except Exception as e:
             return f"Erro na busca RAG: {str(e)}"
 
-    def _index_infinitepay_data(self):
-        """Indexa dados das URLs InfinitePay.
-        Tenta fazer scraping leve; se indisponível, indexa documentos estáticos mínimos.
-        """
-        urls = [
-            "https://www.infinitepay.io",
-            "https://www.infinitepay.io/maquininha",
-            "https://www.infinitepay.io/pix",
-            "https://www.infinitepay.io/maquininha-celular",
-            "https://www.infinitepay.io/tap-to-pay",
-            "https://www.infinitepay.io/pdv",
-            "https://www.infinitepay.io/receba-na-hora",
-            "https://www.infinitepay.io/gestao-de-cobranca",
-            "https://www.infinitepay.io/gestao-de-cobranca-2",
-            "https://www.infinitepay.io/link-de-pagamento",
-            "https://www.infinitepay.io/loja-online",
-            "https://www.infinitepay.io/boleto",
-            "https://www.infinitepay.io/conta-digital",
-            "https://www.infinitepay.io/conta-pj",
-            "https://www.infinitepay.io/pix",
-            "https://www.infinitepay.io/pix-parcelado",
-            "https://www.infinitepay.io/emprestimo",
-            "https://www.infinitepay.io/cartao",
-            "https://www.infinitepay.io/rendimento",
-        ]
-
-        docs = []
-        metadatas = []
-        ids = []
-
-        # Attempt to scrape if requests/bs4 available
-        try:
-            import requests  # type: ignore
-            from bs4 import BeautifulSoup  # type: ignore
-
-            for i, url in enumerate(urls, start=1):
-                try:
-                    resp = requests.get(url, timeout=10)
-                    resp.raise_for_status()
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    # Extract visible text
-                    for script in soup(["script", "style", "noscript"]):
-                        script.extract()
-                    text = " ".join(soup.get_text(" ").split())
-                    if not text:
-                        continue
-
-                    # Chunk text into ~700-char chunks
-                    chunk_size = 700
-                    for j in range(0, len(text), chunk_size):
-                        chunk = text[j : j + chunk_size]
-                        docs.append(chunk)
-                        metadatas.append({"source": url})
-                        ids.append(f"doc-{i}-{j//chunk_size}")
-                except Exception:
-                    # Skip URL on failure
-                    continue
-
-        except Exception:
-            # Fallback to static minimal documents
-            fallback = [
-                "A InfinitePay oferece maquininhas com taxas competitivas e suporte ao PIX.",
-                "A conta digital InfinitePay permite pagamentos, cartões e rendimento.",
-                "O PIX da InfinitePay facilita recebimentos rápidos para seu negócio.",
-            ]
-            for k, txt in enumerate(fallback, start=1):
-                docs.append(txt)
-                metadatas.append({"source": "fallback"})
-                ids.append(f"static-{k}")
-
-        if not docs:
-            # Ensure at least one doc
-            docs = ["Informações gerais sobre InfinitePay e seus produtos (fallback)."]
-            metadatas = [{"source": "fallback"}]
-            ids = ["static-0"]
-
-        # Embed and add to collection
-        try:
-            embeddings = self.embeddings.encode(docs).tolist()  # type: ignore[attr-defined]
-            self.collection.add(documents=docs, metadatas=metadatas, ids=ids, embeddings=embeddings)  # type: ignore[attr-defined]
-        except Exception:
-            # If embedding fails, try without embeddings (if collection has embedding function)
-            try:
-                self.collection.add(documents=docs, metadatas=metadatas, ids=ids)  # type: ignore[attr-defined]
-            except Exception:
-                # Last resort: ignore indexing errors silently to avoid breaking init
-                return
-
 if __name__ == "__main__":
     print(InfinitePayRAGTool().name)
-    # tool = InfinitePayRAGTool()
-    # tool._index_infinitepay_data()
\ No newline at end of file
+    # Build/refresh the index with: python -m src.rag.indexer
@@ -1,6 +1,20 @@
 from typing import List
 
+from src.web.cache import get_page_cache
+from src.web.extract import parse_stream
+from src.web.fetcher import fetch_cached
+
 
 def scrape_page(url: str, selectors: List[str]) -> dict:
-    """Scrape content from a page (stub)."""
-    return {"url": url, "data": {sel: f"content for {sel}" for sel in selectors}}
+    """Scrape the texts matched by each CSS selector of a page.
+
+    The page goes through the shared pooled client and page cache and is parsed as
+    it streams in; ``data`` maps every selector to the texts of its matches.
+    """
+
+    def select(chunks, encoding) -> dict:
+        page = parse_stream(chunks, encoding)
+        return {selector: page.select_texts(selector) for selector in selectors}
+
+    data = fetch_cached(url, "select:" + "|".join(selectors), cache=get_page_cache(), parse_stream=select)
+    return {"url": url, "data": data}
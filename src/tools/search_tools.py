@@ -1,7 +1,14 @@
 from crewai.tools import BaseTool
-from typing import Type
+from typing import Optional, Tuple, Type
 from pydantic import BaseModel, Field
 
+from src.config.settings import settings
+from src.web.cache import get_page_cache
+from src.web.extract import extraction_available, parse_stream
+from src.web.fetcher import DeadlineExceeded, fetch_all
+from src.web.search_cache import get_search_cache
+from src.web.passages import select_passages
+
 class WebSearchInput(BaseModel):
     query: str = Field(description="Consulta para busca web")
     max_results: int = Field(default=5, description="Número máximo de resultados")
@@ -12,6 +19,16 @@ class WebSearchTool(BaseTool):
     description: str = "Busca informações na web usando DuckDuckGo"
     args_schema: Type[BaseModel] = WebSearchInput
 
+    # Ranks page passages alongside BM25 (None -> the shared RAG embedder, if it loads)
+    embeddings: Optional[object] = None
+
+    def _ranking_embeddings(self) -> Optional[object]:
+        if self.embeddings is None and settings.web_search_semantic_ranking:
+            from src.rag.registry import vector_store_registry
+
+            self.embeddings = vector_store_registry.get_embeddings()
+        return self.embeddings
+
     def _run(self, query: str, max_results: int) -> str:
         try:
             from duckduckgo_search import DDGS  # type: ignore
@@ -22,65 +39,99 @@ class WebSearchTool(BaseTool):
             )
 
         try:
-            ddgs = DDGS()
-            results = ddgs.text(keywords=query, max_results=max_results)
-
-            # Lazy import for optional dependencies
-            try:
-                import requests  # type: ignore
-                from bs4 import BeautifulSoup  # type: ignore
-            except Exception:
-                requests = None  # type: ignore
-                BeautifulSoup = None  # type: ignore
-
-            def extract_page_text(url: str) -> str:
-                if not url:
-                    return "(Sem URL para extrair conteúdo)"
-                if requests is None or BeautifulSoup is None:  # type: ignore
-                    return (
-                        "(Extração desabilitada: dependências ausentes. "
-                        "Conteúdo limitado ao resumo do resultado.)"
-                    )
-                try:
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-                    }
-                    resp = requests.get(url, timeout=10, headers=headers)  # type: ignore
-                    resp.raise_for_status()
-                    soup = BeautifulSoup(resp.text, "html.parser")  # type: ignore
-                    for tag in soup(["script", "style", "noscript"]):
-                        tag.extract()
-                    text = " ".join(soup.get_text(" ").split())
-                    if not text:
-                        return "(Sem conteúdo textual visível nesta página)"
-                    
-                    return text
-                except Exception:
-                    return "(Falha ao extrair conteúdo desta página)"
-
-            lines = [f"Resultados para '{query}':\n"]
-            for i, r in enumerate(results, 1):
-                title = r.get("title", "Sem título")
-                url = r.get("href", "")
-                preview = r.get("body", "Sem descrição")
-                page_text = extract_page_text(url)
-
-                lines.append(f"{i}. {title}")
-                if url:
-                    lines.append(f"   URL: {url}")
-                if preview:
-                    lines.append(f"   Prévia: {preview[:300]}...")
-                lines.append("   Conteúdo extraído:")
-                for chunk in page_text.splitlines():
-                    chunk = chunk.strip()
-                    if chunk:
-                        lines.append(f"     {chunk}")
-                lines.append("")
-
-            return "\n".join(lines).strip() or "Nenhum resultado encontrado."
+            cache = get_search_cache()
+            if cache is None:
+                body, _ = self._search(DDGS, query, max_results)
+            else:
+                # Identical searches share one execution while in flight, then the cached result
+                body = cache.get_or_search(query, max_results, lambda: self._search(DDGS, query, max_results))
+            return f"Resultados para '{query}':\n\n{body}".strip()
         except Exception as e:
             return f"Erro na busca web: {str(e)}"
 
+    def _search(self, DDGS, query: str, max_results: int) -> Tuple[str, bool]:
+        """Search, fetch and rank; return the formatted results and whether they may be cached.
+
+        Results with pages that missed the deadline are not cached, so the next search can complete them.
+        """
+        ddgs = DDGS()
+        results = list(ddgs.text(keywords=query, max_results=max_results) or [])
+
+        extraction = extraction_available()
+
+        def main_text(chunks, encoding) -> str:
+            # Bodies are parsed as they stream in (capped at WEB_MAX_PAGE_BYTES)
+            return parse_stream(chunks, encoding).text(settings.web_main_content_selectors)
+
+        # All result pages are fetched at once (pooled client, bounded per host); pages
+        # still loading at the deadline are left out instead of holding up the answer
+        pages = {}
+        if extraction:
+            pages = fetch_all(
+                [r.get("href", "") for r in results],
+                per_host_limit=settings.web_search_per_host_limit,
+                url_timeout=settings.web_search_page_timeout,
+                deadline=settings.web_search_deadline,
+                parse_stream=main_text,
+                # Repeat lookups are served from the shared page cache (revalidated once stale)
+                cache=get_page_cache(),
+                kind="main_text",
+            )
+        # Only the passages most relevant to the query reach the agent, within one budget
+        excerpts = select_passages(
+            query,
+            {url: page for url, page in pages.items() if isinstance(page, str) and page},
+            char_budget=settings.web_search_char_budget,
+            per_page=settings.web_search_passages_per_page,
+            embeddings=self._ranking_embeddings() if pages else None,
+        )
+
+        def extract_page_text(url: str) -> str:
+            if not url:
+                return "(Sem URL para extrair conteúdo)"
+            if not extraction:
+                return (
+                    "(Extração desabilitada: dependências ausentes. "
+                    "Conteúdo limitado ao resumo do resultado.)"
+                )
+            page = pages.get(url)
+            if isinstance(page, DeadlineExceeded):
+                return "(Página não carregou a tempo; conteúdo limitado ao resumo do resultado)"
+            if isinstance(page, BaseException) or page is None:
+                return "(Falha ao extrair conteúdo desta página)"
+            if not page:
+                return "(Sem conteúdo textual visível nesta página)"
+            return excerpts.pages[url].text or "(Nenhum trecho relevante dentro do limite de tamanho)"
+
+        lines = []
+        for i, r in enumerate(results, 1):
+            title = r.get("title", "Sem título")
+            url = r.get("href", "")
+            preview = r.get("body", "Sem descrição")
+            page_text = extract_page_text(url)
+
+            lines.append(f"{i}. {title}")
+            if url:
+                lines.append(f"   URL: {url}")
+            if preview:
+                lines.append(f"   Prévia: {preview[:300]}...")
+            lines.append("   Conteúdo extraído:")
+            for chunk in page_text.splitlines():
+                chunk = chunk.strip()
+                if chunk:
+                    lines.append(f"     {chunk}")
+            lines.append("")
+
+        if excerpts.dropped_chars:
+            lines.append(
+                f"(Conteúdo reduzido aos trechos mais relevantes: {excerpts.kept_chars} de "
+                f"{excerpts.kept_chars + excerpts.dropped_chars} caracteres; "
+                f"{excerpts.dropped_passages} trechos omitidos)"
+            )
+
+        complete = not any(isinstance(page, DeadlineExceeded) for page in pages.values())
+        return "\n".join(lines).strip(), complete
+
 
 if __name__ == "__main__":
     tool = WebSearchTool()
@@ -0,0 +1 @@
+# web package
@@ -0,0 +1,216 @@
+"""HTTP fetch cache shared by the web search tool and the knowledge-base ingestion.
+
+The same infinitepay.io and help-center pages are requested over and over. The
+cache keeps what was *extracted* from each page (not the raw HTML) together with
+its ``ETag``/``Last-Modified`` validators:
+
+- fresh entries (younger than the TTL) are served without touching the network;
+- stale entries are revalidated with a conditional GET: a ``304`` renews them
+  without downloading or parsing the page again;
+- if revalidation fails, the stale value is served rather than nothing.
+
+Entries live in a bounded in-memory LRU and, optionally, in a SQLite file that
+survives restarts. Keys are the URL plus the kind of extraction (the web tool's
+visible text and the indexer's sections are different values of the same page).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from src.config.settings import settings
+
+# fresh: no request; revalidated: 304; fetched: full download; stale_on_error: revalidation failed
+EVENTS = ("fresh", "revalidated", "fetched", "stale_on_error")
+
+
+@dataclass
+class CachedPage:
+    value: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+    expires_at: float = 0.0
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _no_store(headers: Mapping[str, str]) -> bool:
+    cache_control = (headers.get("cache-control") or "").lower()
+    return "no-store" in cache_control
+
+
+class PageCache:
+    """Bounded LRU of extracted page content with an optional SQLite write-through store."""
+
+    def __init__(self, max_size: int = 512, ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], CachedPage]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.counts = dict.fromkeys(EVENTS, 0)
+        self.disk_hits = 0
+        if self.path:
+            self._db = self._open_db(self.path)
+
+    def _open_db(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL,"
+                " etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (url, kind))"
+            )
+            db.commit()
+            return db
+        except (OSError, sqlite3.Error) as e:
+            print(f" Web: page cache at '{path}' unavailable ({e}); using memory only")
+            return None
+
+    def _remember(self, key: Tuple[str, str], entry: CachedPage) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key: Tuple[str, str]) -> Optional[CachedPage]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT value, etag, last_modified, fetched_at, expires_at FROM pages WHERE url = ? AND kind = ?", key
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return CachedPage(json.loads(row[0]), row[1], row[2], row[3], row[4])
+
+    def _disk_put(self, key: Tuple[str, str], entry: CachedPage) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(entry.value, ensure_ascii=False), entry.etag, entry.last_modified,
+                 entry.fetched_at, entry.expires_at),
+            )
+            self._db.commit()
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    def get(self, url: str, kind: str) -> Optional[CachedPage]:
+        """Return the entry for ``url`` (memory, then disk), fresh or stale, or None."""
+        key = (url, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self.disk_hits += 1
+            return entry
+
+    def put(self, url: str, kind: str, value: Any, headers: Mapping[str, str]) -> None:
+        """Store a freshly fetched value with the validators of its response."""
+        if _no_store(headers):
+            return
+        now = time.time()
+        entry = CachedPage(value, headers.get("etag"), headers.get("last-modified"), now, now + self.ttl)
+        with self._lock:
+            self._remember((url, kind), entry)
+            self._disk_put((url, kind), entry)
+
+    def renew(self, url: str, kind: str, entry: CachedPage, headers: Mapping[str, str]) -> None:
+        """The server answered 304: keep the value, refresh validators and expiry."""
+        now = time.time()
+        renewed = CachedPage(
+            entry.value,
+            headers.get("etag") or entry.etag,
+            headers.get("last-modified") or entry.last_modified,
+            now,
+            now + self.ttl,
+        )
+        with self._lock:
+            self._remember((url, kind), renewed)
+            self._disk_put((url, kind), renewed)
+
+    def record(self, event: str) -> None:
+        with self._lock:
+            self.counts[event] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = sum(self.counts.values())
+            # Requests answered without downloading the page body
+            served = self.counts["fresh"] + self.counts["revalidated"] + self.counts["stale_on_error"]
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "persistent": self._db is not None,
+                **self.counts,
+                "disk_hits": self.disk_hits,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+                "network_free_rate": round(self.counts["fresh"] / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """Drop the in-memory entries and counters (the disk store is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.counts = dict.fromkeys(EVENTS, 0)
+            self.disk_hits = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache_lock = threading.Lock()
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Process-wide page cache (None when ``WEB_CACHE_ENABLED`` is off)."""
+    global _page_cache
+    if not settings.web_cache_enabled:
+        return None
+    with _cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(
+                max_size=settings.web_cache_size,
+                ttl=settings.web_cache_ttl_seconds,
+                path=settings.web_cache_path,
+            )
+        return _page_cache
+
+
+def reset_page_cache() -> None:
+    """Close and forget the process-wide cache (mainly for tests)."""
+    global _page_cache
+    with _cache_lock:
+        if _page_cache is not None:
+            _page_cache.close()
+            _page_cache = None
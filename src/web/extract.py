@@ -0,0 +1,260 @@
+"""HTML-to-text extraction shared by ingestion, web search and scraping.
+
+Parsing full pages with BeautifulSoup's pure-Python ``html.parser`` was one of the
+most CPU-heavy things the workers did. Pages are parsed with lxml (libxml2) by
+default, falling back to BeautifulSoup when lxml isn't installed
+(``WEB_HTML_PARSER=bs4`` forces it). Both backends produce the same output.
+
+- :func:`extract_sections` / :func:`extract_text`: visible text grouped by heading,
+  or flat, for an HTML string;
+- :func:`parse_stream`: incremental parsing of a streamed response body, fed
+  chunk by chunk and cut at ``max_bytes``, so huge pages are never held whole;
+- ``selectors``: simple CSS selectors (``main``, ``#content``, ``div.article``,
+  ``[role=main]``, descendants) that narrow extraction to the page's main content.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from src.config.settings import settings
+from src.rag.documents import Page, Section
+
+try:
+    import lxml.html as lxml_html
+except Exception:  # pragma: no cover - lxml ships with the requirements
+    lxml_html = None
+
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+BLOCK_TAGS = ["p", "li", "td", "th", "dt", "dd", "blockquote", "pre", "figcaption", "div", "section", "article"]
+STRUCTURAL_TAGS = HEADING_TAGS + BLOCK_TAGS
+INVISIBLE_TAGS = ["script", "style", "noscript", "template"]
+
+_SELECTOR_STEP_RE = re.compile(
+    r"^(?P<tag>[a-zA-Z][\w-]*|\*)?(?:#(?P<id>[\w-]+))?(?:\.(?P<cls>[\w-]+))?"
+    r"(?:\[(?P<attr>[\w-]+)(?:=[\"']?(?P<value>[^\"'\]]*)[\"']?)?\])?$"
+)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    backend = backend or settings.web_html_parser
+    if backend not in ("lxml", "bs4"):
+        raise ValueError(f"Unknown HTML parser backend: {backend}")
+    return "bs4" if backend == "lxml" and lxml_html is None else backend
+
+
+def extraction_available() -> bool:
+    if lxml_html is not None:
+        return True
+    try:
+        import bs4  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def selector_xpath(selector: str) -> str:
+    """Translate a simple CSS selector (descendant combinators only) to XPath."""
+    steps = []
+    for part in selector.split():
+        match = _SELECTOR_STEP_RE.match(part)
+        if not match or not any(match.groupdict().values()):
+            raise ValueError(f"Unsupported selector: {selector!r}")
+        conditions = []
+        if match["id"]:
+            conditions.append(f"@id='{match['id']}'")
+        if match["cls"]:
+            conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {match['cls']} ')")
+        if match["attr"]:
+            value = match["value"]
+            conditions.append(f"@{match['attr']}='{value}'" if value is not None else f"@{match['attr']}")
+        steps.append((match["tag"] or "*") + "".join(f"[{c}]" for c in conditions))
+    return "//" + "//".join(steps)
+
+
+# --- lxml backend -----------------------------------------------------------------
+
+
+def _new_lxml_parser(encoding: Optional[str] = None):
+    return lxml_html.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+
+
+def _lxml_clean(root) -> Any:
+    for element in list(root.iter(*INVISIBLE_TAGS)):
+        element.drop_tree()  # keeps the text that follows the element
+    return root
+
+
+def _lxml_text(element) -> str:
+    return _normalize(" ".join(element.itertext()))
+
+
+def _lxml_sections(roots: Sequence[Any]) -> List[Section]:
+    sections: List[Section] = [Section(title="")]
+    for root in roots:
+        for element in root.iter(*STRUCTURAL_TAGS):
+            if element.tag not in HEADING_TAGS and next(element.iterdescendants(*STRUCTURAL_TAGS), None) is not None:
+                continue
+            text = _lxml_text(element)
+            if not text:
+                continue
+            if element.tag in HEADING_TAGS:
+                sections.append(Section(title=text))
+            else:
+                sections[-1].blocks.append(text)
+    return sections
+
+
+def _lxml_select(root, selectors: Optional[Sequence[str]]) -> List[Any]:
+    """Elements matched by the first selector that matches anything (the whole page if none)."""
+    for selector in selectors or ():
+        matches = root.xpath(selector_xpath(selector))
+        if matches:
+            # Drop matches nested in an earlier match so no text is read twice
+            return [m for m in matches if not any(a in matches for a in m.iterancestors())]
+    return [root]
+
+
+# --- BeautifulSoup backend --------------------------------------------------------
+
+
+def _bs4_parse(html: str):
+    from bs4 import BeautifulSoup  # type: ignore
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(INVISIBLE_TAGS):
+        tag.extract()
+    return soup
+
+
+def _bs4_sections(roots: Sequence[Any]) -> List[Section]:
+    sections: List[Section] = [Section(title="")]
+    for root in roots:
+        for tag in root.find_all(STRUCTURAL_TAGS):
+            if tag.name not in HEADING_TAGS and tag.find(STRUCTURAL_TAGS) is not None:
+                continue
+            text = _normalize(tag.get_text(" "))
+            if not text:
+                continue
+            if tag.name in HEADING_TAGS:
+                sections.append(Section(title=text))
+            else:
+                sections[-1].blocks.append(text)
+    return sections
+
+
+def _bs4_select(soup, selectors: Optional[Sequence[str]]) -> List[Any]:
+    for selector in selectors or ():
+        matches = soup.select(selector)
+        if matches:
+            return [m for m in matches if not any(p in matches for p in m.parents)]
+    return [soup]
+
+
+# --- public API -------------------------------------------------------------------
+
+
+class ParsedPage:
+    """A parsed, cleaned (no scripts/styles) HTML document."""
+
+    def __init__(self, root: Any, backend: str):
+        self.root = root
+        self.backend = backend
+
+    def select(self, selectors: Optional[Sequence[str]]) -> List[Any]:
+        if self.backend == "lxml":
+            return _lxml_select(self.root, selectors)
+        return _bs4_select(self.root, selectors)
+
+    def sections(self, selectors: Optional[Sequence[str]] = None) -> List[Section]:
+        """Visible text grouped by heading; only "leaf" blocks are read, so text isn't duplicated."""
+        roots = self.select(selectors)
+        sections = _lxml_sections(roots) if self.backend == "lxml" else _bs4_sections(roots)
+        sections = [s for s in sections if s.blocks]
+        if not sections:
+            # Pages without block markup: fall back to the flat visible text
+            text = self.text(selectors)
+            sections = [Section(title="", blocks=[text])] if text else []
+        return sections
+
+    def text(self, selectors: Optional[Sequence[str]] = None) -> str:
+        roots = self.select(selectors)
+        if self.backend == "lxml":
+            return _normalize(" ".join(_lxml_text(root) for root in roots))
+        return _normalize(" ".join(root.get_text(" ") for root in roots))
+
+    def select_texts(self, selector: str) -> List[str]:
+        """Text of every element matching ``selector`` (empty if none)."""
+        if self.backend == "lxml":
+            matches = self.root.xpath(selector_xpath(selector))
+            return [t for t in (_lxml_text(m) for m in matches) if t]
+        return [t for t in (_normalize(m.get_text(" ")) for m in self.root.select(selector)) if t]
+
+
+def parse_html(html: str, backend: Optional[str] = None) -> ParsedPage:
+    backend = resolve_backend(backend)
+    if backend == "bs4":
+        return ParsedPage(_bs4_parse(html), backend)
+    if not html.strip():
+        html = "<html></html>"
+    parser = _new_lxml_parser()
+    parser.feed(html)
+    return ParsedPage(_lxml_clean(parser.close()), backend)
+
+
+def parse_stream(
+    chunks: Iterable[bytes],
+    encoding: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    backend: Optional[str] = None,
+) -> ParsedPage:
+    """Parse a response body as it streams in, reading at most ``max_bytes``.
+
+    With lxml every chunk is fed to the parser as soon as it arrives, so the body
+    is never held as a whole string; the BeautifulSoup fallback has to buffer it.
+    A page cut at ``max_bytes`` is parsed up to that point.
+    """
+    backend = resolve_backend(backend)
+    max_bytes = settings.web_max_page_bytes if max_bytes is None else max_bytes
+    parser = _new_lxml_parser(encoding) if backend == "lxml" else None
+    buffered: List[bytes] = []
+    read = 0
+    for chunk in chunks:
+        if max_bytes and read + len(chunk) > max_bytes:
+            chunk = chunk[: max_bytes - read]
+        read += len(chunk)
+        if chunk:
+            if parser is not None:
+                parser.feed(chunk)
+            else:
+                buffered.append(chunk)
+        if max_bytes and read >= max_bytes:
+            break
+    if parser is None:
+        return ParsedPage(_bs4_parse(b"".join(buffered).decode(encoding or "utf-8", errors="replace")), backend)
+    if not read:
+        parser.feed(b"<html></html>")
+    return ParsedPage(_lxml_clean(parser.close()), backend)
+
+
+def extract_sections(html: str, selectors: Optional[Sequence[str]] = None, backend: Optional[str] = None) -> List[Section]:
+    """Extract the visible text of an HTML page, grouped by heading."""
+    return parse_html(html, backend).sections(selectors)
+
+
+def extract_text(html: str, selectors: Optional[Sequence[str]] = None, backend: Optional[str] = None) -> str:
+    """Extract the visible text of an HTML page (section structure flattened)."""
+    return Page.from_sections("", extract_sections(html, selectors, backend)).text
+
+
+def visible_text(html: str, selectors: Optional[Sequence[str]] = None, backend: Optional[str] = None) -> str:
+    """All visible text of the page (or of its ``selectors`` match), whitespace-normalized."""
+    return parse_html(html, backend).text(selectors)
+
+
+def select_texts(html: str, selectors: Sequence[str], backend: Optional[str] = None) -> Dict[str, List[str]]:
+    """``{selector: texts of its matches}`` for every selector."""
+    page = parse_html(html, backend)
+    return {selector: page.select_texts(selector) for selector in selectors}
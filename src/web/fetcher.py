@@ -0,0 +1,385 @@
+"""Shared, pooled HTTP fetching helpers.
+
+Every scraper in the service goes through these helpers so connections are reused
+(keep-alive pools) and no single host receives more than a bounded number of
+concurrent requests.
+
+The async helpers serve the offline indexer. Tools run synchronously inside agent
+threads, so they use :func:`fetch_all`: a process-wide ``httpx.Client`` and worker
+pool, per-host limits and one deadline for the whole batch.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from src.config.settings import settings
+from src.web.cache import PageCache
+
+try:
+    import httpx
+except Exception:  # pragma: no cover
+    httpx = None
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+MAX_CONNECTIONS = 32
+# Worker threads shared by every synchronous batch fetch in the process
+FETCH_WORKERS = 16
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class AsyncHostLimiter:
+    """Bounds the number of concurrent requests per host."""
+
+    def __init__(self, per_host: int):
+        self.per_host = max(1, per_host)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def for_url(self, url: str) -> asyncio.Semaphore:
+        host = host_of(url)
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._semaphores[host]
+
+
+def create_async_client(timeout: float = 10.0, max_connections: int = MAX_CONNECTIONS) -> "httpx.AsyncClient":
+    """Create a pooled async client; share one per batch of fetches."""
+    if httpx is None:  # pragma: no cover - httpx is a core dependency
+        raise RuntimeError("httpx is required for pooled fetching")
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=timeout,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+async def fetch_text_async(
+    client: "httpx.AsyncClient",
+    url: str,
+    limiter: Optional[AsyncHostLimiter] = None,
+    timeout: float = 10.0,
+) -> str:
+    """GET ``url`` through ``client`` (respecting the host limit) and return the body text.
+
+    ``timeout`` is a hard per-URL deadline for the request itself; time spent waiting
+    for a host slot is bounded by the caller's overall deadline instead.
+    """
+    if limiter is None:
+        resp = await asyncio.wait_for(client.get(url), timeout)
+    else:
+        async with limiter.for_url(url):
+            resp = await asyncio.wait_for(client.get(url), timeout)
+    resp.raise_for_status()
+    return resp.text
+
+
+async def _read_async(
+    client: "httpx.AsyncClient", url: str, headers: Optional[Dict[str, str]], max_bytes: Optional[int]
+) -> Tuple["httpx.Response", bytes]:
+    async with client.stream("GET", url, headers=headers) as resp:
+        if resp.status_code == 304:
+            return resp, b""
+        resp.raise_for_status()
+        body = bytearray()
+        async for chunk in resp.aiter_bytes():
+            body += chunk
+            if max_bytes and len(body) >= max_bytes:
+                del body[max_bytes:]
+                break
+        return resp, bytes(body)
+
+
+async def fetch_cached_async(
+    client: "httpx.AsyncClient",
+    url: str,
+    kind: str,
+    parse: Callable[[str], Any],
+    cache: Optional[PageCache] = None,
+    limiter: Optional[AsyncHostLimiter] = None,
+    timeout: float = 10.0,
+    max_bytes: Optional[int] = None,
+    revalidate: bool = False,
+) -> Any:
+    """Async twin of :func:`fetch_cached`; the body is read up to ``max_bytes`` and parsed in a worker thread.
+
+    ``revalidate`` always asks the server (a conditional GET even for a fresh entry)
+    and raises when the request fails instead of serving the cached value.
+    """
+    max_bytes = settings.web_max_page_bytes if max_bytes is None else max_bytes
+    entry = cache.get(url, kind) if cache is not None else None
+    if entry is not None and entry.fresh and not revalidate:
+        cache.record("fresh")
+        return entry.value
+    headers = entry.conditional_headers() if entry else None
+    try:
+        if limiter is None:
+            resp, body = await asyncio.wait_for(_read_async(client, url, headers, max_bytes), timeout)
+        else:
+            async with limiter.for_url(url):
+                resp, body = await asyncio.wait_for(_read_async(client, url, headers, max_bytes), timeout)
+        if entry is not None and resp.status_code == 304:
+            cache.renew(url, kind, entry, resp.headers)
+            cache.record("revalidated")
+            return entry.value
+    except Exception:
+        if entry is None or revalidate:
+            raise
+        cache.record("stale_on_error")
+        return entry.value
+    # Parsing is CPU-bound; keep it off the event loop so fetches keep flowing
+    value = await asyncio.to_thread(parse, _decode(resp, body))
+    if cache is not None:
+        cache.put(url, kind, value, resp.headers)
+        cache.record("fetched")
+    return value
+
+
+class HostLimiter:
+    """Thread-safe bound on concurrent requests per host (the sync twin of AsyncHostLimiter)."""
+
+    def __init__(self, per_host: int):
+        self.per_host = max(1, per_host)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> threading.BoundedSemaphore:
+        host = host_of(url)
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+
+_shared_lock = threading.Lock()
+_shared_client: Optional["httpx.Client"] = None
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_limiters: Dict[int, HostLimiter] = {}
+
+
+def get_shared_client() -> "httpx.Client":
+    """Process-wide pooled sync client (thread-safe, keep-alive connections reused across calls)."""
+    global _shared_client
+    if httpx is None:  # pragma: no cover - httpx is a core dependency
+        raise RuntimeError("httpx is required for pooled fetching")
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = httpx.Client(
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            )
+        return _shared_client
+
+
+def get_host_limiter(per_host: int) -> HostLimiter:
+    """Process-wide limiter for ``per_host``, so concurrent batches share the per-host bound."""
+    per_host = max(1, per_host)
+    with _shared_lock:
+        if per_host not in _shared_limiters:
+            _shared_limiters[per_host] = HostLimiter(per_host)
+        return _shared_limiters[per_host]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+        return _shared_executor
+
+
+class DeadlineExceeded(TimeoutError):
+    """The batch deadline expired before this URL was fetched."""
+
+
+def _capped(chunks: Iterable[bytes], max_bytes: Optional[int], read_until: Optional[float] = None) -> Iterator[bytes]:
+    """Yield ``chunks`` up to ``max_bytes`` in total (all of them if falsy), then stop reading.
+
+    Past ``read_until`` (``time.monotonic()``) the read fails with ``httpx.ReadTimeout``:
+    per-chunk read timeouts don't bound a server that keeps trickling bytes.
+    """
+    read = 0
+    for chunk in chunks:
+        if read_until is not None and time.monotonic() >= read_until:
+            raise httpx.ReadTimeout("body not read before the deadline")
+        if max_bytes and read + len(chunk) >= max_bytes:
+            yield chunk[: max_bytes - read]
+            return
+        read += len(chunk)
+        yield chunk
+
+
+@contextmanager
+def _open(
+    client: "httpx.Client",
+    url: str,
+    limiter: Optional[HostLimiter],
+    timeout: float,
+    expires_at: Optional[float],
+    headers: Optional[Dict[str, str]] = None,
+) -> Iterator[Tuple["httpx.Response", float]]:
+    """Stream a GET of ``url``, waiting at most until ``expires_at`` for a host slot.
+
+    Yields the response and the time (``time.monotonic()``) by which its body must
+    be read: ``timeout`` after the request starts, clipped to ``expires_at``. Pass it
+    to :func:`_capped`; the response is closed when the read fails. The host slot is
+    held while the body is read. A clipped timeout that fires is a missed deadline.
+    """
+    semaphore = limiter.for_url(url) if limiter is not None else None
+    if semaphore is not None:
+        wait_for = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+        if not semaphore.acquire(timeout=wait_for):
+            raise DeadlineExceeded(url)
+    try:
+        clipped = expires_at is not None and expires_at - time.monotonic() < timeout
+        if clipped:
+            timeout = expires_at - time.monotonic()
+            if timeout <= 0:
+                raise DeadlineExceeded(url)
+        read_until = time.monotonic() + timeout
+        try:
+            with client.stream("GET", url, timeout=timeout, headers=headers) as resp:
+                yield resp, read_until
+        except httpx.TimeoutException as e:
+            if clipped:
+                raise DeadlineExceeded(url) from e
+            raise
+    finally:
+        if semaphore is not None:
+            semaphore.release()
+
+
+def _decode(resp: "httpx.Response", body: bytes) -> str:
+    return body.decode(resp.charset_encoding or "utf-8", errors="replace")
+
+
+def fetch_text(
+    url: str,
+    client: Optional["httpx.Client"] = None,
+    limiter: Optional[HostLimiter] = None,
+    timeout: float = 10.0,
+    expires_at: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    """GET ``url`` (waiting at most until ``expires_at`` for a host slot) and return the body text."""
+    max_bytes = settings.web_max_page_bytes if max_bytes is None else max_bytes
+    with _open(client or get_shared_client(), url, limiter, timeout, expires_at) as (resp, read_until):
+        resp.raise_for_status()
+        return _decode(resp, b"".join(_capped(resp.iter_bytes(), max_bytes, read_until)))
+
+
+def fetch_cached(
+    url: str,
+    kind: str,
+    parse: Optional[Callable[[str], Any]] = None,
+    cache: Optional[PageCache] = None,
+    client: Optional["httpx.Client"] = None,
+    limiter: Optional[HostLimiter] = None,
+    timeout: float = 10.0,
+    expires_at: Optional[float] = None,
+    parse_stream: Optional[Callable[[Iterable[bytes], Optional[str]], Any]] = None,
+    max_bytes: Optional[int] = None,
+) -> Any:
+    """Return the parsed body of ``url``, going through ``cache`` (see ``src.web.cache``).
+
+    Fresh entries skip the network; stale ones are revalidated with a conditional
+    GET and reused on ``304`` (or if the revalidation fails). The body is read up
+    to ``max_bytes``: ``parse_stream(chunks, encoding)`` consumes it as it arrives,
+    otherwise it is decoded and passed to ``parse`` (or returned as text).
+    """
+    client = client or get_shared_client()
+    max_bytes = settings.web_max_page_bytes if max_bytes is None else max_bytes
+    entry = cache.get(url, kind) if cache is not None else None
+    if entry is not None and entry.fresh:
+        cache.record("fresh")
+        return entry.value
+    try:
+        headers = entry.conditional_headers() if entry else None
+        with _open(client, url, limiter, timeout, expires_at, headers) as (resp, read_until):
+            if entry is not None and resp.status_code == 304:
+                cache.renew(url, kind, entry, resp.headers)
+                cache.record("revalidated")
+                return entry.value
+            resp.raise_for_status()
+            chunks = _capped(resp.iter_bytes(), max_bytes, read_until)
+            if parse_stream is not None:
+                value = parse_stream(chunks, resp.charset_encoding)
+            else:
+                text = _decode(resp, b"".join(chunks))
+                value = parse(text) if parse is not None else text
+    except Exception:
+        if entry is None:
+            raise
+        cache.record("stale_on_error")
+        return entry.value
+    if cache is not None:
+        cache.put(url, kind, value, resp.headers)
+        cache.record("fetched")
+    return value
+
+
+def fetch_all(
+    urls: Iterable[str],
+    *,
+    per_host_limit: int = 2,
+    url_timeout: float = 10.0,
+    deadline: float = 15.0,
+    parse: Optional[Callable[[str], Any]] = None,
+    client: Optional["httpx.Client"] = None,
+    cache: Optional[PageCache] = None,
+    kind: str = "text",
+    parse_stream: Optional[Callable[[Iterable[bytes], Optional[str]], Any]] = None,
+) -> Dict[str, Any]:
+    """Fetch (and ``parse``) every URL concurrently, returning whatever finished within ``deadline``.
+
+    The result maps each unique URL to its parsed body, or to the exception that
+    prevented it (``DeadlineExceeded`` for URLs still pending at the deadline).
+    Pending work is abandoned, not waited for; each request, body included, is
+    still bounded by ``url_timeout`` and stops reading at the deadline. The
+    per-host limit is shared with every other batch in the process. With a
+    ``cache``, parsed values are stored under ``kind``;
+    ``parse_stream`` parses bodies incrementally instead of ``parse``.
+    """
+    unique_urls = list(dict.fromkeys(u for u in urls if u))
+    if not unique_urls:
+        return {}
+    client = client or get_shared_client()
+    limiter = get_host_limiter(per_host_limit)
+    expires_at = time.monotonic() + deadline
+
+    def job(url: str) -> Any:
+        return fetch_cached(
+            url,
+            kind,
+            parse,
+            cache,
+            client=client,
+            limiter=limiter,
+            timeout=url_timeout,
+            expires_at=expires_at,
+            parse_stream=parse_stream,
+        )
+
+    executor = _get_executor()
+    futures: Dict[Future, str] = {executor.submit(job, url): url for url in unique_urls}
+    results: Dict[str, Any] = {}
+    pending = set(futures)
+    while pending:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            results[futures[future]] = error if error is not None else future.result()
+    for future in pending:
+        future.cancel()
+        results[futures[future]] = DeadlineExceeded(futures[future])
+    return {url: results[url] for url in unique_urls}
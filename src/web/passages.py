@@ -0,0 +1,143 @@
+"""Query-relevant passages of fetched web pages.
+
+A result page's visible text can run to hundreds of KB, most of it navigation,
+footers and unrelated sections. Pages are split into sentence-aligned passages,
+ranked against the query (BM25, fused with the shared embedder's cosine ranking
+when one is loaded), and only the best passages of each page are kept within a
+total character budget. What was left out is counted so the tool can say so.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.rag.bm25 import BM25Index
+from src.rag.chunking import split_sentences
+from src.rag.retrieval import reciprocal_rank_fusion
+
+PASSAGE_CHARS = 600
+# The budget is split evenly between pages, but each page gets room for at least one passage
+MIN_PAGE_CHARS = PASSAGE_CHARS
+# Passages per page re-ranked with the embedder (the BM25 best, padded in page order)
+RERANK_CANDIDATES = 24
+
+
+@dataclass
+class PageExcerpt:
+    passages: List[str]
+    total_chars: int
+    total_passages: int
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.passages)
+
+    @property
+    def dropped_chars(self) -> int:
+        return max(0, self.total_chars - sum(len(p) for p in self.passages))
+
+
+@dataclass
+class Excerpts:
+    pages: Dict[str, PageExcerpt] = field(default_factory=dict)
+
+    @property
+    def kept_chars(self) -> int:
+        return sum(len(p) for page in self.pages.values() for p in page.passages)
+
+    @property
+    def dropped_chars(self) -> int:
+        return sum(page.dropped_chars for page in self.pages.values())
+
+    @property
+    def dropped_passages(self) -> int:
+        return sum(page.total_passages - len(page.passages) for page in self.pages.values())
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_CHARS) -> List[str]:
+    """Pack consecutive sentences into passages of at most ``max_chars`` (long sentences are cut)."""
+    passages: List[str] = []
+    current = ""
+    for sentence in split_sentences(" ".join(text.split())):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                passages.append(current)
+                current = ""
+            passages.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        passages.append(current)
+    return passages
+
+
+def rank_passages(
+    query: str, passages: Sequence[str], embeddings: Optional[Any] = None, candidates: int = RERANK_CANDIDATES
+) -> List[int]:
+    """Passage indices, most relevant first.
+
+    BM25 ranks the passages that share terms with the query. With ``embeddings``,
+    the first ``candidates`` of that ranking (padded in page order) are also ranked
+    by cosine similarity and the two rankings are fused (RRF); embedding every
+    passage of a huge page would cost more than the LLM call it saves. Unmatched
+    passages follow in page order, so a page with no match yields its opening.
+    """
+    if not passages:
+        return []
+    lexical = [i for i, _ in BM25Index([str(i) for i in range(len(passages))], passages).search(query, len(passages))]
+    matched = set(lexical)
+    ranking = lexical + [i for i in range(len(passages)) if i not in matched]
+    if embeddings is None or len(passages) < 2:
+        return ranking
+    pool = ranking[:candidates]
+    try:
+        vectors = np.asarray(embeddings.encode([query, *(passages[i] for i in pool)]), dtype=np.float32)
+    except Exception:
+        return ranking
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    similarities = (vectors[1:] @ vectors[0]) / (norms[1:] * norms[0])
+    semantic = [str(pool[i]) for i in np.argsort(-similarities, kind="stable")]
+    fused = [int(i) for i, _ in reciprocal_rank_fusion([[str(i) for i in lexical[:candidates]], semantic])]
+    seen = set(fused)
+    return fused + [i for i in ranking if i not in seen]
+
+
+def select_passages(
+    query: str,
+    pages: Dict[str, str],
+    char_budget: int,
+    per_page: int,
+    embeddings: Optional[Any] = None,
+) -> Excerpts:
+    """Keep the top ``per_page`` passages of every page, within ``char_budget`` characters overall.
+
+    Each page gets an even share of the budget (unused share carries over to the
+    following pages); kept passages are returned in page order.
+    """
+    excerpts = Excerpts()
+    remaining = char_budget
+    for position, (url, text) in enumerate(pages.items()):
+        passages = split_passages(text)
+        share = max(MIN_PAGE_CHARS, remaining // max(1, len(pages) - position))
+        share = min(share, remaining)
+        kept: List[int] = []
+        used = 0
+        for index in rank_passages(query, passages, embeddings):
+            if len(kept) >= per_page:
+                break
+            if used + len(passages[index]) <= share:
+                kept.append(index)
+                used += len(passages[index])
+        remaining -= used
+        excerpts.pages[url] = PageExcerpt(
+            passages=[passages[i] for i in sorted(kept)],
+            total_chars=sum(len(p) for p in passages),
+            total_passages=len(passages),
+        )
+    return excerpts
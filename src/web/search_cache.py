@@ -0,0 +1,162 @@
+"""Result cache and single-flight de-duplication for web searches.
+
+When a popular question spikes, many Knowledge steps run the same search at the
+same time. Results are cached for a short TTL under the normalized query, and
+concurrent identical searches that miss the cache share one in-flight execution
+(search + page fetches + ranking) instead of each calling DuckDuckGo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from src.config.settings import settings
+from src.rag.embedding_cache import normalize_query
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs one ``fn`` per key at a time; concurrent callers with the same key wait for its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return ``(value, shared)``; ``shared`` is True for callers that waited on another's call."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+class SearchResultCache:
+    """TTL-bounded LRU of search results keyed by normalized query, with single-flight misses."""
+
+    def __init__(self, max_size: int = 256, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Any]]" = OrderedDict()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query: str, max_results: int) -> Tuple[str, int]:
+        return normalize_query(query), max_results
+
+    def get(self, query: str, max_results: int) -> Optional[Any]:
+        key = self.key(query, max_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, query: str, max_results: int, value: Any) -> None:
+        key = self.key(query, max_results)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_search(self, query: str, max_results: int, search: Callable[[], Tuple[Any, bool]]) -> Any:
+        """Return the cached result, or run ``search`` once for every concurrent identical caller.
+
+        ``search`` returns ``(value, cacheable)``; values it marks uncacheable (e.g.
+        partial results) are still shared with the callers already waiting.
+        """
+        value = self.get(query, max_results)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        def run() -> Any:
+            # A caller that lost the race for the previous flight may find the result cached now
+            cached = self.get(query, max_results)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached
+            result, cacheable = search()
+            with self._lock:
+                self.misses += 1
+            if cacheable:
+                self.put(query, max_results, result)
+            return result
+
+        value, shared = self._flight.do(self.key(query, max_results), run)
+        if shared:
+            with self._lock:
+                self.shared += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.shared + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "shared_in_flight": self.shared,
+                "searches": self.misses,
+                "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared = self.misses = 0
+
+
+_cache_lock = threading.Lock()
+_search_cache: Optional[SearchResultCache] = None
+
+
+def get_search_cache() -> Optional[SearchResultCache]:
+    """Process-wide search result cache (None when ``WEB_SEARCH_CACHE_ENABLED`` is off)."""
+    global _search_cache
+    if not settings.web_search_cache_enabled:
+        return None
+    with _cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchResultCache(
+                max_size=settings.web_search_cache_size, ttl=settings.web_search_cache_ttl_seconds
+            )
+        return _search_cache
+
+
+def reset_search_cache() -> None:
+    """Forget the process-wide cache (mainly for tests)."""
+    global _search_cache
+    with _cache_lock:
+        _search_cache = None
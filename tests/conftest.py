@@ -5,3 +5,221 @@ import sys
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+import datetime
+import hashlib
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from src.rag.documents import Page
+from src.web.cache import reset_page_cache
+from src.web.search_cache import reset_search_cache
+
+PAGES_DIR = os.path.join(PROJECT_ROOT, "tests", "fixtures", "pages")
+
+
+class _SavedPagesHandler(BaseHTTPRequestHandler):
+    """Serves the saved pages in tests/fixtures/pages (``/pix`` -> ``pix.html``).
+
+    ``?delay=<seconds>`` answers late, ``?trickle=<seconds>`` sends the body 100 bytes
+    at a time with that pause between writes, and ``/error`` answers 500, to simulate
+    slow and failing hosts. Pages carry an ``ETag``; a matching ``If-None-Match`` gets a 304.
+    """
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.strip("/") or "index"
+        self.server.hits[path] += 1
+        query = parse_qs(parts.query)
+        delay = float(query.get("delay", ["0"])[0])
+        trickle = float(query.get("trickle", ["0"])[0])
+        if delay:
+            time.sleep(delay)
+        if path == "error":
+            self.send_error(500)
+            return
+        file_path = os.path.join(PAGES_DIR, f"{path}.html")
+        if not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+        with open(file_path, "rb") as fh:
+            body = fh.read()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.not_modified[path] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not trickle:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), 100):
+            self.wfile.write(body[start : start + 100])
+            time.sleep(trickle)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up on a slow page close the connection before it is written
+        pass
+
+
+@pytest.fixture
+def pages_server():
+    """Local HTTP server with the saved pages; exposes ``base_url``, per-path ``hits`` and ``not_modified``."""
+    server = _QuietServer(("127.0.0.1", 0), _SavedPagesHandler)
+    server.hits = Counter()
+    server.not_modified = Counter()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_web_caches():
+    """Every test starts with empty process-wide page and search caches."""
+    reset_page_cache()
+    reset_search_cache()
+    yield
+    reset_page_cache()
+    reset_search_cache()
+
+
+class FakeEmbeddings:
+    """Records what it encodes; vectors are ``[len(text), 1.0]``."""
+
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32):
+        self.encoded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class FakeCollection:
+    """In-memory collection: ``rows`` maps id -> (document, metadata, embedding).
+
+    ``documents`` seeds it with texts (source ``fake``) or ``(id, text)`` pairs
+    (source ``id``). ``query`` ignores the embedding: rows come back in insertion
+    order, all at distance 0.1.
+    """
+
+    name = "fake_kb"
+
+    def __init__(self, documents=()):
+        self.rows = {}
+        for i, document in enumerate(documents):
+            if isinstance(document, tuple):
+                self.rows[document[0]] = (document[1], {"source": document[0]}, None)
+            else:
+                self.rows[f"doc{i}"] = (document, {"source": "fake"}, None)
+
+    def count(self):
+        return len(self.rows)
+
+    def query(self, query_embeddings, n_results=5, include=None):
+        rows = list(self.rows.items())[:n_results]
+        return {
+            "ids": [[i for i, _ in rows]],
+            "documents": [[doc for _, (doc, _, _) in rows]],
+            "metadatas": [[meta for _, (_, meta, _) in rows]],
+            "distances": [[0.1 for _ in rows]],
+        }
+
+    def get(self, include=None, ids=None):
+        result = {
+            "ids": list(self.rows),
+            "documents": [doc for doc, _, _ in self.rows.values()],
+            "metadatas": [meta for _, meta, _ in self.rows.values()],
+        }
+        if include and "embeddings" in include:
+            result["embeddings"] = [emb for _, _, emb in self.rows.values()]
+        return result
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for i, doc, meta, emb in zip(ids, documents, metadatas, embeddings):
+            self.rows[i] = (doc, meta, emb)
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+
+@pytest.fixture
+def fake_embeddings():
+    return FakeEmbeddings()
+
+
+@pytest.fixture
+def fake_collection():
+    return FakeCollection()
+
+
+@pytest.fixture
+def make_fake_collection():
+    """The :class:`FakeCollection` class, to build seeded or extra collections (e.g. shards)."""
+    return FakeCollection
+
+
+@pytest.fixture
+def make_pages():
+    """``make_pages(pix="text", ...)`` -> pages at ``https://example.com/<name>``."""
+
+    def pages(**texts):
+        return [Page(url=f"https://example.com/{name}", text=text) for name, text in texts.items()]
+
+    return pages
+
+
+@pytest.fixture
+def hashing_embeddings():
+    """Shared-embeddings handle on the benchmark's deterministic hashing model (no model download)."""
+    from benchmarks.rag_benchmark import HashingModel
+    from src.rag.registry import SharedEmbeddings
+
+    return SharedEmbeddings(HashingModel(), "hashing")
+
+
+@pytest.fixture
+def make_flow():
+    """Factory for an ``InfinitePayFlow`` with an empty state."""
+    from src.flows.main_flow import InfinitePayFlow
+
+    def flow():
+        return InfinitePayFlow(
+            initial_state={
+                "message": "",
+                "user_id": "",
+                "planned_steps": [],
+                "finished_steps": [],
+                "raw_response": "",
+                "final_response": "",
+                "processing_time": 0.0,
+                "timestamp": datetime.datetime.now(),
+                "conversation_history": [],
+                "user_data": None,
+            }
+        )
+
+    return flow
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.agents.pool import AgentPool, get_agent_pool, reset_agent_pool
+from src.flows.state import Step
+
+
+class FakeTool:
+    def __init__(self):
+        self.current_usage_count = 0
+
+
+class FakeAgent:
+    built = 0
+
+    def __init__(self, team):
+        FakeAgent.built += 1
+        self.team = team
+        self.tools = [FakeTool()]
+        self.tools_results = []
+        self.active = 0
+
+    async def kickoff_async(self, messages):
+        self.active += 1
+        assert self.active == 1, "agent shared by two steps at once"
+        self.tools[0].current_usage_count += 1
+        self.tools_results.append({"result": messages})
+        await asyncio.sleep(0.05)
+        self.active -= 1
+
+        class R:
+            raw = f"{self.team} ok"
+
+        return R()
+
+
+def _factories(build_delay=0.0):
+    def make(team):
+        def build():
+            time.sleep(build_delay)
+            return FakeAgent(team)
+
+        return build
+
+    return {team: make(team) for team in ("KNOWLEDGE", "SUPPORT", "GENERAL", "ESCALATION")}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pool():
+    reset_agent_pool()
+    FakeAgent.built = 0
+    yield
+    reset_agent_pool()
+
+
+def test_warm_up_builds_once_and_reuses_reset_agents():
+    pool = AgentPool(_factories(build_delay=0.01), size=2, max_wait=1.0)
+    pool.warm_up()
+    assert FakeAgent.built == 8
+
+    async def use():
+        async with pool.checkout("KNOWLEDGE") as agent:
+            await agent.kickoff_async("x")
+            return agent
+
+    first = asyncio.run(use())
+    second = asyncio.run(use())
+    assert FakeAgent.built == 8  # nothing built on the hot path
+    assert second.tools_results == [] and second.tools[0].current_usage_count == 0
+    assert first in (second, *pool._idle["KNOWLEDGE"])
+
+    stats = pool.stats()["teams"]["KNOWLEDGE"]
+    assert stats["built"] == 2 and stats["checkouts"] == 2 and stats["idle"] == 2
+    assert stats["avg_build_ms"] >= 10
+
+
+def test_busy_pool_waits_then_overflows():
+    pool = AgentPool(_factories(), size=1, max_wait=0.1)
+    agent, pooled = pool.acquire("SUPPORT")
+    assert pooled
+
+    threading.Timer(0.03, pool.release, args=("SUPPORT", agent)).start()
+    again, pooled = pool.acquire("SUPPORT")
+    assert again is agent and pooled
+
+    temporary, pooled = pool.acquire("SUPPORT")  # nobody releases: a throwaway agent
+    assert temporary is not agent and not pooled
+    pool.release("SUPPORT", temporary, pooled)
+
+    stats = pool.stats()["teams"]["SUPPORT"]
+    assert stats["waits"] == 2 and stats["overflow"] == 1
+    assert stats["max_wait_seconds"] >= 0.09
+    assert stats["size"] == 1 and stats["idle"] == 0
+
+
+def test_failed_step_discards_agent():
+    pool = AgentPool(_factories(), size=1, max_wait=0.1)
+
+    async def fail():
+        async with pool.checkout("GENERAL"):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(fail())
+    stats = pool.stats()["teams"]["GENERAL"]
+    assert stats["discarded"] == 1 and stats["size"] == 0
+
+
+def test_flow_steps_check_out_pooled_agents(monkeypatch, make_flow):
+    import src.agents.pool as pool_module
+
+    monkeypatch.setattr(pool_module, "TEAM_FACTORIES", _factories())
+    monkeypatch.setattr(pool_module.settings, "agent_pool_size", 2)
+    get_agent_pool().warm_up()
+
+    flow = make_flow()
+    flow.state.planned_steps = [Step(agent="GENERAL", agent_task=f"t{i}") for i in range(5)]
+    asyncio.run(flow.execute_next_step_func())
+    asyncio.run(flow.apply_personality_layer())
+
+    assert [s["result"] for s in flow.state.finished_steps] == ["GENERAL ok"] * 5
+    assert flow.state.final_response == "GENERAL ok"
+    assert FakeAgent.built == 8
+    assert get_agent_pool().stats()["teams"]["GENERAL"]["checkouts"] == 6
+
+
+def test_overridden_agent_factory_bypasses_the_pool(monkeypatch, make_flow):
+    import src.agents.pool as pool_module
+    from src.flows.main_flow import InfinitePayFlow
+
+    monkeypatch.setattr(pool_module, "TEAM_FACTORIES", _factories())
+    monkeypatch.setattr(InfinitePayFlow, "_create_agent_and_task", lambda self, agent, task: (FakeAgent("custom"), task))
+
+    flow = make_flow()
+    flow.state.planned_steps = [Step(agent="GENERAL", agent_task="t")]
+    asyncio.run(flow.execute_next_step_func())
+
+    assert flow.state.finished_steps[0]["result"] == "custom ok"
+    assert get_agent_pool().stats()["teams"]["GENERAL"]["checkouts"] == 0
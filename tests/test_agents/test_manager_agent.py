@@ -44,3 +44,29 @@ def test_create_manager_agent_config():
     agent = create_manager_agent()
     assert getattr(agent, "llm", None)
     assert getattr(agent, "max_iter", 0) >= 1
+
+
+def test_build_manager_prompt_never_instantiates_tools(monkeypatch):
+    from crewai.tools import BaseTool
+    import src.agents.manager_agent as manager_agent
+
+    def fail_init(self, *args, **kwargs):
+        raise AssertionError(f"{type(self).__name__} was instantiated while building the manager prompt")
+
+    monkeypatch.setattr(BaseTool, "__init__", fail_init)
+    # Rebuild from scratch so the first (uncached) render is also covered
+    for fn in (manager_agent._cached_catalog, manager_agent.get_teams_block, manager_agent.get_team_names):
+        fn.cache_clear()
+
+    prompt = build_manager_prompt("quero taxas", history=[])
+    catalog = get_agent_catalog()
+
+    assert "InfinitePayRAG" in prompt and "SlackNotify" in prompt
+    assert "InfinitePayRAG" in [t["name"] for t in catalog["KNOWLEDGE"]["tools"]]
+
+
+def test_get_agent_catalog_returns_independent_copies():
+    catalog = get_agent_catalog()
+    catalog["KNOWLEDGE"]["tools"].clear()
+
+    assert get_agent_catalog()["KNOWLEDGE"]["tools"]
@@ -78,3 +78,93 @@ def test_apply_personality_layer_sets_final_response(monkeypatch):
 
     assert nxt == "complete"
     assert flow.state.final_response == "Final message with personality"
+
+
+class _SlowAgent:
+    """Fake team agent: answers after ``delay`` and records when it ran."""
+
+    def __init__(self, name, log, delay=0.2):
+        self.name, self.log, self.delay = name, log, delay
+
+    async def kickoff_async(self, messages):
+        import time
+
+        started = time.perf_counter()
+        await asyncio.sleep(self.delay)
+        self.log.append((self.name, started, time.perf_counter(), messages))
+
+        class R:
+            raw = f"{self.name} ok"
+
+        return R()
+
+
+def _slow_flow(monkeypatch, log, delays=None):
+    delays = delays or {}
+    monkeypatch.setattr(
+        InfinitePayFlow,
+        "_create_agent_and_task",
+        lambda self, agent, task: (_SlowAgent(agent, log, delays.get(agent, 0.2)), task),
+    )
+    return _fresh_flow()
+
+
+def test_independent_steps_run_concurrently(monkeypatch):
+    import time
+
+    log = []
+    flow = _slow_flow(monkeypatch, log, delays={"KNOWLEDGE": 0.3, "SUPPORT": 0.1})
+    flow.state.planned_steps = [
+        Step(agent="KNOWLEDGE", agent_task="Taxas"),
+        Step(agent="SUPPORT", agent_task="Conta"),
+    ]
+
+    started = time.perf_counter()
+    nxt = asyncio.run(flow.execute_next_step_func())
+    elapsed = time.perf_counter() - started
+
+    assert nxt == "apply_personality"
+    assert elapsed < 0.38  # sequential would take 0.4s
+    # SUPPORT finished first, but finished_steps follows the plan order
+    assert [s["agent"] for s in flow.state.finished_steps] == ["KNOWLEDGE", "SUPPORT"]
+    assert [s["result"] for s in flow.state.finished_steps] == ["KNOWLEDGE ok", "SUPPORT ok"]
+    assert flow.state.raw_response == "SUPPORT ok"
+    assert flow.state.planned_steps == []
+
+
+def test_dependent_step_waits_and_receives_results(monkeypatch):
+    log = []
+    flow = _slow_flow(monkeypatch, log, delays={"KNOWLEDGE": 0.1, "SUPPORT": 0.2, "ESCALATION": 0.05})
+    flow.state.planned_steps = [
+        Step(agent="KNOWLEDGE", agent_task="Taxas"),
+        Step(agent="SUPPORT", agent_task="Conta"),
+        Step(agent="ESCALATION", agent_task="Abrir ticket", depends_on=[1, 7, 2]),  # invalid refs ignored
+    ]
+
+    asyncio.run(flow.execute_next_step_func())
+
+    runs = {name: (start, end, prompt) for name, start, end, prompt in log}
+    assert runs["ESCALATION"][0] >= runs["SUPPORT"][1]
+    assert runs["ESCALATION"][0] < runs["SUPPORT"][1] + 0.1  # not held back by anything else
+    assert "Passo 1: SUPPORT ok" in runs["ESCALATION"][2]
+    assert "KNOWLEDGE ok" not in runs["ESCALATION"][2]
+    assert [s["agent"] for s in flow.state.finished_steps] == ["KNOWLEDGE", "SUPPORT", "ESCALATION"]
+
+
+def test_parallel_steps_respect_cap(monkeypatch):
+    import src.flows.main_flow as mf
+
+    log = []
+    monkeypatch.setattr(mf.settings, "flow_max_parallel_steps", 2)
+    flow = _slow_flow(monkeypatch, log, delays={"GENERAL": 0.1})
+    flow.state.planned_steps = [Step(agent="GENERAL", agent_task=f"t{i}") for i in range(5)]
+
+    asyncio.run(flow.execute_next_step_func())
+
+    events = sorted([(s, 1) for _, s, _, _ in log] + [(e, -1) for _, _, e, _ in log], key=lambda x: (x[0], x[1]))
+    running = peak = 0
+    for _, delta in events:
+        running += delta
+        peak = max(peak, running)
+    assert peak == 2
+    assert [s["agent_task"] for s in flow.state.finished_steps] == [f"t{i}" for i in range(5)]
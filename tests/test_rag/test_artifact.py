@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from src.config.settings import settings
+from src.rag.artifact import ArtifactError, build_artifact, load_artifact
+from src.rag.backends import NumpyClient
+from src.rag.indexer import save_manifest
+from src.rag.registry import VectorStoreRegistry
+
+
+def _store(path):
+    collection = NumpyClient(str(path)).get_or_create_collection(settings.rag_collection_name)
+    collection.upsert(
+        ids=["pix-1"],
+        documents=["Pix sem taxa."],
+        metadatas=[{"source": "https://www.infinitepay.io/pix"}],
+        embeddings=[[0.0, 1.0]],
+    )
+    collection.flush()
+    save_manifest(str(path), {"version": 3, "embedding_model": settings.rag_embedding_model, "counts": {"chunks": 1}})
+    return str(path)
+
+
+@pytest.fixture
+def numpy_settings(monkeypatch):
+    monkeypatch.setattr(settings, "rag_vector_backend", "numpy")
+    monkeypatch.setattr(settings, "rag_vector_dtype", "float32")
+
+
+def test_build_and_load_artifact(tmp_path, numpy_settings):
+    store = _store(tmp_path / "store")
+
+    descriptor = build_artifact(str(tmp_path / "artifact"), store, include_model=False)
+    artifact = load_artifact(str(tmp_path / "artifact"))
+
+    assert descriptor["version"].startswith("3-")
+    assert artifact.version == descriptor["version"]
+    assert artifact.files == len(descriptor["files"]) and "index/index_manifest.json" in descriptor["files"]
+    assert artifact.vector_backend == "numpy" and artifact.model_dir is None
+    # Same content, same version
+    assert build_artifact(str(tmp_path / "again"), store, include_model=False)["version"] == descriptor["version"]
+
+
+def test_corrupted_or_missing_files_are_rejected(tmp_path, numpy_settings):
+    store = _store(tmp_path / "store")
+    output = str(tmp_path / "artifact")
+    build_artifact(output, store, include_model=False)
+    manifest = os.path.join(output, "index", "index_manifest.json")
+
+    with open(manifest, "r+b") as fh:
+        data = fh.read()
+        fh.seek(0)
+        fh.write(data.replace(b"3", b"4"))
+    with pytest.raises(ArtifactError, match="checksum"):
+        load_artifact(output)
+
+    os.remove(manifest)
+    with pytest.raises(ArtifactError, match="missing"):
+        load_artifact(output)
+
+
+def test_registry_serves_store_from_artifact(tmp_path, numpy_settings, monkeypatch):
+    output = str(tmp_path / "artifact")
+    build_artifact(output, _store(tmp_path / "store"), include_model=False)
+    monkeypatch.setattr(settings, "rag_artifact_dir", output)
+    monkeypatch.setattr(settings, "rag_vector_store_path", str(tmp_path / "empty"))
+
+    registry = VectorStoreRegistry()
+    collection = registry.get_collection()
+
+    assert registry.store_path() == os.path.join(output, "index")
+    assert settings.rag_vector_store_path == str(tmp_path / "empty")
+    assert collection.get(include=["documents"])["documents"] == ["Pix sem taxa."]
+    status = registry.status()
+    assert status["artifact"]["version"].startswith("3-")
+    assert status["index"]["version"] == 3
+
+
+def test_registry_ignores_incompatible_artifact(tmp_path, numpy_settings, monkeypatch):
+    output = str(tmp_path / "artifact")
+    build_artifact(output, _store(tmp_path / "store"), include_model=False)
+    monkeypatch.setattr(settings, "rag_artifact_dir", output)
+    monkeypatch.setattr(settings, "rag_vector_dtype", "int8")
+    monkeypatch.setattr(settings, "rag_vector_store_path", str(tmp_path / "empty"))
+
+    registry = VectorStoreRegistry()
+
+    assert registry.activate_artifact() is None
+    assert settings.rag_vector_store_path == str(tmp_path / "empty")
+    assert "vector_dtype" in registry.status()["errors"][f"artifact:{output}"]
+
+
+def test_artifact_built_with_other_embeddings_is_incompatible(tmp_path, numpy_settings, monkeypatch):
+    from src.rag.artifact import check_compatible
+
+    output = str(tmp_path / "artifact")
+    monkeypatch.setattr(settings, "rag_embedding_backend", "onnx")
+    monkeypatch.setattr(settings, "rag_onnx_quantized", True)
+    build_artifact(output, _store(tmp_path / "store"), include_model=False)
+    artifact = load_artifact(output)
+    check_compatible(artifact)
+
+    monkeypatch.setattr(settings, "rag_onnx_quantized", False)
+    with pytest.raises(ArtifactError, match="onnx_quantized"):
+        check_compatible(artifact)
+    monkeypatch.setattr(settings, "rag_embedding_backend", "torch")
+    with pytest.raises(ArtifactError, match="embedding_backend"):
+        check_compatible(artifact)
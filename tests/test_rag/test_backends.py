@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from src.rag.backends import NumpyClient, NumpyCollection, create_client
+from src.rag.indexer import build_index
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def _fill(collection, vectors):
+    ids = [f"id-{i}" for i in range(len(vectors))]
+    collection.upsert(
+        ids=ids,
+        documents=[f"doc {i}" for i in ids],
+        metadatas=[{"source": i} for i in ids],
+        embeddings=vectors.tolist(),
+    )
+    return ids
+
+
+def test_query_returns_exact_neighbours_with_squared_l2(tmp_path):
+    collection = NumpyCollection(str(tmp_path), "kb")
+    vectors = _vectors(200)
+    ids = _fill(collection, vectors)
+    query = _vectors(1, seed=1)[0]
+
+    result = collection.query(query_embeddings=[query.tolist()], n_results=5)
+
+    expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:5]
+    assert result["ids"][0] == [ids[i] for i in expected]
+    assert result["documents"][0][0] == f"doc {ids[expected[0]]}"
+    assert result["distances"][0][0] == pytest.approx(float(((vectors[expected[0]] - query) ** 2).sum()), rel=1e-4)
+
+
+def test_upsert_replaces_and_delete_removes(tmp_path):
+    collection = NumpyCollection(str(tmp_path), "kb")
+    _fill(collection, _vectors(3))
+
+    collection.upsert(ids=["id-1"], documents=["novo"], metadatas=[{"v": 2}], embeddings=[[0.0] * 8])
+    collection.delete(ids=["id-0", "missing"])
+
+    assert collection.count() == 2
+    assert collection.get(ids=["id-1"]) == {"ids": ["id-1"], "documents": ["novo"], "metadatas": [{"v": 2}]}
+    assert collection.query([[0.0] * 8], n_results=1)["ids"] == [["id-1"]]
+    assert collection.get(include=[]) == {"ids": ["id-1", "id-2"]}
+
+
+def test_flush_persists_and_other_readers_memory_map_it(tmp_path):
+    writer = NumpyCollection(str(tmp_path), "kb")
+    _fill(writer, _vectors(10))
+    reader = NumpyClient(str(tmp_path)).get_or_create_collection("kb")
+    assert reader.count() == 0  # nothing flushed yet
+
+    writer.flush()
+
+    assert reader.count() == 10
+    assert isinstance(reader._stored, np.memmap)
+
+    writer.delete(ids=["id-0"])
+    writer.flush()
+    assert reader.count() == 9
+    assert "id-0" not in reader.get(include=[])["ids"]
+
+
+def test_format_1_store_is_read_and_rewritten_on_flush(tmp_path):
+    import json
+
+    # A store as written before quantization: float32 matrix and sidecar only
+    vectors = _vectors(6)
+    ids = [f"id-{i}" for i in range(6)]
+    np.save(tmp_path / "kb.npy", vectors)
+    meta = {"format": 1, "dim": 8, "ids": ids, "documents": [f"doc {i}" for i in ids], "metadatas": [{}] * 6}
+    (tmp_path / "kb.meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    collection = NumpyCollection(str(tmp_path), "kb", dtype="int8")
+    assert collection.count() == 6
+    assert collection.query([vectors[3].tolist()], n_results=1)["ids"] == [["id-3"]]
+
+    collection.flush()  # nothing changed, but the store is converted
+
+    rewritten = json.loads((tmp_path / "kb.meta.json").read_text(encoding="utf-8"))
+    assert rewritten["format"] == 2 and rewritten["dtype"] == "int8"
+    assert (tmp_path / "kb.norms.npy").exists() and (tmp_path / "kb.scales.npy").exists()
+    reopened = NumpyCollection(str(tmp_path), "kb", dtype="int8")
+    assert reopened.query([vectors[3].tolist()], n_results=1)["ids"] == [["id-3"]]
+
+
+def test_unknown_store_format_is_rejected(tmp_path):
+    (tmp_path / "kb.meta.json").write_text('{"format": 99, "ids": []}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        NumpyCollection(str(tmp_path), "kb")
+
+
+def test_indexer_builds_and_flushes_a_numpy_collection(tmp_path, fake_embeddings, make_pages):
+    collection = create_client("numpy", str(tmp_path)).get_or_create_collection("kb")
+
+    manifest = build_index(collection, fake_embeddings, make_pages(pix="Pix sem taxa.", boleto="Boleto por R$ 2,00."))
+
+    reopened = NumpyCollection(str(tmp_path), "kb")
+    assert reopened.count() == manifest["counts"]["chunks"] == 2
+    assert {m["source"] for m in reopened.get()["metadatas"]} == {
+        "https://example.com/pix",
+        "https://example.com/boleto",
+    }
+
+
+def test_numpy_matches_chroma_ranking(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    vectors = _vectors(100, dim=16)
+    query = _vectors(1, dim=16, seed=3)[0].tolist()
+
+    numpy_collection = NumpyCollection(str(tmp_path / "np"), "kb")
+    chroma_collection = chromadb.PersistentClient(path=str(tmp_path / "chroma")).get_or_create_collection("test_kb")
+    _fill(numpy_collection, vectors)
+    _fill(chroma_collection, vectors)
+
+    ours = numpy_collection.query([query], n_results=5)
+    theirs = chroma_collection.query(query_embeddings=[query], n_results=5, include=["distances"])
+
+    assert ours["ids"] == theirs["ids"]
+    assert ours["distances"][0] == pytest.approx(theirs["distances"][0], rel=1e-3)
+
+
+def test_unknown_backend_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        create_client("faiss", str(tmp_path))
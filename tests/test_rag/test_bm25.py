@@ -0,0 +1,45 @@
+from src.rag.bm25 import BM25Index, bm25_path, tokenize
+
+
+DOCS = {
+    "tap": "InfiniteTap: tap to pay no celular, aceite pagamentos por aproximação no iPhone.",
+    "pix-parcelado": "Pix Parcelado: seu cliente parcela no Pix e você recebe à vista, sem taxa.",
+    "taxas": "Taxas da maquininha: débito 1,37% e crédito à vista 3,15%.",
+    "conta": "Conta digital com rendimento de 100% do CDI e cartão sem anuidade.",
+}
+
+
+def _index():
+    return BM25Index(list(DOCS), list(DOCS.values()), [{"source": k} for k in DOCS])
+
+
+def test_tokenize_folds_accents_keeps_decimals_and_drops_stopwords():
+    assert tokenize("Crédito à vista de 1,37%") == ["credito", "vista", "1,37"]
+
+
+def test_exact_terms_rank_the_matching_chunk_first():
+    index = _index()
+
+    for query, expected in [
+        ("como funciona o tap to pay?", "tap"),
+        ("PIX parcelado tem taxa?", "pix-parcelado"),
+        ("taxa de 1,37%", "taxas"),
+    ]:
+        (best, _), *_ = index.search(query)
+        assert index.ids[best] == expected
+
+
+def test_documents_without_query_terms_are_not_returned():
+    assert _index().search("boleto") == []
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    index = _index()
+    path = bm25_path(str(tmp_path), "kb")
+
+    index.save(path)
+    loaded = BM25Index.load(path)
+
+    assert loaded.ids == index.ids
+    assert loaded.metadatas == index.metadatas
+    assert loaded.search("cdi") == index.search("cdi")
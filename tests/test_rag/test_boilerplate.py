@@ -0,0 +1,63 @@
+import glob
+import os
+
+from src.rag.boilerplate import BoilerplateDetector, block_key, strip_boilerplate
+from src.rag.documents import Page, Section
+from src.web.extract import extract_sections
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "fixtures", "pages")
+
+
+def _fixture_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as fh:
+            sections = extract_sections(fh.read())
+        pages.append(Page.from_sections(f"https://www.infinitepay.io/{os.path.basename(path)[:-5]}", sections))
+    return pages
+
+
+def test_block_key_ignores_case_and_whitespace():
+    assert block_key("Atendimento  24 horas") == block_key("atendimento 24 horas\n")
+    assert block_key("Pix") != block_key("Boleto")
+
+
+def test_detects_site_chrome_on_fixture_pages_and_keeps_facts():
+    pages = _fixture_pages()
+    detector = BoilerplateDetector()
+    for page in pages:
+        detector.add(page)
+
+    boilerplate = detector.detect(min_pages=3, min_ratio=0.5)
+    stripped = {page.url: strip_boilerplate(page, boilerplate) for page in pages}
+
+    pix = stripped["https://www.infinitepay.io/pix"].text
+    assert "Todos os direitos reservados" not in pix
+    assert "Atendimento 24 horas" not in pix
+    assert "cookies" not in pix.lower()
+    assert "Pix" in pix
+    assert sum(len(p.text) for p in stripped.values()) < sum(len(p.text) for p in pages)
+
+
+def test_strip_drops_repeated_blocks_and_empty_sections():
+    page = Page.from_sections(
+        "https://example.com/pix",
+        [
+            Section(title="Menu", blocks=["Maquininha", "Pix"]),
+            Section(title="Pix", blocks=["Taxa zero no Pix.", "Taxa zero no Pix.", "Maquininha"]),
+        ],
+    )
+
+    stripped = strip_boilerplate(page, {block_key("Maquininha"), block_key("Pix")})
+
+    assert [s.title for s in stripped.sections] == ["Pix"]
+    assert stripped.sections[0].blocks == ["Taxa zero no Pix."]
+
+
+def test_threshold_scales_with_page_count():
+    detector = BoilerplateDetector()
+    for i in range(10):
+        blocks = ["Rodapé comum"] + (["Menu parcial"] if i < 4 else []) + [f"Conteúdo {i}"]
+        detector.add(Page.from_sections(f"https://example.com/{i}", [Section(title="", blocks=blocks)]))
+
+    assert detector.detect(min_pages=3, min_ratio=0.5) == {block_key("Rodapé comum")}
@@ -0,0 +1,104 @@
+from src.rag.chunking import (
+    approx_token_count,
+    chunk_page,
+    chunk_sections,
+    make_token_counter,
+    split_sentences,
+)
+from src.rag.documents import Page, Section
+from src.web.extract import extract_sections
+
+
+def _words(text):
+    return len(text.split())
+
+
+def test_split_sentences_keeps_prices_and_percentages_intact():
+    text = "A taxa no débito é de 1,37%. O boleto custa R$ 2,00 por boleto pago. Pix sem taxa!"
+
+    assert split_sentences(text) == [
+        "A taxa no débito é de 1,37%.",
+        "O boleto custa R$ 2,00 por boleto pago.",
+        "Pix sem taxa!",
+    ]
+
+
+def test_chunks_respect_token_limit_and_never_cut_sentences():
+    sentences = [f"Frase número {i} sobre a taxa de 3,15% no crédito." for i in range(60)]
+    sections = [Section(title="Taxas", blocks=[" ".join(sentences)])]
+
+    chunks = chunk_sections(sections, max_tokens=60, overlap_tokens=0, count_tokens=_words)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert _words(chunk.text) <= 60
+        body = chunk.text.split("\n", 1)[1]
+        assert set(split_sentences(body)) <= set(sentences)
+        assert chunk.metadata["section"] == "Taxas"
+
+
+def test_overlap_repeats_trailing_sentences_of_previous_chunk():
+    sentences = [f"Sentença {i} do texto." for i in range(30)]
+    sections = [Section(title="", blocks=[" ".join(sentences)])]
+
+    chunks = chunk_sections(sections, max_tokens=20, overlap_tokens=8, count_tokens=_words)
+
+    assert len(chunks) > 2
+    for previous, current in zip(chunks, chunks[1:]):
+        previous_sentences = split_sentences(previous.text)
+        current_sentences = split_sentences(current.text)
+        assert previous_sentences[-1] in current_sentences
+        assert current_sentences[0] in previous_sentences
+        assert _words(" ".join(s for s in current_sentences if s in previous_sentences)) <= 8
+
+
+def test_small_sections_are_merged_and_titles_recorded():
+    sections = [
+        Section(title="Pix", blocks=["Pix sem taxa."]),
+        Section(title="Boleto", blocks=["Boleto custa R$ 2,00."]),
+        Section(title="Longa", blocks=[" ".join(["palavra"] * 50)]),
+    ]
+
+    chunks = chunk_sections(sections, max_tokens=40, overlap_tokens=0, count_tokens=_words)
+
+    assert chunks[0].metadata["section"] == "Pix | Boleto"
+    assert chunks[0].text == "Pix\nPix sem taxa.\nBoleto\nBoleto custa R$ 2,00."
+    assert all(c.metadata["section"] == "Longa" for c in chunks[1:])
+
+
+def test_chunk_page_ids_are_content_addressed_with_source_metadata():
+    page = Page.from_sections("https://example.com/pix", [Section(title="Pix", blocks=["Pix sem taxa."])])
+
+    first = chunk_page(page)
+    second = chunk_page(page)
+
+    assert [c.id for c in first] == [c.id for c in second]
+    assert first[0].metadata["source"] == "https://example.com/pix"
+    assert first[0].metadata["section"] == "Pix"
+
+
+def test_extract_sections_groups_blocks_under_headings():
+    html = """
+    <html><body><script>var x = 1;</script>
+    <nav><ul><li>Menu</li></ul></nav>
+    <h1>Maquininha</h1><p>Aceita cartões.</p>
+    <h2>Taxas</h2><div><p>Débito 1,37%.</p><ul><li>Crédito 3,15%.</li></ul></div>
+    </body></html>
+    """
+
+    sections = extract_sections(html)
+
+    assert [(s.title, s.blocks) for s in sections] == [
+        ("", ["Menu"]),
+        ("Maquininha", ["Aceita cartões."]),
+        ("Taxas", ["Débito 1,37%.", "Crédito 3,15%."]),
+    ]
+
+
+def test_make_token_counter_falls_back_without_tokenizer():
+    class NoTokenizer:
+        def count_tokens(self, text):
+            raise AttributeError("tokenizer")
+
+    assert make_token_counter(None) is approx_token_count
+    assert make_token_counter(NoTokenizer()) is approx_token_count
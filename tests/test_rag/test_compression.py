@@ -0,0 +1,73 @@
+from src.rag.chunking import approx_token_count
+from src.rag.compression import compress_hits, shingles, jaccard, truncate_to_tokens
+from src.rag.retrieval import Hit
+
+FOOTER = "InfinitePay Todos os direitos reservados. Baixe o app, fale com a gente e siga nas redes sociais."
+
+
+def _hit(i, text, source, distance=0.5):
+    return Hit(id=str(i), document=text, metadata={"source": source}, distance=distance)
+
+
+def test_far_hits_are_dropped_but_bm25_only_hits_are_kept():
+    hits = [
+        _hit(1, "Pix sem taxa para receber.", "https://x/pix", 0.4),
+        _hit(2, "Texto irrelevante.", "https://x/outro", 1.9),
+        _hit(3, "Taxa de 1,37% no débito.", "https://x/maquininha", None),
+    ]
+
+    context = compress_hits(hits, max_distance=1.5, dedup_threshold=0.8, token_budget=500)
+
+    assert [h.id for h in context.hits] == ["1", "3"]
+    assert context.dropped["distance"] == 1
+    assert context.sources == ["https://x/pix", "https://x/maquininha"]
+
+
+def test_near_duplicate_boilerplate_is_removed_keeping_the_best_ranked():
+    hits = [
+        _hit(1, f"Maquininha Smart com taxa de 1,37% no débito e parcelamento em até 12x. {FOOTER}", "https://x/maquininha"),
+        _hit(2, FOOTER, "https://x/pix"),
+        _hit(3, f"{FOOTER} ", "https://x/boleto"),
+    ]
+
+    context = compress_hits(hits, max_distance=None, dedup_threshold=0.8, token_budget=500)
+
+    assert [h.id for h in context.hits] == ["1", "2"]
+    assert jaccard(shingles(hits[1].document), shingles(hits[2].document)) == 1.0
+    assert context.dropped["duplicate"] == 1
+
+
+def test_budget_trims_in_relevance_order_and_cuts_at_sentence_boundaries():
+    long_text = " ".join(f"Frase número {i} sobre a conta digital." for i in range(40))
+    hits = [
+        _hit(1, "Boleto custa R$ 2,00.", "https://x/boleto"),
+        _hit(2, long_text, "https://x/conta"),
+        _hit(3, "Nunca chega aqui.", "https://x/pix"),
+    ]
+
+    context = compress_hits(hits, max_distance=None, dedup_threshold=0.9, token_budget=80)
+
+    assert context.tokens <= 80
+    assert [h.id for h in context.hits] == ["1", "2"]
+    assert context.hits[1].document.endswith("conta digital.")
+    assert context.dropped["budget"] == 1
+    assert hits[1].document == long_text  # the original hit is not mutated
+
+
+def test_best_hit_is_always_kept_even_over_budget():
+    text = " ".join(f"Sentença {i} sobre o Pix parcelado." for i in range(50))
+
+    context = compress_hits([_hit(1, text, "https://x/pix")], max_distance=None, token_budget=20)
+
+    assert len(context.hits) == 1
+    assert 0 < approx_token_count(context.hits[0].document) <= 20
+
+
+def test_truncate_falls_back_to_words_for_a_long_sentence():
+    assert truncate_to_tokens("um dois tres quatro cinco seis", 4, lambda t: len(t.split())) == "um dois tres quatro"
+
+
+def test_fallback_docs_have_no_source_url():
+    context = compress_hits([_hit(1, "Doc estático.", "fallback")], max_distance=None)
+
+    assert context.sources == []
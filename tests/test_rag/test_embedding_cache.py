@@ -0,0 +1,101 @@
+from src.rag.embedding_cache import QueryEmbeddingCache, normalize_query
+
+
+class CountingEmbeddings:
+    def __init__(self, model_name="fake-model"):
+        self.model_name = model_name
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_normalize_query():
+    assert normalize_query("  Qual a  TAXA do Pix?? ") == "qual a taxa do pix"
+    assert normalize_query("Qual a taxa do Pix") == normalize_query("qual a taxa do pix?")
+
+
+def test_repeated_queries_are_encoded_once_and_counted():
+    cache, embeddings = QueryEmbeddingCache(max_size=8), CountingEmbeddings()
+
+    first = cache.embed("Qual a taxa do Pix?", embeddings)
+    second = cache.embed("qual a taxa do pix", embeddings)
+
+    assert first == second
+    assert embeddings.calls == ["qual a taxa do pix"]
+    assert cache.stats() == {
+        "size": 1,
+        "max_size": 8,
+        "persistent": False,
+        "hits": 1,
+        "disk_hits": 0,
+        "misses": 1,
+        "hit_rate": 0.5,
+    }
+
+
+def test_lru_evicts_least_recently_used():
+    cache, embeddings = QueryEmbeddingCache(max_size=2), CountingEmbeddings()
+    for query in ["pix", "boleto", "pix", "maquininha"]:
+        cache.embed(query, embeddings)
+
+    cache.embed("pix", embeddings)  # still cached (recently used)
+    cache.embed("boleto", embeddings)  # evicted -> encoded again
+
+    assert embeddings.calls == ["pix", "boleto", "maquininha", "boleto"]
+
+
+def test_entries_are_keyed_by_model():
+    cache = QueryEmbeddingCache()
+    a, b = CountingEmbeddings("model-a"), CountingEmbeddings("model-b")
+
+    cache.embed("pix", a)
+    cache.embed("pix", b)
+
+    assert a.calls == ["pix"] and b.calls == ["pix"]
+
+
+def test_disk_store_survives_restarts(tmp_path):
+    path = str(tmp_path / "cache" / "queries.sqlite")
+    embeddings = CountingEmbeddings()
+    cache = QueryEmbeddingCache(path=path)
+    vector = cache.embed("Tap to pay", embeddings)
+    cache.close()
+
+    restarted = QueryEmbeddingCache(path=path)
+    assert restarted.embed("tap to pay", embeddings) == vector
+    assert embeddings.calls == ["tap to pay"]
+    assert restarted.stats()["disk_hits"] == 1
+    restarted.close()
+
+
+def test_persistent_entries_are_keyed_by_backend(tmp_path, monkeypatch):
+    from src.rag.embedding_service import EmbeddingBatcher
+    from src.rag.registry import SharedEmbeddings, VectorStoreRegistry, embedding_backend_name
+
+    path = str(tmp_path / "queries.sqlite")
+    torch_model, onnx_model = CountingEmbeddings(), CountingEmbeddings()
+    cache = QueryEmbeddingCache(path=path)
+    cache.embed("pix", SharedEmbeddings(torch_model, "all-MiniLM-L6-v2", "torch"))
+    cache.close()
+
+    restarted = QueryEmbeddingCache(path=path)
+    restarted.embed("pix", SharedEmbeddings(onnx_model, "all-MiniLM-L6-v2", "onnx-int8"))
+    assert onnx_model.calls == ["pix"]  # not served the torch vector
+    batcher = EmbeddingBatcher(SharedEmbeddings(torch_model, "all-MiniLM-L6-v2", "torch"))
+    try:
+        restarted.embed("pix", batcher)
+    finally:
+        batcher.close()
+    assert torch_model.calls == ["pix"]  # the batcher keys like the model it wraps
+    restarted.close()
+
+    from src.config.settings import settings
+
+    monkeypatch.setattr(settings, "rag_embedding_backend", "onnx")
+    monkeypatch.setattr(settings, "rag_onnx_quantized", True)
+    assert embedding_backend_name() == "onnx-int8"
+    registry = VectorStoreRegistry()
+    monkeypatch.setattr(VectorStoreRegistry, "_load_embedding_model", lambda self, name: CountingEmbeddings())
+    assert registry.get_embeddings().cache_name == f"{settings.rag_embedding_model}@onnx-int8"
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.rag.embedding_service import EmbeddingBatcher
+
+
+class SlowEmbeddings:
+    """Encodes the text length; each call has a fixed cost, like a model forward pass."""
+
+    model_name = "slow-model"
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def encode(self, texts):
+        self.batch_sizes.append(len(texts))
+        time.sleep(self.delay)
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_concurrent_callers_are_batched_and_get_their_own_vectors():
+    embeddings = SlowEmbeddings()
+    batcher = EmbeddingBatcher(embeddings, max_batch_size=16, max_wait_ms=5)
+    results = {}
+    start = threading.Barrier(12)
+
+    def caller(n):
+        start.wait()
+        results[n] = batcher.encode(["x" * n])[0]
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(1, 13)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert results == {n: [float(n), 1.0] for n in range(1, 13)}
+    assert sum(embeddings.batch_sizes) == 12
+    assert len(embeddings.batch_sizes) < 12
+    assert batcher.stats()["largest_batch"] > 1
+
+
+def test_batches_never_exceed_max_size():
+    embeddings = SlowEmbeddings(delay=0.0)
+    batcher = EmbeddingBatcher(embeddings, max_batch_size=4, max_wait_ms=20)
+
+    futures = [batcher.submit(f"q{i}") for i in range(10)]
+    vectors = [f.result(timeout=5) for f in futures]
+    batcher.close()
+
+    assert len(vectors) == 10
+    assert max(embeddings.batch_sizes) <= 4
+
+
+def test_encode_errors_reach_every_caller_in_the_batch():
+    class Broken:
+        def encode(self, texts):
+            raise RuntimeError("model crashed")
+
+    batcher = EmbeddingBatcher(Broken(), max_wait_ms=0)
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        batcher.encode(["pix"])
+    batcher.close()
+
+
+def test_encode_async_resolves_off_the_event_loop():
+    embeddings = SlowEmbeddings()
+    batcher = EmbeddingBatcher(embeddings, max_wait_ms=5)
+
+    async def main():
+        return await asyncio.gather(*(batcher.encode_async([q]) for q in ["a", "bb", "ccc"]))
+
+    results = asyncio.run(main())
+    batcher.close()
+
+    assert [r[0][0] for r in results] == [1.0, 2.0, 3.0]
+    assert embeddings.batch_sizes == [3]
+
+
+def test_closed_batcher_rejects_new_queries():
+    batcher = EmbeddingBatcher(SlowEmbeddings(delay=0.0))
+    batcher.close()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit("pix")
@@ -0,0 +1,169 @@
+import pytest
+
+from src.rag.chunking import chunk_page
+from src.rag.documents import Page, Section
+from src.rag.indexer import build_index, load_manifest, save_manifest
+
+
+def test_first_build_indexes_all_chunks_and_records_manifest(fake_collection, fake_embeddings, make_pages):
+    collection, embeddings = fake_collection, fake_embeddings
+    pages = make_pages(pix=" ".join(f"Pix sem taxa {i}." for i in range(150)), maquininha="Taxas da maquininha")
+
+    manifest = build_index(collection, embeddings, pages)
+
+    expected = sum(len(chunk_page(p)) for p in pages)
+    assert len(collection.rows) == expected
+    assert manifest["version"] == 1
+    assert manifest["counts"] == {
+        "pages": 2,
+        "pages_unchanged": 0,
+        "chunks": expected,
+        "added": expected,
+        "deleted": 0,
+        "failed": 0,
+    }
+    assert manifest["embedding_model"] == "fake-model"
+    assert set(manifest["pages"]) == {p.url for p in pages}
+
+
+def test_rebuild_with_unchanged_pages_embeds_nothing(fake_collection, fake_embeddings, make_pages):
+    collection, embeddings = fake_collection, fake_embeddings
+    pages = make_pages(pix=" ".join(f"Pix sem taxa {i}." for i in range(150)), maquininha="Taxas da maquininha")
+    manifest = build_index(collection, embeddings, pages)
+    embeddings.encoded.clear()
+
+    manifest2 = build_index(collection, embeddings, pages, manifest=manifest)
+
+    assert embeddings.encoded == []
+    assert manifest2["counts"]["pages_unchanged"] == 2
+    assert manifest2["counts"]["added"] == 0 and manifest2["counts"]["deleted"] == 0
+    assert manifest2["version"] == manifest["version"]
+
+
+def _sectioned(name, **sections):
+    return Page.from_sections(
+        f"https://example.com/{name}",
+        [Section(title=title, blocks=[" ".join([text] * 20)]) for title, text in sections.items()],
+    )
+
+
+def test_changed_page_reembeds_only_new_chunks_and_deletes_stale(fake_collection, fake_embeddings):
+    collection, embeddings = fake_collection, fake_embeddings
+    original = _sectioned("pix", Taxas="Taxa zero no Pix.", Chaves="Cadastre chaves Pix.")
+    manifest = build_index(collection, embeddings, [original])
+    assert len(collection.rows) == 2
+    embeddings.encoded.clear()
+
+    changed = _sectioned("pix", Taxas="Taxa zero no Pix.", Chaves="Cadastre até 20 chaves.")
+    manifest2 = build_index(collection, embeddings, [changed], manifest=manifest)
+
+    assert len(embeddings.encoded) == 1 and "20 chaves" in embeddings.encoded[0]
+    assert manifest2["counts"]["added"] == 1
+    assert manifest2["counts"]["deleted"] == 1
+    assert {meta["section"] for _, meta, _ in collection.rows.values()} == {"Taxas", "Chaves"}
+    assert manifest2["version"] == 2
+
+
+def test_chunker_change_rechunks_unchanged_pages(monkeypatch, fake_collection, fake_embeddings):
+    from src.config.settings import settings
+
+    collection, embeddings = fake_collection, fake_embeddings
+    page = _sectioned("pix", Taxas="Taxa zero no Pix.", Chaves="Cadastre chaves Pix.")
+    manifest = build_index(collection, embeddings, [page])
+
+    monkeypatch.setattr(settings, "rag_chunk_max_tokens", 1000)
+    manifest2 = build_index(collection, embeddings, [page], manifest=manifest)
+
+    assert manifest2["counts"]["pages_unchanged"] == 0
+    assert len(collection.rows) == 1  # both sections now fit in one chunk
+
+
+def test_failed_urls_keep_previous_chunks_and_removed_urls_are_deleted(fake_collection, fake_embeddings, make_pages):
+    collection, embeddings = fake_collection, fake_embeddings
+    pages = make_pages(pix="pix text", boleto="boleto text", cartao="cartao text")
+    manifest = build_index(collection, embeddings, pages)
+
+    manifest2 = build_index(
+        collection,
+        embeddings,
+        make_pages(pix="pix text"),
+        manifest=manifest,
+        failed_urls=["https://example.com/boleto"],
+    )
+
+    sources = {meta["source"] for _, meta, _ in collection.rows.values()}
+    assert sources == {"https://example.com/pix", "https://example.com/boleto"}
+    assert manifest2["counts"]["deleted"] == 1
+    assert manifest2["counts"]["failed"] == 1
+    assert manifest2["failed_urls"] == ["https://example.com/boleto"]
+
+
+def test_fallback_docs_when_nothing_scraped(fake_collection, fake_embeddings):
+    collection, embeddings = fake_collection, fake_embeddings
+
+    build_index(collection, embeddings, [])
+
+    assert collection.rows
+    assert all(meta["source"] == "fallback" for _, meta, _ in collection.rows.values())
+
+
+def test_manifest_roundtrip(tmp_path):
+    assert load_manifest(str(tmp_path)) == {}
+    save_manifest(str(tmp_path), {"version": 3, "counts": {"chunks": 1}})
+    assert load_manifest(str(tmp_path))["version"] == 3
+
+
+def _with_chrome(name, text):
+    footer = ["InfinitePay. Todos os direitos reservados.", "Atendimento 24 horas pelo app."]
+    return Page.from_sections(
+        f"https://example.com/{name}",
+        [Section(title=name.title(), blocks=[text]), Section(title="Rodapé", blocks=footer)],
+    )
+
+
+def test_boilerplate_is_stripped_and_shrink_reported(fake_collection, fake_embeddings):
+    collection, embeddings = fake_collection, fake_embeddings
+    pages = [_with_chrome(name, f"Conteúdo sobre {name}.") for name in ("pix", "boleto", "cartao", "conta")]
+
+    manifest = build_index(collection, embeddings, pages)
+
+    documents = [doc for doc, _, _ in collection.rows.values()]
+    assert len(documents) == 4
+    assert not any("direitos reservados" in doc for doc in documents)
+    # Held back until boilerplate was known: nothing embedded twice
+    assert len(embeddings.encoded) == 4
+    report = manifest["ingestion"]
+    assert report["boilerplate_blocks"] == 2
+    assert report["chars_clean"] < report["chars_raw"] and report["shrink_ratio"] > 0.5
+    assert len(manifest["boilerplate"]["blocks"]) == 2
+
+
+def test_identical_chunks_on_different_pages_are_stored_once(fake_collection, fake_embeddings, make_pages):
+    collection, embeddings = fake_collection, fake_embeddings
+    shared = "Taxa zero no Pix para todos os clientes."
+    pages = make_pages(pix=shared, pix_parcelado=shared)
+
+    manifest = build_index(collection, embeddings, pages)
+
+    assert len(collection.rows) == 1
+    assert manifest["ingestion"]["duplicate_chunks"] == 1
+    ids = [record["chunk_ids"] for record in manifest["pages"].values()]
+    assert ids[0] == ids[1]
+
+    # Dropping the page that owns the chunk keeps it for the other one
+    manifest2 = build_index(collection, embeddings, make_pages(pix_parcelado=shared), manifest=manifest)
+    assert len(collection.rows) == 1 and manifest2["counts"]["deleted"] == 0
+
+
+def test_known_boilerplate_lets_pages_stream_on_rebuild(fake_collection, fake_embeddings):
+    from src.rag.indexer import IncrementalIndexer
+
+    collection, embeddings = fake_collection, fake_embeddings
+    pages = [_with_chrome(name, f"Conteúdo sobre {name}.") for name in ("pix", "boleto", "cartao", "conta")]
+    manifest = build_index(collection, embeddings, pages)
+
+    indexer = IncrementalIndexer(collection, embeddings, manifest)
+    new_page = _with_chrome("emprestimo", "Conteúdo sobre empréstimo.")
+    chunks = indexer.plan_page(new_page)
+
+    assert [c.text for c in chunks] == ["Emprestimo\nConteúdo sobre empréstimo."]
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+from src.config.settings import settings
+from src.rag import indexer
+from src.rag.bm25 import BM25Index, bm25_path
+from src.rag.ingestion import fetch_pages
+from src.rag.sharding import ShardRouter, shards_path
+from src.web.extract import extract_sections
+from src.web.fetcher import AsyncHostLimiter, fetch_text_async
+
+
+def test_fetch_pages_from_local_server_dedupes_urls(pages_server):
+    base = pages_server.base_url
+    urls = [f"{base}/", f"{base}/pix", f"{base}/maquininha", f"{base}/pix", f"{base}/nao-existe"]
+
+    pages, failed = asyncio.run(fetch_pages(urls))
+
+    assert [p.url for p in pages] == [f"{base}/", f"{base}/pix", f"{base}/maquininha"]
+    assert failed == [f"{base}/nao-existe"]
+    assert pages_server.hits["pix"] == 1
+    maquininha = pages[2].text
+    assert "1,37%" in maquininha
+    assert "dataLayer" not in maquininha  # scripts are stripped
+
+
+def test_overall_deadline_returns_partial_results(pages_server):
+    base = pages_server.base_url
+
+    def slow_parse(html):
+        if "Pix parcelado" in html:
+            time.sleep(1.0)
+        return extract_sections(html)
+
+    async def timed():
+        started = time.perf_counter()
+        result = await fetch_pages([f"{base}/pix", f"{base}/pix-parcelado"], deadline=0.3, parse=slow_parse)
+        return result, time.perf_counter() - started
+
+    (pages, failed), elapsed = asyncio.run(timed())
+
+    assert elapsed < 0.9
+    assert [p.url for p in pages] == [f"{base}/pix"]
+    assert failed == [f"{base}/pix-parcelado"]
+
+
+def test_host_limiter_bounds_concurrency_per_host():
+    state = {"in_flight": {}, "max": {}}
+
+    class Resp:
+        text = "<p>ok</p>"
+
+        def raise_for_status(self):
+            return None
+
+    class FakeClient:
+        async def get(self, url):
+            host = url.split("/")[2]
+            state["in_flight"][host] = state["in_flight"].get(host, 0) + 1
+            state["max"][host] = max(state["max"].get(host, 0), state["in_flight"][host])
+            await asyncio.sleep(0.01)
+            state["in_flight"][host] -= 1
+            return Resp()
+
+    async def main():
+        limiter = AsyncHostLimiter(per_host=2)
+        urls = [f"http://a.test/{i}" for i in range(6)] + [f"http://b.test/{i}" for i in range(6)]
+        await asyncio.gather(*(fetch_text_async(FakeClient(), u, limiter=limiter) for u in urls))
+
+    asyncio.run(main())
+
+    assert state["max"] == {"a.test": 2, "b.test": 2}
+
+
+def test_run_async_indexes_pages_from_local_server(
+    pages_server, monkeypatch, tmp_path, fake_collection, fake_embeddings, make_fake_collection
+):
+    import src.rag.registry as registry_module
+
+    collection, embeddings = fake_collection, fake_embeddings
+    shards = {}
+
+    class FakeRegistry:
+        def get_embeddings(self):
+            return embeddings
+
+        def get_collection(self, name=None, path=None):
+            return collection if name is None else shards.setdefault(name, make_fake_collection())
+
+    monkeypatch.setattr(registry_module, "vector_store_registry", FakeRegistry())
+    base = pages_server.base_url
+    urls = [f"{base}/pix", f"{base}/boleto", f"{base}/offline"]
+
+    manifest = asyncio.run(indexer.run_async(urls=urls, path=str(tmp_path)))
+
+    assert manifest["counts"]["pages"] == 2
+    assert {meta["source"] for _, meta, _ in collection.rows.values()} == {f"{base}/pix", f"{base}/boleto"}
+    assert indexer.load_manifest(str(tmp_path))["version"] == 1
+
+    # The BM25 index is rebuilt from the same chunks, next to the manifest
+    lexical = BM25Index.load(bm25_path(str(tmp_path), settings.rag_collection_name))
+    assert set(lexical.ids) == set(collection.rows)
+    assert manifest["bm25"]["documents"] == len(collection.rows)
+
+    # Each product gets its own shard collection, with the router saved next to the store
+    router = ShardRouter.load(shards_path(str(tmp_path), settings.rag_collection_name))
+    assert set(router.shards) == set(manifest["shards"]) == {"pix", "cobranca"}
+    shard = shards[router.shards["pix"]["collection"]]
+    assert {meta["source"] for _, meta, _ in shard.rows.values()} == {f"{base}/pix"}
+    assert sum(len(c.rows) for c in shards.values()) == len(collection.rows)
@@ -0,0 +1,110 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.config.settings import settings
+from src.rag.onnx_embedder import MODEL_FILENAME, QUANTIZED_MODEL_FILENAME, OnnxEmbedder
+from src.rag.registry import SharedEmbeddings
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "taxa", "do", "pix", "maquininha", "boleto"]
+DIM = 16
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+
+    tokenizer = Tokenizer(models.WordLevel({t: i for i, t in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 2), ("[SEP]", 3)]
+    )
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    return str(tmp_path)
+
+
+class FakeSession:
+    """Hidden state of each token is a one-hot of its id; padding gets a large value to expose leaks."""
+
+    def __init__(self):
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        hidden = np.eye(DIM, dtype=np.float32)[feeds["input_ids"]]
+        hidden[feeds["input_ids"] == 0] = 100.0
+        return [hidden]
+
+
+@pytest.fixture
+def embedder(model_dir, monkeypatch):
+    monkeypatch.setattr(OnnxEmbedder, "_create_session", lambda self, path: FakeSession())
+    return OnnxEmbedder(model_dir)
+
+
+def _expected(token_ids):
+    pooled = np.eye(DIM, dtype=np.float32)[token_ids].mean(axis=0)
+    return pooled / np.linalg.norm(pooled)
+
+
+def test_mean_pooling_ignores_padding_and_normalizes(embedder):
+    vectors = embedder.encode(["taxa do pix", "boleto"])
+
+    assert vectors.shape == (2, DIM)
+    np.testing.assert_allclose(vectors[0], _expected([2, 4, 5, 6, 3]), rtol=1e-6)
+    np.testing.assert_allclose(vectors[1], _expected([2, 8, 3]), rtol=1e-6)
+    # Only inputs declared by the model are fed
+    assert set(embedder.session.feeds[0]) == {"input_ids", "attention_mask"}
+
+
+def test_order_is_kept_when_batching_by_length(embedder):
+    texts = ["taxa do pix maquininha", "pix", "boleto do pix"]
+
+    batched = embedder.encode(texts, batch_size=1)
+
+    for text, vector in zip(texts, batched):
+        np.testing.assert_allclose(vector, embedder.encode(text), rtol=1e-6)
+
+
+def test_single_string_returns_a_vector(embedder):
+    assert embedder.encode("pix").shape == (DIM,)
+
+
+def test_shared_embeddings_can_count_tokens(embedder):
+    shared = SharedEmbeddings(embedder, "fake-onnx")
+
+    assert shared.count_tokens("taxa do pix") == 3
+
+
+def test_registry_loads_the_onnx_backend(model_dir, monkeypatch):
+    from src.rag.registry import VectorStoreRegistry
+
+    monkeypatch.setattr(OnnxEmbedder, "_create_session", lambda self, path: FakeSession())
+    monkeypatch.setattr(settings, "rag_embedding_backend", "onnx")
+    monkeypatch.setattr(settings, "rag_onnx_model_dir", model_dir)
+
+    embeddings = VectorStoreRegistry().get_embeddings()
+
+    assert isinstance(embeddings.model, OnnxEmbedder)
+    assert embeddings.encode(["pix"]).shape == (1, DIM)
+
+
+@pytest.mark.parametrize("filename,min_cosine", [(MODEL_FILENAME, 0.999), (QUANTIZED_MODEL_FILENAME, 0.98)])
+def test_parity_with_sentence_transformers(filename, min_cosine):
+    """Needs the exported model (python -m src.rag.onnx_embedder) and sentence-transformers."""
+    if not os.path.exists(os.path.join(settings.rag_onnx_model_dir, filename)):
+        pytest.skip(f"{filename} not exported to {settings.rag_onnx_model_dir}")
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    from benchmarks.corpus import load_queries
+
+    texts = [item["query"] for item in load_queries()]
+    reference = sentence_transformers.SentenceTransformer(settings.rag_embedding_model).encode(texts)
+    onnx = OnnxEmbedder(settings.rag_onnx_model_dir, quantized=filename == QUANTIZED_MODEL_FILENAME).encode(texts)
+
+    cosine = (reference * onnx).sum(axis=1) / (np.linalg.norm(reference, axis=1) * np.linalg.norm(onnx, axis=1))
+    assert cosine.min() >= min_cosine
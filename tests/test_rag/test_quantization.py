@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from src.rag.backends import NumpyCollection
+from src.rag.quantization import dequantize, quantize
+
+K = 10
+
+
+def _clustered(n, dim=64, clusters=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(clusters, dim))
+    points = centroids[rng.integers(0, clusters, size=n)] + 0.6 * rng.normal(size=(n, dim))
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _build(path, vectors, dtype, rescore):
+    collection = NumpyCollection(str(path), "kb", dtype=dtype, rescore=rescore)
+    collection.upsert(
+        ids=[str(i) for i in range(len(vectors))],
+        documents=[f"chunk {i}" for i in range(len(vectors))],
+        metadatas=[{} for _ in range(len(vectors))],
+        embeddings=vectors,
+    )
+    collection.flush()
+    return NumpyCollection(str(path), "kb", dtype=dtype, rescore=rescore)
+
+
+def _recall(collection, vectors, queries):
+    exact = ((vectors[None, :, :] - queries[:, None, :]) ** 2).sum(-1)
+    hits = 0
+    for query, row in zip(queries, exact):
+        expected = {str(i) for i in np.argsort(row)[:K]}
+        hits += len(expected & set(collection.query([query], n_results=K)["ids"][0]))
+    return hits / (K * len(queries))
+
+
+def test_int8_roundtrip_error_is_bounded_by_half_a_step():
+    matrix = _clustered(50)
+    stored, scales = quantize(matrix, "int8")
+
+    assert stored.dtype == np.int8
+    assert np.abs(dequantize(stored, scales) - matrix).max() <= scales.max() / 2 + 1e-6
+
+
+@pytest.mark.parametrize(
+    "dtype,rescore,min_recall,max_footprint",
+    [
+        ("float32", False, 1.0, 1.0),
+        ("float16", True, 0.99, 0.55),
+        ("int8", True, 0.99, 0.30),
+        ("int8", False, 0.95, 0.30),
+    ],
+)
+def test_recall_and_footprint_regression(tmp_path, dtype, rescore, min_recall, max_footprint):
+    vectors, queries = _clustered(2000), _clustered(40, seed=1)
+    baseline = _build(tmp_path / "f32", vectors, "float32", False).footprint()["searched_bytes"]
+
+    collection = _build(tmp_path / dtype, vectors, dtype, rescore)
+
+    assert _recall(collection, vectors, queries) >= min_recall
+    assert collection.footprint()["searched_bytes"] <= max_footprint * baseline
+    assert (collection.footprint()["rescore_bytes"] > 0) == (rescore and dtype != "float32")
+
+
+def test_existing_store_is_converted_on_flush(tmp_path):
+    vectors = _clustered(100)
+    _build(tmp_path, vectors, "float32", False)
+
+    converted = NumpyCollection(str(tmp_path), "kb", dtype="int8", rescore=False)
+    converted.flush()
+
+    reopened = NumpyCollection(str(tmp_path), "kb", dtype="int8", rescore=False)
+    assert reopened._stored.dtype == np.int8
+    assert not (tmp_path / "kb.f32.npy").exists()
+    assert reopened.query([vectors[7]], n_results=1)["ids"] == [["7"]]
+
+
+def test_incremental_updates_on_a_quantized_store(tmp_path):
+    vectors = _clustered(100)
+    collection = _build(tmp_path, vectors, "int8", False)
+
+    collection.upsert(ids=["new"], documents=["novo"], metadatas=[{}], embeddings=[vectors[3] * -1])
+    collection.delete(ids=["3"])
+    collection.flush()
+
+    assert collection.count() == 100
+    assert collection.query([vectors[3] * -1], n_results=1)["ids"] == [["new"]]
+    assert collection.query([vectors[5]], n_results=1)["ids"] == [["5"]]
@@ -0,0 +1,19 @@
+from benchmarks.rag_benchmark import compare, run
+
+
+def test_rag_benchmark_runs_offline_and_compares():
+    report = run(backend="numpy", embeddings="hashing", repeats=1)
+
+    metrics = report["metrics"]
+    assert set(metrics) >= {"recall@1", "recall@3", "mrr", "latency_p50_ms", "latency_p95_ms", "build_seconds", "index_bytes"}
+    assert metrics["recall@5"] >= metrics["recall@1"] > 0.5
+    assert metrics["index_bytes"] > 0 and metrics["chunks"] > 0
+    assert len(report["queries"]) == report["config"]["queries"]
+
+    baseline = {
+        "metrics": {**metrics, "recall@3": metrics["recall@3"] - 0.5},
+        "config": {**report["config"], "dtype": "int8"},
+    }
+    diff = compare(baseline, report)
+    assert diff["metrics"]["recall@3"]["delta"] == 0.5
+    assert diff["config_changes"] == {"dtype": {"baseline": "int8", "current": "float32"}}
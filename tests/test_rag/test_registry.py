@@ -0,0 +1,206 @@
+import threading
+
+import pytest
+
+from src.rag.registry import VectorStoreRegistry, SharedEmbeddings
+from src.tools.rag_tools import InfinitePayRAGTool
+import src.tools.rag_tools as rag_tools
+
+
+class FakeModel:
+    def encode(self, items):
+        return [[0.1, 0.2, 0.3] for _ in items]
+
+
+class FakeClient:
+    def __init__(self, make_collection):
+        self.make_collection = make_collection
+        self.collections = {}
+
+    def get_or_create_collection(self, name):
+        return self.collections.setdefault(name, self.make_collection(["Doc"]))
+
+
+@pytest.fixture
+def fake_registry(monkeypatch, make_fake_collection):
+    registry = VectorStoreRegistry()
+    calls = {"model": 0, "client": 0}
+
+    def load_model(self, model_name):
+        calls["model"] += 1
+        return FakeModel()
+
+    def create_client(self, path):
+        calls["client"] += 1
+        return FakeClient(make_fake_collection)
+
+    monkeypatch.setattr(VectorStoreRegistry, "_load_embedding_model", load_model)
+    monkeypatch.setattr(VectorStoreRegistry, "_create_client", create_client)
+    monkeypatch.setattr(rag_tools, "vector_store_registry", registry)
+    return registry, calls
+
+
+def test_tools_share_handles_and_load_once(fake_registry):
+    registry, calls = fake_registry
+
+    t1 = InfinitePayRAGTool()
+    t2 = InfinitePayRAGTool()
+
+    assert calls == {"model": 1, "client": 1}
+    assert isinstance(t1.embeddings, SharedEmbeddings)
+    assert t1.embeddings is t2.embeddings
+    assert t1.client is t2.client
+    assert t1.collection is t2.collection
+    assert "Doc" in t2._run("maquininha")
+
+
+def test_concurrent_first_use_loads_once(fake_registry):
+    registry, calls = fake_registry
+    handles = []
+
+    def worker():
+        handles.append(registry.get_embeddings())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls["model"] == 1
+    assert len({id(h) for h in handles}) == 1
+
+
+def test_model_load_does_not_block_other_handles(fake_registry, monkeypatch):
+    registry, _ = fake_registry
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_model(self, model_name):
+        loading.set()
+        release.wait(5)
+        return FakeModel()
+
+    monkeypatch.setattr(VectorStoreRegistry, "_load_embedding_model", slow_model)
+    loader = threading.Thread(target=registry.get_embeddings)
+    loader.start()
+    assert loading.wait(5)
+
+    # The registry lock is free while the model loads
+    assert registry.get_collection() is not None
+    assert registry.status()["embeddings_loaded"] == []
+    release.set()
+    loader.join()
+    assert registry.status()["embeddings_loaded"] == [registry.get_embeddings().model_name]
+
+
+def test_tool_never_indexes_on_request_path(fake_registry, monkeypatch):
+    import src.rag.indexer as indexer
+
+    def fail(*args, **kwargs):
+        raise AssertionError("indexing must not run inside the request path")
+
+    monkeypatch.setattr(indexer, "build_index", fail)
+    monkeypatch.setattr(indexer, "iter_pages", fail)
+
+    tool = InfinitePayRAGTool()
+
+    assert tool.collection is not None
+
+
+def test_status_reports_warm_and_timings(fake_registry):
+    registry, _ = fake_registry
+    assert registry.status()["warm"] is False
+
+    status = registry.warm_up()
+
+    assert status["warm"] is True
+    assert any(k.startswith("embeddings:") for k in status["load_seconds"])
+    assert any(k.startswith("collection:") for k in status["load_seconds"])
+    assert status["errors"] == {}
+
+
+def test_load_failure_is_recorded_and_retried_after_backoff(monkeypatch, tmp_path, make_fake_collection):
+    import src.rag.registry as registry_module
+
+    monkeypatch.setattr(registry_module.settings, "rag_vector_store_path", str(tmp_path))
+    monkeypatch.setattr(VectorStoreRegistry, "_create_client", lambda self, path: FakeClient(make_fake_collection))
+    registry = VectorStoreRegistry()
+    calls = {"n": 0}
+    now = [1000.0]
+    monkeypatch.setattr(registry_module.time, "monotonic", lambda: now[0])
+
+    def boom(self, model_name):
+        calls["n"] += 1
+        raise ImportError("no sentence_transformers")
+
+    monkeypatch.setattr(VectorStoreRegistry, "_load_embedding_model", boom)
+
+    assert registry.get_embeddings() is None
+    assert registry.get_embeddings() is None
+    assert calls["n"] == 1  # within the backoff
+    assert "no sentence_transformers" in next(iter(registry.status()["errors"].values()))
+
+    now[0] += registry_module.settings.rag_load_retry_seconds
+    assert registry.get_embeddings() is None
+    assert calls["n"] == 2
+
+    # The next load succeeds: the error is cleared
+    monkeypatch.setattr(VectorStoreRegistry, "_load_embedding_model", lambda self, name: FakeModel())
+    registry.warm_up()  # retries without waiting for the backoff
+    assert registry.get_embeddings() is not None
+    assert not any(k.startswith("embeddings:") for k in registry.status()["errors"])
+
+
+def test_lexical_index_is_loaded_once_and_reloaded_when_rebuilt(tmp_path, monkeypatch):
+    import os
+
+    from src.config.settings import settings
+    from src.rag.bm25 import BM25Index, bm25_path
+
+    monkeypatch.setattr(settings, "rag_vector_store_path", str(tmp_path))
+    registry = VectorStoreRegistry()
+    assert registry.get_lexical_index() is None  # not built yet
+
+    path = bm25_path(str(tmp_path), settings.rag_collection_name)
+    BM25Index(["a"], ["Pix parcelado"]).save(path)
+    first = registry.get_lexical_index()
+    assert first.ids == ["a"]
+    assert registry.get_lexical_index() is first
+
+    BM25Index(["a", "b"], ["Pix parcelado", "Boleto"]).save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert registry.get_lexical_index().ids == ["a", "b"]
+    assert registry.status()["lexical_indexes_loaded"] == [path]
+
+
+def test_pooled_rag_tool_sees_bm25_rebuilt_between_checkouts(fake_registry, tmp_path, monkeypatch):
+    import asyncio
+    import os
+    from types import SimpleNamespace
+
+    from src.agents.pool import AgentPool
+    from src.config.settings import settings
+    from src.rag.bm25 import BM25Index, bm25_path
+
+    monkeypatch.setattr(settings, "rag_vector_store_path", str(tmp_path))
+    path = bm25_path(str(tmp_path), settings.rag_collection_name)
+    BM25Index(["a"], ["Pix parcelado"]).save(path)
+    pool = AgentPool({"KNOWLEDGE": lambda: SimpleNamespace(tools=[InfinitePayRAGTool()])}, size=1)
+
+    async def query():
+        async with pool.checkout("KNOWLEDGE") as agent:
+            tool = agent.tools[0]
+            tool._run("pix")
+            return tool, list(tool.lexical_index.ids)
+
+    first_tool, first_ids = asyncio.run(query())
+    BM25Index(["a", "b"], ["Pix parcelado", "Boleto"]).save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second_tool, second_ids = asyncio.run(query())
+
+    assert second_tool is first_tool  # the same pooled tool
+    assert first_ids == ["a"]
+    assert second_ids == ["a", "b"]
@@ -0,0 +1,43 @@
+from src.rag.bm25 import BM25Index
+from src.rag.retrieval import hybrid_search, reciprocal_rank_fusion
+
+
+ROWS = [
+    ("conta", "Conta digital com rendimento de 100% do CDI."),
+    ("boleto", "Boleto por R$ 2,00 pago."),
+    ("maquininha", "Maquininha Smart em 12x."),
+    ("tap", "InfiniteTap: tap to pay no celular."),
+]
+
+
+def test_rrf_rewards_items_ranked_by_both_retrievers():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+
+    assert [item for item, _ in fused][:2] == ["c", "a"]
+    assert fused[0][1] == 1 / 63 + 1 / 61
+
+
+def test_hybrid_surfaces_exact_term_match_missed_by_vectors(make_fake_collection):
+    collection = make_fake_collection(ROWS)
+    lexical = BM25Index([i for i, _ in ROWS], [d for _, d in ROWS], [{"source": i} for i, _ in ROWS])
+
+    dense_only = hybrid_search("tap to pay", [[0.0]], collection, lexical_index=None, top_k=2)
+    hybrid = hybrid_search("tap to pay", [[0.0]], collection, lexical_index=lexical, top_k=2)
+
+    assert [h.id for h in dense_only] == ["conta", "boleto"]
+    assert "tap" in [h.id for h in hybrid]
+    # Hits keep the document and metadata of the retriever that found them
+    tap = next(h for h in hybrid if h.id == "tap")
+    assert tap.document.startswith("InfiniteTap") and tap.metadata == {"source": "tap"}
+
+
+def test_hybrid_can_be_disabled(monkeypatch, make_fake_collection):
+    from src.config.settings import settings
+
+    monkeypatch.setattr(settings, "rag_hybrid_enabled", False)
+    collection = make_fake_collection(ROWS)
+    lexical = BM25Index([i for i, _ in ROWS], [d for _, d in ROWS])
+
+    hits = hybrid_search("tap to pay", [[0.0]], collection, lexical_index=lexical, top_k=2)
+
+    assert [h.id for h in hits] == ["conta", "boleto"]
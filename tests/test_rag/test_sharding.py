@@ -0,0 +1,113 @@
+from src.rag.backends import NumpyClient
+from src.rag.bm25 import BM25Index
+from src.rag.sharding import (
+    RoutedCollection,
+    RoutedLexicalIndex,
+    ShardRouter,
+    routed_search,
+    shard_collection_name,
+    shard_for_source,
+    sync_shards,
+)
+
+BASE = "https://www.infinitepay.io"
+ROWS = [
+    ("m1", f"{BASE}/maquininha", "Maquininha Smart com taxas a partir de 0,75% no débito.", [1.0, 0.0, 0.0]),
+    ("m2", f"{BASE}/tap-to-pay", "InfiniteTap: aceite cartão por aproximação no celular.", [0.9, 0.1, 0.0]),
+    ("p1", f"{BASE}/pix", "Pix sem taxa para receber na hora.", [0.0, 1.0, 0.0]),
+    ("p2", f"{BASE}/pix-parcelado", "Pix parcelado: o cliente paga em até 12x.", [0.1, 0.9, 0.0]),
+    ("e1", f"{BASE}/emprestimo", "Empréstimo com parcelas descontadas das vendas.", [0.0, 0.0, 1.0]),
+]
+
+
+def _global(tmp_path):
+    client = NumpyClient(str(tmp_path))
+    collection = client.get_or_create_collection("kb_test")
+    collection.upsert(
+        ids=[r[0] for r in ROWS],
+        documents=[r[2] for r in ROWS],
+        metadatas=[{"source": r[1]} for r in ROWS],
+        embeddings=[r[3] for r in ROWS],
+    )
+    collection.flush()
+    return client, collection
+
+
+def test_shard_for_source_groups_product_pages():
+    assert shard_for_source(f"{BASE}/tap-to-pay") == "maquininha"
+    assert shard_for_source(f"{BASE}/pix-parcelado?utm=x") == "pix"
+    assert shard_for_source(f"{BASE}/novo-produto/detalhes") == "novo-produto"
+    assert shard_for_source(BASE) == "geral"
+    assert shard_for_source("fallback") == "geral"
+
+
+def test_sync_shards_copies_stored_embeddings_and_removes_stale(tmp_path):
+    client, collection = _global(tmp_path)
+
+    router = sync_shards(collection, client.get_or_create_collection, "kb_test")
+
+    assert {name: s["chunks"] for name, s in router.shards.items()} == {"maquininha": 2, "pix": 2, "emprestimo": 1}
+    pix = client.get_or_create_collection(shard_collection_name("kb_test", "pix"))
+    assert sorted(pix.get(include=[])["ids"]) == ["p1", "p2"]
+    assert pix.get(ids=["p1"], include=["embeddings"])["embeddings"] == [[0.0, 1.0, 0.0]]
+
+    collection.delete(ids=["e1", "p2"])
+    router = sync_shards(collection, client.get_or_create_collection, "kb_test", previous_shards=router.shards)
+    assert "emprestimo" not in router.shards
+    assert client.get_or_create_collection(shard_collection_name("kb_test", "emprestimo")).count() == 0
+    assert pix.get(include=[])["ids"] == ["p1"]
+
+
+def test_router_uses_term_statistics_and_centroids():
+    router = ShardRouter.build(
+        "kb_test", [{"source": r[1]} for r in ROWS], [r[2] for r in ROWS], [r[3] for r in ROWS]
+    )
+
+    assert router.route("chaves do pix") == ["pix"]
+    assert router.route("maquininha smart no débito") == ["maquininha"]
+    # No matching term: the centroids decide
+    assert router.route("qual o valor?", [0.0, 0.1, 1.0]) == ["emprestimo"]
+    # Terms and embedding disagree: both shards are searched
+    assert sorted(router.route("pix", [1.0, 0.0, 0.0])) == ["maquininha", "pix"]
+    # Nothing points anywhere: search the whole collection
+    assert router.route("horário de atendimento") == []
+    assert ShardRouter.from_dict(router.to_dict()).shards == router.shards
+
+
+def test_routed_search_only_reads_routed_shards_and_falls_back(tmp_path):
+    client, collection = _global(tmp_path)
+    router = sync_shards(collection, client.get_or_create_collection, "kb_test")
+
+    hits, shards = routed_search(
+        "pix", [[0.0, 1.0, 0.0]], collection, router=router, open_collection=client.get_or_create_collection, top_k=5
+    )
+    assert shards == ["pix"]
+    assert {h.id for h in hits} == {"p1", "p2"}
+
+    hits, shards = routed_search(
+        "horário", [[0.0, 0.0, 0.0]], collection, router=router, open_collection=client.get_or_create_collection, top_k=5
+    )
+    assert shards == [] and len(hits) == 5
+
+
+def test_routed_collection_merges_by_distance(tmp_path):
+    client, collection = _global(tmp_path)
+    sync_shards(collection, client.get_or_create_collection, "kb_test")
+    view = RoutedCollection(
+        [client.get_or_create_collection(shard_collection_name("kb_test", name)) for name in ("pix", "maquininha")]
+    )
+
+    results = view.query([[0.2, 1.0, 0.0]], n_results=3)
+
+    assert results["ids"] == [["p2", "p1", "m2"]]
+    assert results["distances"][0] == sorted(results["distances"][0])
+
+
+def test_routed_lexical_index_only_scores_the_routed_shards():
+    index = BM25Index([r[0] for r in ROWS], [r[2] for r in ROWS], [{"source": r[1]} for r in ROWS])
+    assert index.rows_by_source[f"{BASE}/pix"] == {2}
+
+    routed = RoutedLexicalIndex(index, ["pix"])
+
+    assert routed.rows == {2, 3} and len(routed) == 2
+    assert [index.ids[row] for row, _ in routed.search("taxa")] == ["p1"]
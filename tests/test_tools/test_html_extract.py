@@ -0,0 +1,78 @@
+import pytest
+
+from benchmarks.corpus import load_html_pages
+from src.tools.scraping_tools import scrape_page
+from src.web.extract import extract_sections, parse_html, parse_stream, selector_xpath, visible_text
+from src.web.fetcher import fetch_text
+
+PAGE = """<html><head><title>T</title><script>var x = 1;</script></head><body>
+<nav><a href="/">Início</a></nav>
+<div id="content" class="page main-col">
+  <h1>Taxas</h1><p>Débito <b>1,37%</b> na hora.</p>
+  <section role="main"><h2>Pix</h2><ul><li>Taxa zero</li></ul></section>
+</div>
+<footer><p>Rodapé</p></footer>
+</body></html>"""
+
+
+@pytest.mark.parametrize("url", sorted(load_html_pages()))
+def test_lxml_and_bs4_backends_agree_on_saved_pages(url):
+    html = load_html_pages()[url]
+    assert extract_sections(html, backend="lxml") == extract_sections(html, backend="bs4")
+    assert visible_text(html, backend="lxml") == visible_text(html, backend="bs4")
+
+
+@pytest.mark.parametrize("backend", ["lxml", "bs4"])
+def test_sections_skip_scripts_and_keep_inline_text(backend):
+    sections = extract_sections(PAGE, backend=backend)
+    assert [s.title for s in sections] == ["Taxas", "Pix"]  # the nav has no text blocks
+    assert sections[0].blocks == ["Débito 1,37% na hora."]
+    assert "var x" not in visible_text(PAGE, backend=backend)
+
+
+@pytest.mark.parametrize("backend", ["lxml", "bs4"])
+def test_main_content_selectors(backend):
+    page = parse_html(PAGE, backend)
+    assert page.text(["article", "#content"]).startswith("Taxas")
+    assert "Rodapé" not in page.text(["#content"])
+    assert page.text(["[role=main]"]) == "Pix Taxa zero"
+    assert page.text(["div.main-col li"]) == "Taxa zero"
+    assert "Rodapé" in page.text(["article"])  # no match: whole page
+    assert page.select_texts("footer p") == ["Rodapé"]
+
+
+def test_selector_xpath_rejects_unsupported_selectors():
+    assert selector_xpath("main") == "//main"
+    with pytest.raises(ValueError):
+        selector_xpath("ul > li")
+
+
+def test_parse_stream_feeds_chunks_and_caps_bytes():
+    body = PAGE.encode("utf-8")
+    chunks = [body[i : i + 7] for i in range(0, len(body), 7)]
+    assert parse_stream(chunks, "utf-8").sections() == extract_sections(PAGE)
+
+    cut = body.index(b"<section")
+    truncated = parse_stream(chunks, "utf-8", max_bytes=cut)
+    assert "1,37%" in truncated.text()
+    assert "Taxa zero" not in truncated.text()
+
+
+def test_fetch_text_caps_body(pages_server):
+    text = fetch_text(f"{pages_server.base_url}/pix", max_bytes=200)
+    assert len(text.encode("utf-8")) <= 200
+
+
+def test_scrape_page_extracts_selected_text(pages_server):
+    result = scrape_page(f"{pages_server.base_url}/pix", ["main h2", "#cookie-banner", ".missing"])
+
+    assert result["data"]["main h2"] == ["Chaves Pix", "Pix na maquininha"]
+    assert result["data"]["#cookie-banner"][0].startswith("Usamos cookies")
+    assert result["data"][".missing"] == []
+
+
+def test_extraction_benchmark_runs(capsys):
+    from benchmarks import html_extraction_benchmark
+
+    assert html_extraction_benchmark.main(["--scale", "1", "--repeats", "1", "--paths", "legacy", "lxml"]) == 0
+    assert "lxml_speedup" in capsys.readouterr().out
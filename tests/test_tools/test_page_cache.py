@@ -0,0 +1,107 @@
+import asyncio
+
+from src.rag.ingestion import fetch_pages
+from src.web.cache import PageCache
+from src.web.fetcher import fetch_cached
+
+
+def counting_parse(calls):
+    def parse(html):
+        calls.append(1)
+        return html.upper()
+
+    return parse
+
+
+def test_fresh_entries_skip_the_network(pages_server):
+    cache = PageCache(ttl=60)
+    calls = []
+    url = f"{pages_server.base_url}/pix"
+
+    first = fetch_cached(url, "text", counting_parse(calls), cache)
+    second = fetch_cached(url, "text", counting_parse(calls), cache)
+
+    assert first == second
+    assert pages_server.hits["pix"] == 1
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["fetched"] == 1 and stats["fresh"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_stale_entries_are_revalidated_with_conditional_get(pages_server):
+    cache = PageCache(ttl=0)
+    calls = []
+    url = f"{pages_server.base_url}/pix"
+
+    first = fetch_cached(url, "text", counting_parse(calls), cache)
+    second = fetch_cached(url, "text", counting_parse(calls), cache)
+
+    assert first == second
+    assert pages_server.hits["pix"] == 2
+    assert pages_server.not_modified["pix"] == 1
+    assert len(calls) == 1  # a 304 is not parsed again
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_stale_value_is_served_when_revalidation_fails(pages_server):
+    cache = PageCache(ttl=0)
+    url = f"{pages_server.base_url}/error"
+    cache.put(url, "text", "cached body", {"etag": '"v1"'})
+
+    assert fetch_cached(url, "text", None, cache) == "cached body"
+    assert cache.stats()["stale_on_error"] == 1
+
+
+def test_no_store_responses_are_not_cached():
+    cache = PageCache()
+    cache.put("http://a.test/", "text", "body", {"cache-control": "private, no-store"})
+    assert cache.get("http://a.test/", "text") is None
+
+
+def test_entries_persist_on_disk(tmp_path):
+    path = str(tmp_path / "pages.sqlite3")
+    cache = PageCache(path=path)
+    cache.put("http://a.test/", "sections", [["Taxas", ["1,99%"]]], {"etag": '"v1"'})
+    cache.close()
+
+    reopened = PageCache(path=path)
+    entry = reopened.get("http://a.test/", "sections")
+    assert entry.value == [["Taxas", ["1,99%"]]]
+    assert entry.etag == '"v1"' and entry.fresh
+    assert reopened.stats()["disk_hits"] == 1
+    reopened.close()
+
+
+def test_lru_is_bounded():
+    cache = PageCache(max_size=2)
+    for i in range(3):
+        cache.put(f"http://a.test/{i}", "text", str(i), {})
+    assert cache.get("http://a.test/0", "text") is None
+    assert cache.stats()["size"] == 2
+
+
+def test_ingestion_revalidates_cached_pages(pages_server):
+    cache = PageCache(ttl=0)
+    urls = [f"{pages_server.base_url}/pix", f"{pages_server.base_url}/boleto"]
+
+    first, _ = asyncio.run(fetch_pages(urls, cache=cache))
+    second, _ = asyncio.run(fetch_pages(urls, cache=cache))
+
+    assert [p.text for p in first] == [p.text for p in second]
+    assert [p.sections for p in first] == [p.sections for p in second]
+    assert sum(pages_server.not_modified.values()) == 2
+    assert cache.stats()["revalidated"] == 2
+
+
+def test_indexer_revalidates_fresh_pages_and_fails_instead_of_serving_stale(pages_server):
+    cache = PageCache(ttl=3600)
+    pix, broken = f"{pages_server.base_url}/pix", f"{pages_server.base_url}/error"
+    asyncio.run(fetch_pages([pix], cache=cache))
+    cache.put(broken, "sections", [["Taxas", ["texto antigo"]]], {"etag": '"v1"'})
+
+    pages, failed = asyncio.run(fetch_pages([pix, broken], cache=cache, revalidate=True))
+
+    assert pages_server.not_modified["pix"] == 1  # asked the server despite the TTL
+    assert [p.url for p in pages] == [pix]
+    assert failed == [broken]
+    assert cache.stats()["stale_on_error"] == 0
@@ -8,26 +8,14 @@ class FakeEmbeddings:
         return [[0.1, 0.2, 0.3]]
 
 
-class FakeCollection:
-    def __init__(self, docs):
-        self._docs = docs
-
-    def query(self, query_embeddings, n_results=5, include=None):
-        return {
-            "documents": [self._docs],
-            "metadatas": [[{"source": "fake"} for _ in self._docs]],
-            "distances": [[0.1 for _ in self._docs]],
-        }
-
-
-def test_rag_tool_instantiation_calls_setup(monkeypatch):
+def test_rag_tool_instantiation_calls_setup(monkeypatch, make_fake_collection):
     called = {"v": False}
 
     def fake_setup(self):
         called["v"] = True
         self.client = object()
         self.embeddings = FakeEmbeddings()
-        self.collection = FakeCollection(["A", "B"])  # minimal
+        self.collection = make_fake_collection(["A", "B"])  # minimal
 
     monkeypatch.setattr(InfinitePayRAGTool, "_setup_vector_store", fake_setup)
     tool = InfinitePayRAGTool()
@@ -36,11 +24,11 @@ def test_rag_tool_instantiation_calls_setup(monkeypatch):
     assert tool.collection is not None
 
 
-def test_rag_tool_run_formats_results(monkeypatch):
+def test_rag_tool_run_formats_results(monkeypatch, make_fake_collection):
     def fake_setup(self):
         self.client = object()
         self.embeddings = FakeEmbeddings()
-        self.collection = FakeCollection(["Doc1", "Doc2"])
+        self.collection = make_fake_collection(["Doc1", "Doc2"])
 
     monkeypatch.setattr(InfinitePayRAGTool, "_setup_vector_store", fake_setup)
     tool = InfinitePayRAGTool()
@@ -50,11 +38,11 @@ def test_rag_tool_run_formats_results(monkeypatch):
     assert "Doc1" in out and "Doc2" in out
 
 
-def test_rag_tool_run_handles_no_results(monkeypatch):
+def test_rag_tool_run_handles_no_results(monkeypatch, make_fake_collection):
     def fake_setup(self):
         self.client = object()
         self.embeddings = FakeEmbeddings()
-        self.collection = FakeCollection([])
+        self.collection = make_fake_collection([])
 
     monkeypatch.setattr(InfinitePayRAGTool, "_setup_vector_store", fake_setup)
     tool = InfinitePayRAGTool()
@@ -63,8 +51,8 @@ def test_rag_tool_run_handles_no_results(monkeypatch):
     assert "Não encontrei informações" in out
 
 
-def test_rag_tool_run_handles_exception(monkeypatch):
-    class BoomCollection(FakeCollection):
+def test_rag_tool_run_handles_exception(monkeypatch, make_fake_collection):
+    class BoomCollection(make_fake_collection):
         def query(self, *args, **kwargs):
             raise RuntimeError("boom")
 
@@ -78,3 +66,94 @@ def test_rag_tool_run_handles_exception(monkeypatch):
 
     out = tool._run("qualquer")
     assert "Erro na busca RAG" in out
+
+
+def test_rag_tool_fuses_bm25_results(monkeypatch, make_fake_collection):
+    from src.rag.bm25 import BM25Index
+
+    def fake_setup(self):
+        self.client = object()
+        self.embeddings = FakeEmbeddings()
+        self.collection = make_fake_collection(["Conta digital com rendimento"])
+        self.lexical_index = BM25Index(["tap"], ["InfiniteTap: tap to pay no celular"])
+
+    monkeypatch.setattr(InfinitePayRAGTool, "_setup_vector_store", fake_setup)
+    tool = InfinitePayRAGTool()
+
+    out = tool._run("tap to pay")
+    assert "InfiniteTap" in out
+    assert "Conta digital" in out
+
+
+def test_rag_tool_reuses_cached_query_embeddings(monkeypatch, make_fake_collection):
+    from src.rag.embedding_cache import QueryEmbeddingCache
+
+    class CountingEmbeddings(FakeEmbeddings):
+        calls = 0
+
+        def encode(self, items):
+            CountingEmbeddings.calls += 1
+            return super().encode(items)
+
+    def fake_setup(self):
+        self.client = object()
+        self.embeddings = CountingEmbeddings()
+        self.collection = make_fake_collection(["Doc1"])
+        self.query_cache = QueryEmbeddingCache(max_size=4)
+
+    monkeypatch.setattr(InfinitePayRAGTool, "_setup_vector_store", fake_setup)
+    tool = InfinitePayRAGTool()
+
+    assert "Doc1" in tool._run("Taxas da maquininha?")
+    assert "Doc1" in tool._run("taxas da maquininha")
+    assert CountingEmbeddings.calls == 1
+    assert tool.query_cache.stats()["hits"] == 1
+
+
+def test_rag_tool_compresses_duplicates_and_lists_sources(monkeypatch, make_fake_collection):
+    class SourcedCollection(make_fake_collection):
+        def query(self, query_embeddings, n_results=5, include=None):
+            return {
+                "documents": [["Taxa de 1,37% no débito.", "Taxa de 1,37% no débito.", "Pix sem taxa."]],
+                "metadatas": [[{"source": "https://infinitepay.io/maquininha"}, {"source": "https://infinitepay.io/tap"}, {"source": "https://infinitepay.io/pix"}]],
+                "distances": [[0.2, 0.3, 1.9]],
+            }
+
+    def fake_setup(self):
+        self.client = object()
+        self.embeddings = FakeEmbeddings()
+        self.collection = SourcedCollection([])
+
+    monkeypatch.setattr(InfinitePayRAGTool, "_setup_vector_store", fake_setup)
+    tool = InfinitePayRAGTool()
+
+    out = tool._run("taxa débito")
+    assert out.count("1,37%") == 1
+    assert "Pix sem taxa" not in out  # too far
+    assert out.endswith("Fontes: https://infinitepay.io/maquininha")
+
+
+def test_rag_tool_searches_routed_shard(monkeypatch, make_fake_collection):
+    from src.rag.sharding import ShardRouter
+
+    shards = {"kb__pix": make_fake_collection(["Pix sem taxa."]), "kb__conta": make_fake_collection(["Conta digital."])}
+    router = ShardRouter(
+        {
+            "pix": {"collection": "kb__pix", "chunks": 1, "terms": {"pix": 3}, "length": 3, "centroid": None},
+            "conta": {"collection": "kb__conta", "chunks": 1, "terms": {"conta": 3}, "length": 3, "centroid": None},
+        }
+    )
+
+    def fake_setup(self):
+        self.client = object()
+        self.embeddings = FakeEmbeddings()
+        self.collection = make_fake_collection(["Global doc"])
+        self.shard_router = router
+
+    monkeypatch.setattr(InfinitePayRAGTool, "_setup_vector_store", fake_setup)
+    monkeypatch.setattr(InfinitePayRAGTool, "_open_shard", lambda self, name: shards[name])
+    tool = InfinitePayRAGTool()
+
+    assert "Pix sem taxa." in tool._run("Pix tem taxa?")
+    # No shard matches: the whole collection is searched
+    assert "Global doc" in tool._run("Horário de atendimento")
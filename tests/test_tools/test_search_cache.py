@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.config.settings import settings
+from src.tools.search_tools import WebSearchTool
+from src.web.search_cache import SearchResultCache, SingleFlight, get_search_cache
+
+
+class CountingDDGS:
+    """Fake DuckDuckGo client: counts calls and holds each one open briefly so callers overlap."""
+
+    calls = 0
+    lock = threading.Lock()
+    results = []
+
+    def text(self, keywords, max_results):
+        with CountingDDGS.lock:
+            CountingDDGS.calls += 1
+        time.sleep(0.2)
+        return CountingDDGS.results[:max_results]
+
+
+@pytest.fixture
+def counting_ddgs(monkeypatch, pages_server):
+    duckduckgo_search = pytest.importorskip("duckduckgo_search")
+    CountingDDGS.calls = 0
+    CountingDDGS.results = [{"title": "Pix", "href": f"{pages_server.base_url}/pix", "body": "Pix"}]
+    monkeypatch.setattr(duckduckgo_search, "DDGS", CountingDDGS)
+    monkeypatch.setattr(settings, "web_search_semantic_ranking", False)
+    return CountingDDGS
+
+
+def test_concurrent_identical_searches_make_one_backend_call(counting_ddgs, pages_server):
+    n = 12
+    barrier = threading.Barrier(n)
+    tool = WebSearchTool()
+
+    def search(i):
+        barrier.wait()
+        # Same question, different surface forms
+        return tool._run("Taxa do Pix?" if i % 2 else "  taxa do pix ", max_results=3)
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        outputs = list(pool.map(search, range(n)))
+
+    assert counting_ddgs.calls == 1
+    assert pages_server.hits["pix"] == 1
+    assert all("1. Pix" in out for out in outputs)
+    stats = get_search_cache().stats()
+    assert stats["searches"] == 1 and stats["hits"] + stats["shared_in_flight"] == n - 1
+
+
+def test_cached_results_expire(counting_ddgs, monkeypatch):
+    monkeypatch.setattr(settings, "web_search_cache_ttl_seconds", 0.0)
+    tool = WebSearchTool()
+    tool._run("taxa do pix", max_results=3)
+    tool._run("taxa do pix", max_results=3)
+    assert counting_ddgs.calls == 2
+
+
+def test_partial_results_are_not_cached(counting_ddgs, pages_server, monkeypatch):
+    counting_ddgs.results = [{"title": "Lenta", "href": f"{pages_server.base_url}/boleto?delay=2", "body": "Boleto"}]
+    monkeypatch.setattr(settings, "web_search_deadline", 0.3)
+    tool = WebSearchTool()
+    tool._run("boleto", max_results=3)
+    tool._run("boleto", max_results=3)
+    assert counting_ddgs.calls == 2
+
+
+def test_single_flight_propagates_errors_to_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("backend down")
+
+    errors = []
+
+    def waiter():
+        started.wait()
+        try:
+            flight.do("k", lambda: "never")
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    with pytest.raises(RuntimeError):
+        flight.do("k", failing)
+    thread.join()
+
+    assert errors == ["backend down"]
+    # The failed call is forgotten; the next one runs again
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+def test_result_cache_is_bounded():
+    cache = SearchResultCache(max_size=2, ttl=60)
+    for query in ("a", "b", "c"):
+        cache.put(query, 5, query)
+    assert cache.get("a", 5) is None
+    assert cache.get("C", 5) == "c"
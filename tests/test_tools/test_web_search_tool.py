@@ -0,0 +1,164 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from src.config.settings import settings
+from src.tools.search_tools import WebSearchTool
+from src.web.fetcher import DeadlineExceeded, fetch_all, get_host_limiter
+from src.web.passages import rank_passages, select_passages, split_passages
+
+
+def fake_ddgs(monkeypatch, results):
+    duckduckgo_search = pytest.importorskip("duckduckgo_search")
+
+    class FakeDDGS:
+        def text(self, keywords, max_results):
+            return results[:max_results]
+
+    monkeypatch.setattr(duckduckgo_search, "DDGS", FakeDDGS)
+    monkeypatch.setattr(settings, "web_search_semantic_ranking", False)
+
+
+def test_fetch_all_fetches_concurrently(pages_server):
+    urls = [f"{pages_server.base_url}/{page}?delay=0.3" for page in ("pix", "boleto", "maquininha", "emprestimo")]
+    started = time.perf_counter()
+    pages = fetch_all(urls, per_host_limit=4, url_timeout=5, deadline=5)
+    elapsed = time.perf_counter() - started
+
+    assert all(isinstance(pages[url], str) and "<html" in pages[url].lower() for url in urls)
+    assert elapsed < 0.9  # one round trip, not four
+
+
+def test_fetch_all_respects_per_host_limit(pages_server):
+    urls = [f"{pages_server.base_url}/{page}?delay=0.2" for page in ("pix", "boleto", "maquininha", "emprestimo")]
+    started = time.perf_counter()
+    fetch_all(urls, per_host_limit=1, url_timeout=5, deadline=5)
+    assert time.perf_counter() - started >= 0.8
+
+
+def test_fetch_all_returns_partial_results_at_deadline(pages_server):
+    fast = f"{pages_server.base_url}/pix"
+    slow = f"{pages_server.base_url}/boleto?delay=2"
+    failing = f"{pages_server.base_url}/error"
+    started = time.perf_counter()
+    pages = fetch_all([fast, slow, failing], per_host_limit=4, url_timeout=5, deadline=0.5)
+
+    assert time.perf_counter() - started < 1.0
+    assert isinstance(pages[fast], str)
+    assert isinstance(pages[slow], DeadlineExceeded)
+    assert isinstance(pages[failing], Exception) and not isinstance(pages[failing], DeadlineExceeded)
+
+
+def test_trickling_body_is_cut_at_the_url_timeout_and_frees_the_host_slot(pages_server):
+    # Each 100-byte write arrives well within the read timeout; only the body deadline stops it
+    trickling = f"{pages_server.base_url}/pix?trickle=0.1"
+    started = time.perf_counter()
+    pages = fetch_all([trickling], per_host_limit=1, url_timeout=0.5, deadline=5)
+
+    assert time.perf_counter() - started < 1.0
+    assert isinstance(pages[trickling], httpx.ReadTimeout)
+    assert get_host_limiter(1).for_url(trickling).acquire(timeout=0.5)
+    get_host_limiter(1).for_url(trickling).release()
+
+
+def test_batches_share_one_host_limiter(pages_server):
+    assert get_host_limiter(2) is get_host_limiter(2)
+    urls = [f"{pages_server.base_url}/{page}?delay=0.2" for page in ("pix", "boleto")]
+    started = time.perf_counter()
+    threads = [threading.Thread(target=fetch_all, args=([url],), kwargs={"per_host_limit": 1}) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - started >= 0.4  # the two batches took turns on the host
+
+
+def test_web_search_returns_partial_results_within_deadline(pages_server, monkeypatch):
+    base = pages_server.base_url
+    fake_ddgs(
+        monkeypatch,
+        [
+            {"title": "Pix", "href": f"{base}/pix", "body": "Pix na InfinitePay"},
+            {"title": "Lenta", "href": f"{base}/boleto?delay=3", "body": "Boleto"},
+            {"title": "Quebrada", "href": f"{base}/error", "body": "Erro"},
+        ],
+    )
+    monkeypatch.setattr(settings, "web_search_deadline", 0.5)
+
+    started = time.perf_counter()
+    out = WebSearchTool()._run("pix infinitepay", max_results=3)
+
+    assert time.perf_counter() - started < 1.5
+    first = out.split("2. Lenta")[0]
+    assert "Pix" in first.split("Conteúdo extraído:")[1]
+    assert "(Página não carregou a tempo" in out
+    assert "(Falha ao extrair conteúdo desta página)" in out
+
+
+FILLER = " ".join(f"Frase de navegação número {i} sem relação com o assunto." for i in range(400))
+
+
+def test_split_passages_bounds_size():
+    passages = split_passages(FILLER, max_chars=300)
+    assert len(passages) > 10
+    assert all(len(p) <= 300 for p in passages)
+    assert " ".join(passages) == " ".join(FILLER.split())
+
+
+def test_rank_passages_puts_query_matches_first():
+    passages = ["Menu Início Produtos", "A taxa do Pix parcelado é de 1,99% ao mês.", "Rodapé Contato"]
+    assert rank_passages("taxa pix parcelado", passages)[0] == 1
+    # No match: page order
+    assert rank_passages("futebol", passages) == [0, 1, 2]
+
+
+def test_rank_passages_fuses_embedding_ranking():
+    class FakeEmbeddings:
+        def encode(self, texts):
+            return [[1.0, 0.0] if "maquininha" in t.lower() or "point" in t.lower() else [0.0, 1.0] for t in texts]
+
+    passages = ["Menu Início", "Conheça a Point, aceite cartões em qualquer lugar.", "Rodapé"]
+    assert rank_passages("maquininha", passages)[0] == 0
+    assert rank_passages("maquininha", passages, embeddings=FakeEmbeddings())[0] == 1
+
+
+def test_select_passages_respects_budget_and_reports_dropped():
+    pages = {
+        "a": FILLER + " A taxa do Pix parcelado é de 1,99% ao mês. " + FILLER,
+        "b": FILLER,
+    }
+    excerpts = select_passages("taxa pix parcelado", pages, char_budget=2000, per_page=2)
+
+    assert excerpts.kept_chars <= 2000
+    assert "1,99%" in excerpts.pages["a"].text
+    assert len(excerpts.pages["a"].passages) <= 2
+    assert excerpts.pages["b"].passages  # every page keeps something
+    assert excerpts.kept_chars + excerpts.dropped_chars == sum(p.total_chars for p in excerpts.pages.values())
+    assert excerpts.dropped_passages > 0
+
+
+def test_web_search_output_is_bounded(pages_server, monkeypatch):
+    base = pages_server.base_url
+    fake_ddgs(
+        monkeypatch,
+        [{"title": page, "href": f"{base}/{page}", "body": page} for page in ("pix", "boleto", "maquininha")],
+    )
+    monkeypatch.setattr(settings, "web_search_char_budget", 1500)
+    monkeypatch.setattr(settings, "web_main_content_selectors", [])  # whole pages
+
+    out = WebSearchTool()._run("taxa pix", max_results=3)
+
+    assert len(out) < 1500 + 1000  # budget plus titles, URLs and previews
+    assert "Conteúdo reduzido aos trechos mais relevantes" in out
+
+
+def test_web_search_extracts_main_content(pages_server, monkeypatch):
+    fake_ddgs(monkeypatch, [{"title": "Pix", "href": f"{pages_server.base_url}/pix", "body": "Pix"}])
+
+    out = WebSearchTool()._run("chaves pix", max_results=1)
+
+    assert "Cadastre até 20 chaves Pix" in out
+    assert "Todos os direitos reservados" not in out  # footer is outside <main>
+    assert "Usamos cookies" not in out